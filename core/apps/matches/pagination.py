@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class MatchCursorPagination(CursorPagination):
+    """
+    matches/ постранично, новые первыми. Курсор по PK: id растёт вместе с
+    created_at, но в отличие от него уникален и уже проиндексирован.
+    """
+    ordering = "-id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 200
@@ -1,6 +1,27 @@
 from rest_framework import serializers
 
-from .models import Match
+from .models import Match, MatchEvent
+
+
+class FieldSelectionMixin:
+    """
+    ?fields=id,status,team_1 — в ответе только перечисленные поля.
+    Неизвестные имена игнорируются; без параметра — все поля сериализатора.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get("request"))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+def requested_fields(request) -> set[str] | None:
+    raw = request.query_params.get("fields") if request is not None else None
+    if not raw:
+        return None
+    return {f.strip() for f in raw.split(",") if f.strip()} or None
 
 
 class MatchSerializer(serializers.ModelSerializer):
@@ -63,16 +84,21 @@ class MatchSerializer(serializers.ModelSerializer):
         team_1 = attrs.get("team_1")
         team_2 = attrs.get("team_2")
 
-        if self.instance:
-            if team_1 is None:
-                team_1 = list(self.instance.team_1.all())
-            if team_2 is None:
-                team_2 = list(self.instance.team_2.all())
+        # составы не менялись — проверять нечего (в базе они уже валидны)
+        if team_1 is None and team_2 is None:
+            return attrs
+
+        team_1_ids = {p.pk for p in team_1} if team_1 is not None else None
+        team_2_ids = {p.pk for p in team_2} if team_2 is not None else None
 
-        team_1 = set(team_1 or [])
-        team_2 = set(team_2 or [])
+        # вторую команду при частичном обновлении берём из базы — только id
+        if self.instance:
+            if team_1_ids is None:
+                team_1_ids = set(self.instance.team_1.values_list("pk", flat=True))
+            if team_2_ids is None:
+                team_2_ids = set(self.instance.team_2.values_list("pk", flat=True))
 
-        duplicates = team_1 & team_2
+        duplicates = (team_1_ids or set()) & (team_2_ids or set())
         if duplicates:
             raise serializers.ValidationError(
                 "Player cannot be in both team_1 and team_2."
@@ -82,4 +108,43 @@ class MatchSerializer(serializers.ModelSerializer):
 
 
 class SetWinnerSerializer(serializers.Serializer):
-    winner_team = serializers.ChoiceField(choices=[1, 2])
\ No newline at end of file
+    winner_team = serializers.ChoiceField(choices=[1, 2])
+
+
+class MatchListSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    """Список матчей: без событий и discord-привязок, составы — массивы id игроков."""
+
+    class Meta:
+        model = Match
+        fields = [
+            "id",
+            "created_at",
+            "finished_at",
+            "lobby_id",
+            "mode",
+            "is_ranked",
+            "status",
+            "captain_1",
+            "captain_2",
+            "team_1",
+            "team_2",
+            "winner_team",
+            "map_name",
+        ]
+        read_only_fields = fields
+
+
+class MatchEventSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MatchEvent
+        fields = ["id", "type", "created_at", "data", "actor"]
+        read_only_fields = fields
+
+
+class MatchDetailSerializer(FieldSelectionMixin, MatchSerializer):
+    """Один матч: все поля + журнал событий."""
+
+    events = MatchEventSerializer(many=True, read_only=True)
+
+    class Meta(MatchSerializer.Meta):
+        fields = MatchSerializer.Meta.fields + ["events"]
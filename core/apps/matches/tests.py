@@ -1,2 +1,105 @@
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from apps.players.models import Player
+
+from .models import Match, MatchEvent
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BOT_WEBHOOK_URL="")
+class StartMatchTests(APITestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("bot", password="x")
+        self.client.force_authenticate(user)
+        self.players = [
+            Player.objects.create(discord_id=500 + i, username=f"Player{i}#EU") for i in range(4)
+        ]
+
+    def _payload(self, **extra):
+        p = self.players
+        return {
+            "external_id": str(uuid.uuid4()),
+            "captain_1": p[0].pk,
+            "captain_2": p[1].pk,
+            "team_1": [p[2].pk],
+            "team_2": [p[3].pk],
+            "mode": "2x2",
+            **extra,
+        }
+
+    def test_start_creates_match_in_progress_with_captains_in_teams(self):
+        response = self.client.post("/api/matches/start/", self._payload(), format="json")
+        self.assertEqual(response.status_code, 201)
+
+        match = Match.objects.get(pk=response.json()["id"])
+        self.assertEqual(match.status, Match.Status.IN_PROGRESS)
+        self.assertIn(self.players[0], match.team_1.all())
+        self.assertIn(self.players[1], match.team_2.all())
+        self.assertEqual(
+            list(match.events.order_by("id").values_list("type", flat=True)),
+            [MatchEvent.Type.CREATED, MatchEvent.Type.READY, MatchEvent.Type.STARTED],
+        )
+
+    def test_repeated_start_returns_same_match(self):
+        payload = self._payload()
+        first = self.client.post("/api/matches/start/", payload, format="json")
+        again = self.client.post("/api/matches/start/", payload, format="json")
+
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()["id"], first.json()["id"])
+        self.assertEqual(Match.objects.count(), 1)
+        self.assertEqual(MatchEvent.objects.filter(type=MatchEvent.Type.STARTED).count(), 1)
+
+    def test_repeat_by_match_key_advances_existing_draft(self):
+        payload = self._payload(external_match_key="guild:chan:1:2x2")
+        draft = self.client.post("/api/matches/", payload, format="json").json()
+
+        response = self.client.post("/api/matches/start/", payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["id"], draft["id"])
+        self.assertEqual(response.json()["status"], Match.Status.IN_PROGRESS)
+
+    def test_repeat_for_canceled_match_is_rejected(self):
+        payload = self._payload()
+        match_id = self.client.post("/api/matches/start/", payload, format="json").json()["id"]
+        self.client.post(f"/api/matches/{match_id}/cancel_match/")
+
+        response = self.client.post("/api/matches/start/", payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Match.objects.get(pk=match_id).status, Match.Status.CANCELED)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BOT_WEBHOOK_URL="")
+class SetWinnerWinrateTests(APITestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("bot", password="x")
+        self.client.force_authenticate(user)
+        # у всех уже есть статистика — winrate должен пересчитаться от неё
+        self.players = [
+            Player.objects.create(discord_id=600 + i, username=f"Ranked{i}#EU", wins=i, matches=4)
+            for i in range(10)
+        ]
+        p = self.players
+        self.match = Match.objects.create(
+            captain_1=p[0], captain_2=p[5], mode=Match.Mode.M5, status=Match.Status.IN_PROGRESS,
+        )
+        self.match.team_1.set(p[:5])
+        self.match.team_2.set(p[5:])
+
+    @mock.patch("apps.matches.views.notify_players_changed")
+    def test_winrate_column_follows_update(self, _notify):
+        response = self.client.post(f"/api/matches/{self.match.pk}/set_winner/", {"winner_team": 1}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        for before in self.players:
+            player = Player.objects.get(pk=before.pk)
+            won = before in self.players[:5]
+            self.assertEqual(player.wins, before.wins + won)
+            self.assertEqual(player.matches, before.matches + 1)
+            self.assertAlmostEqual(player.winrate, Player.compute_winrate(player.wins, player.matches))
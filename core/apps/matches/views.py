@@ -1,15 +1,26 @@
 import logging
 
 from django.db import IntegrityError, transaction
-from django.db.models import F
+from django.db.models import F, Prefetch
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from apps.players.leaderboard import bump_version as bump_leaderboard_version
+from apps.players.models import Player, winrate_expr
+from apps.players.notifications import notify_players_changed
+
 from .models import Match, MatchEvent
-from .serializers import MatchSerializer, SetWinnerSerializer
+from .pagination import MatchCursorPagination
+from .serializers import (
+    MatchDetailSerializer,
+    MatchListSerializer,
+    MatchSerializer,
+    SetWinnerSerializer,
+    requested_fields,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -29,14 +40,32 @@ def log_match_event(match: Match, event_type: str, actor=None, **data):
 class MatchViewSet(viewsets.ModelViewSet):
     serializer_class = MatchSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = MatchCursorPagination
+
+    queryset = Match.objects.all().order_by("-created_at")
+
+    def get_queryset(self):
+        # Составы сериализуются как id, капитаны — через *_id: полные Player
+        # не нужны. События грузим только для детального просмотра.
+        qs = super().get_queryset()
+        if self.action == "list":
+            fields = requested_fields(self.request)
+            teams = [t for t in ("team_1", "team_2") if fields is None or t in fields]
+            return qs.prefetch_related(*(Prefetch(t, queryset=Player.objects.only("id")) for t in teams))
+        if self.action == "retrieve":
+            return qs.prefetch_related(
+                Prefetch("team_1", queryset=Player.objects.only("id")),
+                Prefetch("team_2", queryset=Player.objects.only("id")),
+                "events",
+            )
+        return qs
 
-    queryset = (
-        Match.objects
-        .select_related("captain_1", "captain_2")
-        .prefetch_related("team_1", "team_2", "events")
-        .all()
-        .order_by("-created_at")
-    )
+    def get_serializer_class(self):
+        if self.action == "list":
+            return MatchListSerializer
+        if self.action == "retrieve":
+            return MatchDetailSerializer
+        return MatchSerializer
 
     def create(self, request, *args, **kwargs):
         """
@@ -46,17 +75,7 @@ class MatchViewSet(viewsets.ModelViewSet):
         или external_match_key, мы не создаём дубль, а возвращаем уже
         существующий матч.
         """
-        external_id = request.data.get("external_id")
-        external_match_key = request.data.get("external_match_key")
-
-        existing = None
-
-        if external_id:
-            existing = Match.objects.filter(external_id=external_id).first()
-
-        if not existing and external_match_key:
-            existing = Match.objects.filter(external_match_key=external_match_key).first()
-
+        existing = self._find_existing(request.data)
         if existing:
             serializer = self.get_serializer(existing)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -66,47 +85,118 @@ class MatchViewSet(viewsets.ModelViewSet):
         except IntegrityError:
             # Защита от редкой гонки:
             # два одинаковых запроса пришли почти одновременно.
-            existing = None
-
-            if external_id:
-                existing = Match.objects.filter(external_id=external_id).first()
-
-            if not existing and external_match_key:
-                existing = Match.objects.filter(external_match_key=external_match_key).first()
-
+            existing = self._find_existing(request.data)
             if existing:
                 serializer = self.get_serializer(existing)
                 return Response(serializer.data, status=status.HTTP_200_OK)
 
             raise
 
+    @staticmethod
+    def _find_existing(data) -> Match | None:
+        external_id = data.get("external_id")
+        external_match_key = data.get("external_match_key")
+
+        existing = None
+
+        if external_id:
+            existing = Match.objects.filter(external_id=external_id).first()
+
+        if not existing and external_match_key:
+            existing = Match.objects.filter(external_match_key=external_match_key).first()
+
+        return existing
+
     def perform_create(self, serializer):
         actor = self.request.user if self.request.user.is_authenticated else None
 
         with transaction.atomic():
-            match: Match = serializer.save(status=Match.Status.DRAFT)
+            self._create_draft(serializer, actor)
 
-            # Капитаны тоже должны входить в свои команды.
-            # Бот обычно передаёт team_1/team_2 без капитанов,
-            # поэтому добавляем их на уровне API.
-            if match.captain_1_id:
-                match.team_1.add(match.captain_1_id)
+    @staticmethod
+    def _create_draft(serializer, actor) -> Match:
+        match: Match = serializer.save(status=Match.Status.DRAFT)
 
-            if match.captain_2_id:
-                match.team_2.add(match.captain_2_id)
+        # Капитаны тоже должны входить в свои команды.
+        # Бот обычно передаёт team_1/team_2 без капитанов,
+        # поэтому добавляем их на уровне API.
+        if match.captain_1_id:
+            match.team_1.add(match.captain_1_id)
 
-            log_match_event(
-                match,
-                MatchEvent.Type.CREATED,
-                actor=actor,
-                map=match.map_name,
-                mode=match.mode,
-                is_ranked=match.is_ranked,
-                lobby_id=match.lobby_id,
-                lobby_name=match.lobby_name,
-                discord_guild_id=match.discord_guild_id,
-                discord_channel_id=match.discord_channel_id,
-            )
+        if match.captain_2_id:
+            match.team_2.add(match.captain_2_id)
+
+        log_match_event(
+            match,
+            MatchEvent.Type.CREATED,
+            actor=actor,
+            map=match.map_name,
+            mode=match.mode,
+            is_ranked=match.is_ranked,
+            lobby_id=match.lobby_id,
+            lobby_name=match.lobby_name,
+            discord_guild_id=match.discord_guild_id,
+            discord_channel_id=match.discord_channel_id,
+        )
+        return match
+
+    @staticmethod
+    def _advance_to_in_progress(match: Match, actor) -> bool:
+        """
+        DRAFT → READY → IN_PROGRESS с теми же событиями, что пишут mark_ready/start_match.
+        Вызывается под select_for_update внутри transaction.atomic.
+        False — если матч уже завершён/отменён и стартовать его нельзя.
+        """
+        if match.status == Match.Status.DRAFT:
+            match.status = Match.Status.READY
+            match.save(update_fields=["status"])
+            log_match_event(match, MatchEvent.Type.READY, actor=actor)
+
+        if match.status == Match.Status.READY:
+            match.status = Match.Status.IN_PROGRESS
+            match.save(update_fields=["status"])
+            log_match_event(match, MatchEvent.Type.STARTED, actor=actor)
+
+        return match.status == Match.Status.IN_PROGRESS
+
+    @action(detail=False, methods=["post"], url_path="start")
+    def create_started(self, request):
+        """
+        POST /matches/start/
+
+        Тело — как у create. Создаёт матч, добавляет капитанов в команды и сразу
+        переводит его в IN_PROGRESS (события CREATED, READY, STARTED) в одной
+        транзакции: наполовину запущенный матч остаться не может.
+        Идемпотентно по external_id / external_match_key: повтор дотягивает
+        существующий матч до IN_PROGRESS и возвращает его.
+        """
+        actor = request.user if request.user.is_authenticated else None
+
+        existing = self._find_existing(request.data)
+        if not existing:
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            try:
+                with transaction.atomic():
+                    match = self._create_draft(serializer, actor)
+                    self._advance_to_in_progress(match, actor)
+            except IntegrityError:
+                # та же гонка, что и в create
+                existing = self._find_existing(request.data)
+                if not existing:
+                    raise
+            else:
+                return Response(self.get_serializer(match).data, status=status.HTTP_201_CREATED)
+
+        with transaction.atomic():
+            match = Match.objects.select_for_update().get(pk=existing.pk)
+            if not self._advance_to_in_progress(match, actor):
+                return Response(
+                    {"detail": f"Match cannot be started from status '{match.status}'."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        return Response(self.get_serializer(match).data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"])
     def mark_ready(self, request, pk=None):
@@ -235,19 +325,26 @@ class MatchViewSet(viewsets.ModelViewSet):
 
             # Статистика/лидерборд только для ranked 5x5.
             if match.mode == Match.Mode.M5 and match.is_ranked:
-                Player = match.team_1.model
-
                 if winners_ids:
                     Player.objects.filter(id__in=winners_ids).update(
                         wins=F("wins") + 1,
                         matches=F("matches") + 1,
+                        winrate=winrate_expr(F("wins") + 1, F("matches") + 1),
                     )
 
                 if losers_ids:
                     Player.objects.filter(id__in=losers_ids).update(
                         matches=F("matches") + 1,
+                        winrate=winrate_expr(F("wins"), F("matches") + 1),
                     )
 
+                # update() не шлёт post_save — уведомляем бота сами
+                notify_players_changed(
+                    Player.objects.filter(id__in=winners_ids | losers_ids).values_list("discord_id", flat=True),
+                    reason="match_result",
+                )
+                bump_leaderboard_version()
+
             log_match_event(
                 match,
                 MatchEvent.Type.WIN_SET,
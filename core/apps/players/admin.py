@@ -42,6 +42,7 @@ class PlayerAdmin(admin.ModelAdmin):
     list_display = ("discord_id", "username", "rank", "wins", "matches")
     search_fields = ("username", "discord_id")
     list_filter = ("rank",)
+    readonly_fields = ("winrate",)
     actions = [export_players_csv]
 
 
@@ -0,0 +1,160 @@
+import base64
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Player
+
+# Кэш лидерборда. Ключ строк включает версию; версия меняется после каждого
+# коммита, который трогает статистику/ники/ранги (set_winner, add_win, set_wins,
+# сброс статистики, закрытие сезона, любой Player.save) — старые ключи просто
+# перестают читаться и истекают по таймауту.
+#
+# Версия — время в наносекундах, а не incr(): два параллельных bump'а дают
+# разные значения и не могут «склеиться» в одну версию.
+
+VERSION_KEY = "leaderboard:version"
+
+# Порядок лидерборда = поля player_leaderboard_idx. id — строгий тай-брейк:
+# без него keyset-страницы могли бы терять/дублировать игроков с одинаковой статой.
+ORDERING = ("-wins", "-winrate", "-matches", "username", "id")
+_FIELDS = ("discord_id", "username", "rank", "wins", "matches", "winrate")
+
+
+def get_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = time.time_ns()
+        # add — если другой воркер успел первым, берём его значение
+        if not cache.add(VERSION_KEY, version, timeout=None):
+            version = cache.get(VERSION_KEY, version)
+    return int(version)
+
+
+def bump_version() -> None:
+    """Инвалидация после коммита: откаченная транзакция кэш не трогает."""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, time.time_ns(), timeout=None))
+
+
+def _row(p: Player) -> dict:
+    return {
+        "discord_id": p.discord_id,
+        "username": p.username,
+        "rank": p.rank,
+        "wins": p.wins,
+        "matches": p.matches,
+        "winrate": round(p.winrate, 1),
+    }
+
+
+def _build(limit: int) -> list[dict]:
+    # top-N читается с начала индекса
+    qs = Player.objects.order_by(*ORDERING).only(*_FIELDS)[:limit]
+    return [_row(p) for p in qs]
+
+
+def _sort_key(p: Player) -> list:
+    return [p.wins, p.winrate, p.matches, p.username, p.id]
+
+
+def _keyset_q(key: list, *, ahead: bool) -> Q:
+    """
+    Строки строго после (ahead=False) или строго перед (ahead=True) позицией key
+    в порядке ORDERING — лексикографическое сравнение кортежей, развёрнутое в OR,
+    чтобы база могла идти по индексу.
+    """
+    wins, winrate, matches, username, pk = key
+    if ahead:
+        last = [Q(wins__gt=wins), Q(winrate__gt=winrate), Q(matches__gt=matches),
+                Q(username__lt=username), Q(id__lt=pk)]
+    else:
+        last = [Q(wins__lt=wins), Q(winrate__lt=winrate), Q(matches__lt=matches),
+                Q(username__gt=username), Q(id__gt=pk)]
+    equal = [Q(wins=wins), Q(winrate=winrate), Q(matches=matches), Q(username=username)]
+
+    q = Q()
+    for i, cond in enumerate(last):
+        term = cond
+        for eq in equal[:i]:
+            term &= eq
+        q |= term
+    return q
+
+
+def encode_cursor(key: list) -> str:
+    raw = json.dumps(key, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """ValueError — курсор битый."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        wins, winrate, matches, username, pk = json.loads(raw)
+        return [int(wins), float(winrate), int(matches), str(username), int(pk)]
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def _build_page(cursor: str | None, limit: int) -> dict:
+    qs = Player.objects.order_by(*ORDERING).only(*_FIELDS)
+    if cursor:
+        qs = qs.filter(_keyset_q(decode_cursor(cursor), ahead=False))
+
+    players = list(qs[:limit + 1])
+    has_more = len(players) > limit
+    players = players[:limit]
+
+    # место не храним в курсоре: пока листают, таблица меняется. Считаем его
+    # тем же запросом, что и get_position, — страница и /place не расходятся.
+    place = 0
+    if cursor and players:
+        place = Player.objects.filter(_keyset_q(_sort_key(players[0]), ahead=True)).count()
+
+    results = []
+    for p in players:
+        place += 1
+        results.append({**_row(p), "place": place})
+
+    next_cursor = encode_cursor(_sort_key(players[-1])) if has_more else None
+    return {"results": results, "next": next_cursor}
+
+
+def get_page(cursor: str | None, limit: int) -> tuple[int, dict]:
+    """(версия, {"results": [...], "next": курсор|None}) — страница после cursor."""
+    version = get_version()
+    digest = hashlib.sha1((cursor or "").encode("utf-8")).hexdigest()
+    key = f"leaderboard:{version}:page:{limit}:{digest}"
+    page = cache.get(key)
+    if page is None:
+        page = _build_page(cursor, limit)
+        cache.set(key, page, timeout=settings.LEADERBOARD_CACHE_TIMEOUT)
+    return version, page
+
+
+def get_position(player: Player) -> tuple[int, dict]:
+    """(версия, {"place", "total", ...}) — место считаем count'ом тех, кто выше."""
+    version = get_version()
+    key = f"leaderboard:{version}:pos:{player.discord_id}"
+    data = cache.get(key)
+    if data is None:
+        ahead = Player.objects.filter(_keyset_q(_sort_key(player), ahead=True)).count()
+        data = {**_row(player), "place": ahead + 1, "total": Player.objects.count()}
+        cache.set(key, data, timeout=settings.LEADERBOARD_CACHE_TIMEOUT)
+    return version, data
+
+
+def get_leaderboard(limit: int) -> tuple[int, list[dict]]:
+    """(версия, строки топа). Запрос к БД — только если этой версии ещё нет в кэше."""
+    version = get_version()
+    key = f"leaderboard:{version}:{limit}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = _build(limit)
+        cache.set(key, rows, timeout=settings.LEADERBOARD_CACHE_TIMEOUT)
+    return version, rows
@@ -1,6 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from apps.players.models import Player
+from apps.players.leaderboard import bump_version as bump_leaderboard_version
+from apps.players.notifications import notify_all_players_changed
 
 
 class Command(BaseCommand):
@@ -8,5 +10,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         with transaction.atomic():
-            updated = Player.objects.all().update(wins=0, matches=0)
+            updated = Player.objects.all().update(wins=0, matches=0, winrate=0.0)
+            notify_all_players_changed(reason="reset_stats")
+            bump_leaderboard_version()
         self.stdout.write(self.style.SUCCESS(f"✅ Reset stats for {updated} players"))
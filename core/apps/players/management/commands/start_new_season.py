@@ -3,6 +3,8 @@ from django.db import transaction
 from django.utils import timezone
 
 from apps.players.models import Player, Season, PlayerSeasonStat
+from apps.players.leaderboard import bump_version as bump_leaderboard_version
+from apps.players.notifications import notify_all_players_changed
 
 
 class Command(BaseCommand):
@@ -77,7 +79,10 @@ class Command(BaseCommand):
         reset_count = Player.objects.update(
             wins=0,
             matches=0,
+            winrate=0.0,
         )
+        notify_all_players_changed(reason="close_season")
+        bump_leaderboard_version()
 
         self.stdout.write(
             self.style.SUCCESS(
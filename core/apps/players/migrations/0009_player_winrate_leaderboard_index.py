@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import ExpressionWrapper, F
+
+
+def backfill_winrate(apps, schema_editor):
+    Player = apps.get_model("players", "Player")
+    Player.objects.filter(matches__gt=0).update(
+        winrate=ExpressionWrapper(100.0 * F("wins") / F("matches"), output_field=models.FloatField()),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0008_alter_player_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='winrate',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(backfill_winrate, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='player',
+            index=models.Index(fields=['-wins', '-winrate', '-matches', 'username', 'id'], name='player_leaderboard_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('players', '0009_player_winrate_leaderboard_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='riot_puuid',
+            field=models.CharField(blank=True, default='', max_length=78),
+        ),
+        migrations.AddField(
+            model_name='player',
+            name='riot_region',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import ExpressionWrapper
 from django.conf import settings
 from django.utils import timezone
 
@@ -10,7 +11,15 @@ class Player(models.Model):
     rank_last_sync = models.DateTimeField(null=True, blank=True, db_index=True)
     wins = models.PositiveIntegerField(default=0, db_index=True)
     matches = models.PositiveIntegerField(default=0, db_index=True)
+    # 100 * wins / matches — хранится, чтобы лидерборд шёл по индексу, а не
+    # считал выражение и сортировал всю таблицу. Пересчитывается в save();
+    # пути через queryset.update() обязаны обновлять его сами (winrate_expr).
+    winrate = models.FloatField(default=0.0)
     last_name_change = models.DateTimeField(null=True, blank=True)
+    # Riot-аккаунт, в который резолвится username (Name#TAG) через HenrikDev.
+    # Пока Riot ID не меняется, ранг обновляется одним запросом по puuid.
+    riot_puuid = models.CharField(max_length=78, blank=True, default="")
+    riot_region = models.CharField(max_length=8, blank=True, default="")
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
@@ -18,9 +27,69 @@ class Player(models.Model):
         blank=True,
     )
 
+    class Meta:
+        indexes = [
+            # ровно порядок лидерборда: top-N — проход по началу индекса;
+            # id в конце делает порядок строгим (keyset-пагинация, место игрока)
+            models.Index(
+                fields=["-wins", "-winrate", "-matches", "username", "id"],
+                name="player_leaderboard_idx",
+            ),
+        ]
+
+    # Поля, которые видны снаружи (строки лидерборда, профиль в боте): кэш
+    # лидерборда и кэш профилей бота сбрасываются, только если поменялось
+    # одно из них. Синк ранга без смены ранга трогает лишь rank_last_sync/riot_*.
+    PUBLIC_FIELDS = ("username", "rank", "wins", "matches")
+
     def __str__(self):
         return f"{self.username} ({self.rank})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_public()
+        return instance
+
+    def _remember_public(self) -> None:
+        # отложенные (only/defer) поля не читаем — иначе лишний запрос
+        self._loaded_public = {f: self.__dict__[f] for f in self.PUBLIC_FIELDS if f in self.__dict__}
+
+    def _public_fields_changed(self, update_fields) -> bool:
+        if update_fields is not None and not set(self.PUBLIC_FIELDS) & set(update_fields):
+            return False
+        loaded = getattr(self, "_loaded_public", None)
+        if loaded is None:
+            # новый объект или собран вручную — сравнивать не с чем
+            return True
+        return any(
+            f in self.__dict__ and (f not in loaded or loaded[f] != self.__dict__[f])
+            for f in self.PUBLIC_FIELDS
+        )
+
+    @staticmethod
+    def compute_winrate(wins: int, matches: int) -> float:
+        return 100.0 * wins / matches if matches else 0.0
+
+    def save(self, *args, **kwargs):
+        self.winrate = self.compute_winrate(int(self.wins or 0), int(self.matches or 0))
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"wins", "matches"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "winrate"}
+        # читают post_save-обработчики (signals.py)
+        self.public_changed = self._public_fields_changed(kwargs.get("update_fields"))
+        super().save(*args, **kwargs)
+        self._remember_public()
+
+
+def winrate_expr(wins, matches):
+    """
+    Winrate для queryset.update(): выражение над значениями, которые будут
+    записаны, например winrate_expr(F("wins") + 1, F("matches") + 1).
+    matches здесь всегда > 0 (пути с обнулением пишут winrate=0 напрямую).
+    """
+    return ExpressionWrapper(100.0 * wins / matches, output_field=models.FloatField())
+
 
 class PlayerBan(models.Model):
     player = models.ForeignKey("Player", on_delete=models.CASCADE, related_name="bans")
@@ -0,0 +1,50 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Уведомления боту об изменении профилей игроков (ранг, wins/matches, ник,
+# закрытие сезона). Бот держит профили в кэше с длинным TTL и сбрасывает
+# записи по этим событиям — сразу после результата матча, а не через TTL.
+#
+# Шлём только после коммита транзакции (откаченные изменения бот не увидит)
+# и в отдельном потоке, чтобы медленный/лежащий бот не тормозил ответ API.
+# Один воркер — события доходят в том порядке, в котором закоммичены.
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot-webhook")
+
+
+def _post(payload: dict) -> None:
+    try:
+        resp = requests.post(
+            settings.BOT_WEBHOOK_URL,
+            json=payload,
+            headers={"X-Webhook-Secret": settings.BOT_WEBHOOK_SECRET},
+            timeout=settings.BOT_WEBHOOK_TIMEOUT,
+        )
+        if resp.status_code >= 400:
+            logger.warning("Bot webhook %s -> HTTP %s", payload.get("reason"), resp.status_code)
+    except requests.RequestException as e:
+        # бот недоступен — его кэш доживёт до TTL, это не ошибка API
+        logger.warning("Bot webhook %s failed: %s", payload.get("reason"), e)
+
+
+def _publish(payload: dict) -> None:
+    if not settings.BOT_WEBHOOK_URL:
+        return
+    transaction.on_commit(lambda: _executor.submit(_post, payload))
+
+
+def notify_players_changed(discord_ids, reason: str) -> None:
+    ids = sorted({int(x) for x in discord_ids if x})
+    if ids:
+        _publish({"event": "players_changed", "discord_ids": ids, "reason": reason})
+
+
+def notify_all_players_changed(reason: str) -> None:
+    """Массовые изменения (сброс статистики, новый сезон) — бот чистит кэш целиком."""
+    _publish({"event": "players_changed", "all": True, "reason": reason})
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PlayerCursorPagination(CursorPagination):
+    """
+    players/ постранично: курсор по первичному ключу — каждая страница это
+    range scan по PK, без OFFSET и без подсчёта всей таблицы.
+    """
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 500
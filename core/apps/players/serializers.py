@@ -12,12 +12,16 @@ class PlayerSerializer(serializers.ModelSerializer):
             "rank_last_sync",
             "wins",
             "matches",
+            "riot_puuid",
+            "riot_region",
         ]
         read_only_fields = [
             "id",
             "wins",
             "matches",
             "rank_last_sync",
+            "riot_puuid",
+            "riot_region",
         ]
 
 class PlayerBanSerializer(serializers.ModelSerializer):
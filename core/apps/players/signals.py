@@ -1,8 +1,14 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from allauth.account.signals import user_signed_up, user_logged_in
 from allauth.socialaccount.models import SocialAccount
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from .models import Player
+from .leaderboard import bump_version as bump_leaderboard_version
+from .notifications import notify_players_changed
 
 
 def _discord_display_name(extra_data: dict) -> str:
@@ -51,4 +57,36 @@ def create_player_on_signup(request, user, **kwargs):
 
 @receiver(user_logged_in)
 def link_discord_account_to_player(sender, request, user, **kwargs):
-    _sync_discord_player(user)
\ No newline at end of file
+    _sync_discord_player(user)
+
+
+# Массовое удаление (wipe_players): post_delete приходит на каждую строку —
+# построчные вебхуки и bump'ы версии глушим, вызывающий шлёт один notify_all.
+_bulk_delete = ContextVar("players_bulk_delete", default=False)
+
+
+@contextmanager
+def bulk_player_delete():
+    token = _bulk_delete.set(True)
+    try:
+        yield
+    finally:
+        _bulk_delete.reset(token)
+
+
+@receiver(post_save, sender=Player)
+def on_player_saved(sender, instance, **kwargs):
+    # сохранения, которые не меняют видимых полей (синк ранга без смены ранга,
+    # puuid), не сбрасывают ни лидерборд, ни кэш профилей в боте
+    if not getattr(instance, "public_changed", True):
+        return
+    notify_players_changed([instance.discord_id], reason="player_saved")
+    bump_leaderboard_version()
+
+
+@receiver(post_delete, sender=Player)
+def on_player_deleted(sender, instance, **kwargs):
+    if _bulk_delete.get():
+        return
+    notify_players_changed([instance.discord_id], reason="player_deleted")
+    bump_leaderboard_version()
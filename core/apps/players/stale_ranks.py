@@ -0,0 +1,69 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Player
+
+# Очередь на обновление ранга для фонового рефрешера бота: игроки, у которых
+# rank_last_sync пуст или старше older_than секунд, самые давние — первыми.
+#
+# Сначала идут никогда не синкавшиеся (rank_last_sync IS NULL, по id), затем
+# остальные по (rank_last_sync, id) — по индексу на rank_last_sync. NULL'ы
+# вынесены в отдельную фазу, чтобы keyset-условие оставалось простым сравнением.
+# Игроки без "#" в нике пропускаются: Riot ID у них нет, обновить ранг нельзя.
+
+
+def encode_cursor(last_sync: datetime | None, pk: int) -> str:
+    raw = json.dumps([last_sync.isoformat() if last_sync else None, pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime | None, int]:
+    """ValueError — курсор битый."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_sync, pk = json.loads(raw)
+        return (datetime.fromisoformat(last_sync) if last_sync else None), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def _base_and_cutoff(older_than: int):
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    return Player.objects.filter(username__contains="#"), cutoff
+
+
+def count_stale(older_than: int) -> int:
+    """Сколько игроков во всей очереди (для прогресса/ETA массового синка)."""
+    base, cutoff = _base_and_cutoff(older_than)
+    return base.filter(Q(rank_last_sync__isnull=True) | Q(rank_last_sync__lt=cutoff)).count()
+
+
+def get_stale_page(older_than: int, cursor: str | None, limit: int) -> tuple[list[Player], str | None]:
+    """(игроки, курсор следующей страницы|None) — устаревшие ранги после cursor."""
+    base, cutoff = _base_and_cutoff(older_than)
+
+    last_sync, pk = decode_cursor(cursor) if cursor else (None, None)
+    players: list[Player] = []
+
+    # фаза 1: ни разу не синкались
+    if last_sync is None:
+        qs = base.filter(rank_last_sync__isnull=True).order_by("id")
+        if pk is not None:
+            qs = qs.filter(id__gt=pk)
+        players = list(qs[:limit + 1])
+
+    # фаза 2: синкались давно
+    if len(players) <= limit:
+        qs = base.filter(rank_last_sync__lt=cutoff).order_by("rank_last_sync", "id")
+        if last_sync is not None:
+            qs = qs.filter(Q(rank_last_sync__gt=last_sync) | Q(rank_last_sync=last_sync, id__gt=pk))
+        players += list(qs[:limit + 1 - len(players)])
+
+    has_more = len(players) > limit
+    players = players[:limit]
+    next_cursor = encode_cursor(players[-1].rank_last_sync, players[-1].id) if has_more else None
+    return players, next_cursor
@@ -1,2 +1,276 @@
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .leaderboard import VERSION_KEY, get_version
+from . import notifications
+from .models import Player
+from .views import BULK_MAX_IDS
+
+LOCMEM_CACHE = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BOT_WEBHOOK_URL="")
+class LeaderboardVersionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.player = Player.objects.create(discord_id=1, username="Alpha#EU1", wins=3, matches=5)
+        cache.delete(VERSION_KEY)
+
+    def _save(self, player, **kwargs):
+        before = get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            player.save(**kwargs)
+        return get_version() != before
+
+    def test_rank_sync_without_changes_keeps_version(self):
+        player = Player.objects.get(pk=self.player.pk)
+        player.rank_last_sync = timezone.now()
+        player.riot_puuid = "puuid"
+        self.assertFalse(self._save(player))
+
+    def test_update_fields_without_public_fields_keeps_version(self):
+        player = Player.objects.get(pk=self.player.pk)
+        player.rank_last_sync = timezone.now()
+        self.assertFalse(self._save(player, update_fields=["rank_last_sync"]))
+
+    def test_wins_change_bumps_version(self):
+        player = Player.objects.get(pk=self.player.pk)
+        player.wins += 1
+        self.assertTrue(self._save(player))
+
+    def test_same_rank_written_again_keeps_version(self):
+        player = Player.objects.get(pk=self.player.pk)
+        player.rank = player.rank
+        player.rank_last_sync = timezone.now()
+        self.assertFalse(self._save(player))
+
+    def test_rank_change_bumps_version(self):
+        # ранг виден в строках лидерборда
+        player = Player.objects.get(pk=self.player.pk)
+        player.rank = "Gold 2"
+        self.assertTrue(self._save(player))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PlayerChangedWebhookTests(TestCase):
+    def setUp(self):
+        self.player = Player.objects.create(discord_id=7, username="Bravo#EU1")
+        patcher = mock.patch("apps.players.signals.notify_players_changed")
+        self.notify = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rank_refresh_without_changes_does_not_notify_bot(self):
+        player = Player.objects.get(pk=self.player.pk)
+        player.rank_last_sync = timezone.now()
+        player.riot_puuid = "puuid"
+        player.save()
+        self.notify.assert_not_called()
+
+    def test_visible_change_notifies_bot(self):
+        player = Player.objects.get(pk=self.player.pk)
+        player.rank = "Diamond 1"
+        player.save()
+        self.notify.assert_called_once_with([7], reason="player_saved")
+
+    def test_delete_notifies_bot(self):
+        Player.objects.get(pk=self.player.pk).delete()
+        self.notify.assert_called_once_with([7], reason="player_deleted")
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BOT_WEBHOOK_URL="")
+class LeaderboardPageTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user = get_user_model().objects.create_user("bot", password="x")
+        self.client.force_authenticate(user)
+        # одинаковая стата у нескольких игроков — порядок решает тай-брейк
+        for i in range(23):
+            Player.objects.create(
+                discord_id=1000 + i, username=f"P{i % 5}#EU", wins=i % 4, matches=5 + i % 3,
+            )
+
+    def _pages(self, limit):
+        rows, cursor = [], None
+        while True:
+            params = {"limit": limit, **({"after": cursor} if cursor else {})}
+            data = self.client.get("/api/players/leaderboard/page/", params).json()
+            rows += data["results"]
+            cursor = data["next"]
+            if cursor is None:
+                return rows
+
+    def test_pages_cover_everyone_once_in_order(self):
+        rows = self._pages(limit=7)
+        self.assertEqual([r["place"] for r in rows], list(range(1, 24)))
+        self.assertEqual(len({r["discord_id"] for r in rows}), 23)
+
+    def test_page_place_matches_position(self):
+        for row in self._pages(limit=5):
+            data = self.client.get(f"/api/players/{row['discord_id']}/position/").json()
+            self.assertEqual(data["place"], row["place"])
+            self.assertEqual(data["total"], 23)
+
+    def test_place_is_recomputed_after_table_changes(self):
+        first = self.client.get("/api/players/leaderboard/page/", {"limit": 5}).json()
+        # пока листают, игрок из первой страницы ушёл — места сдвигаются
+        with self.captureOnCommitCallbacks(execute=True):
+            Player.objects.get(discord_id=first["results"][0]["discord_id"]).delete()
+
+        second = self.client.get(
+            "/api/players/leaderboard/page/", {"limit": 5, "after": first["next"]},
+        ).json()
+        self.assertEqual(second["results"][0]["place"], 5)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/api/players/leaderboard/page/", {"after": "garbage"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BOT_WEBHOOK_URL="")
+class BulkProfilesTests(APITestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("bot", password="x")
+        self.client.force_authenticate(user)
+        for did in (11, 12, 13):
+            Player.objects.create(discord_id=did, username=f"Bulk{did}#EU")
+
+    def test_returns_known_players_and_skips_unknown(self):
+        response = self.client.post("/api/players/bulk/", {"discord_ids": [11, 13, 99, 13]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(p["discord_id"] for p in response.json()), [11, 13])
+
+    def test_id_cap(self):
+        ids = list(range(1, BULK_MAX_IDS + 1))
+        ok = self.client.post("/api/players/bulk/", {"discord_ids": ids}, format="json")
+        self.assertEqual(ok.status_code, 200)
+
+        too_many = self.client.post("/api/players/bulk/", {"discord_ids": ids + [BULK_MAX_IDS + 1]}, format="json")
+        self.assertEqual(too_many.status_code, 400)
+
+    def test_rejects_bad_payload(self):
+        for body in ({"discord_ids": "11"}, {"discord_ids": ["abc"]}, {}):
+            response = self.client.post("/api/players/bulk/", body, format="json")
+            self.assertEqual(response.status_code, 400, body)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, BOT_WEBHOOK_URL="")
+class StaleRanksTests(APITestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user("bot", password="x")
+        self.client.force_authenticate(user)
+        now = timezone.now()
+        old = now - timedelta(days=3)
+        self.never = [Player.objects.create(discord_id=20 + i, username=f"New{i}#EU") for i in range(3)]
+        # одинаковый rank_last_sync — порядок решает id
+        self.old = [
+            Player.objects.create(discord_id=30 + i, username=f"Old{i}#EU", rank_last_sync=old + timedelta(hours=i // 2))
+            for i in range(4)
+        ]
+        Player.objects.create(discord_id=40, username="Fresh#EU", rank_last_sync=now)
+        Player.objects.create(discord_id=41, username="NoRiotId")
+
+    def _get(self, **params):
+        return self.client.get("/api/players/stale_ranks/", {"older_than": 3600, **params})
+
+    def _walk(self, limit):
+        ids, cursor = [], None
+        while True:
+            data = self._get(limit=limit, **({"after": cursor} if cursor else {})).json()
+            ids += [p["discord_id"] for p in data["results"]]
+            cursor = data["next"]
+            if cursor is None:
+                return ids
+
+    def test_never_synced_first_then_oldest(self):
+        expected = [p.discord_id for p in self.never + self.old]
+        for limit in (1, 2, 3, 50):
+            self.assertEqual(self._walk(limit), expected, limit)
+
+    def test_count(self):
+        self.assertEqual(self._get(limit=1, count=1).json()["count"], 7)
+
+    def test_synced_during_pass_is_not_repeated(self):
+        first = self._get(limit=2).json()
+        Player.objects.filter(discord_id=self.old[1].discord_id).update(rank_last_sync=timezone.now())
+
+        rest, cursor = [], first["next"]
+        while cursor:
+            data = self._get(limit=2, after=cursor).json()
+            rest += [p["discord_id"] for p in data["results"]]
+            cursor = data["next"]
+        self.assertEqual(rest, [self.never[2].discord_id, self.old[0].discord_id,
+                                self.old[2].discord_id, self.old[3].discord_id])
+
+    def test_invalid_cursor_is_rejected(self):
+        self.assertEqual(self._get(after="garbage").status_code, 400)
+
+
+@override_settings(BOT_WEBHOOK_URL="http://bot/cache/players_changed", BOT_WEBHOOK_SECRET="s3cret")
+class BotWebhookDeliveryTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(notifications._executor, "submit")
+        self.submit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sent_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.notify_players_changed([3, 1, 3, None], reason="match_result")
+            self.submit.assert_not_called()
+
+        self.submit.assert_called_once()
+        _, payload = self.submit.call_args.args
+        self.assertEqual(payload, {"event": "players_changed", "discord_ids": [1, 3], "reason": "match_result"})
+
+    def test_rolled_back_change_is_not_sent(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    notifications.notify_players_changed([1], reason="player_saved")
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.submit.assert_not_called()
+
+    @override_settings(BOT_WEBHOOK_URL="")
+    def test_disabled_without_url(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notifications.notify_all_players_changed(reason="season_closed")
+        self.submit.assert_not_called()
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class WipePlayersTests(APITestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create_user("admin", password="x", is_staff=True)
+        self.client.force_authenticate(admin)
+        for i in range(5):
+            Player.objects.create(discord_id=900 + i, username=f"Wipe{i}#EU")
+
+    @mock.patch("apps.players.views.bump_leaderboard_version")
+    @mock.patch("apps.players.views.notify_all_players_changed")
+    @mock.patch("apps.players.signals.bump_leaderboard_version")
+    @mock.patch("apps.players.signals.notify_players_changed")
+    def test_wipe_sends_single_notification(self, per_row_notify, per_row_bump, notify_all, bump):
+        response = self.client.post("/api/players/wipe_players/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Player.objects.exists())
+
+        per_row_notify.assert_not_called()
+        per_row_bump.assert_not_called()
+        notify_all.assert_called_once_with(reason="wipe_players")
+        bump.assert_called_once_with()
+
+    @mock.patch("apps.players.signals.notify_players_changed")
+    def test_single_delete_still_notifies_after_wipe(self, notify):
+        self.client.post("/api/players/wipe_players/")
+        player = Player.objects.create(discord_id=999, username="After#EU")
+        notify.reset_mock()
+        player.delete()
+        notify.assert_called_once_with([999], reason="player_deleted")
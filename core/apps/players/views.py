@@ -6,14 +6,27 @@ from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAdminUser
 from .models import Player, PlayerBan, Season, PlayerSeasonStat
 from .serializers import PlayerSerializer, PlayerBanSerializer
+from .pagination import PlayerCursorPagination
+from .notifications import notify_all_players_changed
+from .leaderboard import bump_version as bump_leaderboard_version, get_leaderboard, get_page, get_position
+from .signals import bulk_player_delete
+from .stale_ranks import count_stale, get_stale_page
 from django.db import transaction
-from django.db.models import F, FloatField, ExpressionWrapper, Case, When, Value
+
+
+# Сколько профилей можно запросить за раз через players/bulk/
+BULK_MAX_IDS = 100
+# Максимальный размер страницы players/leaderboard/page/
+LEADERBOARD_PAGE_MAX = 100
+# Максимальный размер страницы players/stale_ranks/
+STALE_RANKS_PAGE_MAX = 200
 
 
 class PlayerViewSet(viewsets.ModelViewSet):
     queryset = Player.objects.all()
     serializer_class = PlayerSerializer
     lookup_field = 'discord_id'
+    pagination_class = PlayerCursorPagination
 
     @action(detail=True, methods=['post'])
     def add_win(self, request, discord_id=None):
@@ -27,6 +40,31 @@ class PlayerViewSet(viewsets.ModelViewSet):
         except Player.DoesNotExist:
             return Response({'error': 'Player not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        POST /players/bulk/
+
+        Тело: {"discord_ids": [123, 456, ...]}
+        Профили всех найденных игроков одним запросом; неизвестные id просто
+        отсутствуют в ответе.
+        """
+        raw_ids = request.data.get("discord_ids")
+        if not isinstance(raw_ids, list):
+            return Response({"error": "discord_ids must be a list"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            discord_ids = {int(x) for x in raw_ids}
+        except (TypeError, ValueError):
+            return Response({"error": "discord_ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(discord_ids) > BULK_MAX_IDS:
+            return Response({"error": f"too many discord_ids (max {BULK_MAX_IDS})"}, status=status.HTTP_400_BAD_REQUEST)
+
+        players = Player.objects.filter(discord_id__in=discord_ids)
+        serializer = self.get_serializer(players, many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'], url_path='top10')
     def top10(self, request):
         return self._leaderboard(limit=10)
@@ -37,22 +75,69 @@ class PlayerViewSet(viewsets.ModelViewSet):
         return self._leaderboard(limit=10)
 
     def _leaderboard(self, limit: int):
-        qs = Player.objects.annotate(
-            winrate=Case(
-                When(matches__gt=0,
-                     then=ExpressionWrapper(100.0 * F('wins') / F('matches'), output_field=FloatField())),
-                default=Value(0.0), output_field=FloatField(),
-            )
-        ).order_by('-wins', '-winrate', '-matches', 'username')[:limit]
-
-        data = [{
-            "discord_id": p.discord_id,
-            "username": p.username,
-            "rank": p.rank,
-            "wins": p.wins,
-            "matches": p.matches,
-            "winrate": round(p.winrate, 1),
-        } for p in qs]
+        # Строки из кэша по версии; версия уходит в ETag, и бот с актуальной
+        # версией получает 304 без тела.
+        version, data = get_leaderboard(limit)
+        etag = f'"lb-{version}"'
+        headers = {"ETag": etag, "X-Leaderboard-Version": str(version)}
+
+        if self.request.headers.get("If-None-Match") == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(data, headers=headers)
+
+    @action(detail=False, methods=['get'], url_path='leaderboard/page')
+    def leaderboard_page(self, request):
+        """
+        GET /players/leaderboard/page/?limit=10&after=<cursor>
+
+        Keyset-пагинация по порядку лидерборда: {"results": [...], "next": cursor|null,
+        "version": ...}. У строк есть "place"; next передаётся в after за следующей страницей.
+        """
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except (TypeError, ValueError):
+            return Response({"error": "limit must be integer"}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, LEADERBOARD_PAGE_MAX))
+
+        try:
+            version, page = get_page(request.query_params.get("after") or None, limit)
+        except ValueError:
+            return Response({"error": "invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({**page, "version": version}, headers={"X-Leaderboard-Version": str(version)})
+
+    @action(detail=True, methods=['get'], url_path='position')
+    def position(self, request, discord_id=None):
+        """GET /players/{discord_id}/position/ — место игрока в лидерборде и размер таблицы."""
+        player = self.get_object()
+        version, data = get_position(player)
+        return Response({**data, "version": version}, headers={"X-Leaderboard-Version": str(version)})
+
+    @action(detail=False, methods=['get'], url_path='stale_ranks')
+    def stale_ranks(self, request):
+        """
+        GET /players/stale_ranks/?older_than=<sec>&limit=50&after=<cursor>[&count=1]
+
+        Игроки с рангом старше older_than секунд (или ни разу не синкавшиеся),
+        самые давние первыми: {"results": [...], "next": cursor|null}.
+        С count=1 — ещё "count": размер всей очереди (без учёта after).
+        """
+        try:
+            older_than = int(request.query_params.get("older_than", 0))
+            limit = int(request.query_params.get("limit", 50))
+        except (TypeError, ValueError):
+            return Response({"error": "older_than and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+        older_than = max(0, older_than)
+        limit = max(1, min(limit, STALE_RANKS_PAGE_MAX))
+
+        try:
+            players, next_cursor = get_stale_page(older_than, request.query_params.get("after") or None, limit)
+        except ValueError:
+            return Response({"error": "invalid cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = {"results": self.get_serializer(players, many=True).data, "next": next_cursor}
+        if request.query_params.get("count") in ("1", "true"):
+            data["count"] = count_stale(older_than)
         return Response(data)
 
     @action(
@@ -95,22 +180,29 @@ class PlayerViewSet(viewsets.ModelViewSet):
           "discord_id": 1234567890,
           "username": "Nick#TAG",   # опционально
           "rank": "Immortal 1",     # опционально
+          "riot_puuid": "...",      # опционально, вместе с riot_region
+          "riot_region": "eu",      # опционально
           "create_if_not_exist": true/false  # опционально (по умолчанию False)
         }
+
+        Смена username сбрасывает riot_puuid/riot_region (другой Riot ID —
+        другой аккаунт), если новые не переданы в том же запросе.
         """
         data = request.data
 
         discord_id = data.get("discord_id")
         username = data.get("username")
         rank = data.get("rank")
+        riot_puuid = data.get("riot_puuid")
+        riot_region = data.get("riot_region")
         create_if_not_exist = bool(data.get("create_if_not_exist", False))
 
         if not discord_id:
             return Response({"error": "discord_id is required"}, status=400)
 
-        if username is None and rank is None:
+        if username is None and rank is None and riot_puuid is None:
             return Response(
-                {"error": "nothing to update (provide username or rank)"},
+                {"error": "nothing to update (provide username, rank or riot_puuid)"},
                 status=400,
             )
 
@@ -136,6 +228,8 @@ class PlayerViewSet(viewsets.ModelViewSet):
             if player.username != username:
                 player.username = username
                 player.last_name_change = None  # можно потом реализовать логику отсечки по времени
+                player.riot_puuid = ""
+                player.riot_region = ""
 
         # Если пришёл rank — просто обновляем + обновляем время sync
         if rank is not None:
@@ -146,6 +240,15 @@ class PlayerViewSet(viewsets.ModelViewSet):
             player.rank = rank
             player.rank_last_sync = timezone.now()
 
+        if riot_puuid is not None:
+            riot_puuid = str(riot_puuid).strip()
+            riot_region = str(riot_region or "").strip().lower()
+            if len(riot_puuid) > 78 or len(riot_region) > 8:
+                return Response({"error": "riot_puuid/riot_region too long"}, status=400)
+
+            player.riot_puuid = riot_puuid
+            player.riot_region = riot_region
+
         try:
             player.save()
         except Exception as e:
@@ -175,7 +278,10 @@ class PlayerViewSet(viewsets.ModelViewSet):
         updated = Player.objects.update(
             wins=0,
             matches=0,
+            winrate=0.0,
         )
+        notify_all_players_changed(reason="reset_stats")
+        bump_leaderboard_version()
         return Response({"ok": True, "updated": updated})
 
     @action(
@@ -257,7 +363,10 @@ class PlayerViewSet(viewsets.ModelViewSet):
             reset_count = Player.objects.update(
                 wins=0,
                 matches=0,
+                winrate=0.0,
             )
+            notify_all_players_changed(reason="close_season")
+            bump_leaderboard_version()
 
         return Response(
             {
@@ -277,7 +386,10 @@ class PlayerViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAdminUser],
     )
     def wipe_players(self, request):
-        deleted, _ = Player.objects.all().delete()
+        with transaction.atomic(), bulk_player_delete():
+            deleted, _ = Player.objects.all().delete()
+        notify_all_players_changed(reason="wipe_players")
+        bump_leaderboard_version()
         return Response({"ok": True, "deleted": deleted})
 
 
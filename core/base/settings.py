@@ -148,6 +148,10 @@ except TypeError:
     if DB_SSL_REQUIRE:
         default_db["OPTIONS"] = {**default_db.get("OPTIONS", {}), "sslmode": "require"}
 
+# Тестовая БД собирается по моделям, без миграций: в истории matches две ветки
+# добавляют одни и те же колонки (на проде давно применены), с нуля она не проходит.
+default_db["TEST"] = {**default_db.get("TEST", {}), "MIGRATE": False}
+
 DATABASES = {"default": default_db}
 
 
@@ -225,3 +229,30 @@ SOCIALACCOUNT_PROVIDERS = {
         "SCOPE": ["identify", "email"],
     }
 }
+
+# Куда слать боту уведомления об изменении игроков (сброс кэша профилей).
+# Пусто — уведомления выключены, бот живёт на TTL.
+BOT_WEBHOOK_URL = config("BOT_WEBHOOK_URL", default="")
+BOT_WEBHOOK_SECRET = config("BOT_WEBHOOK_SECRET", default="")
+BOT_WEBHOOK_TIMEOUT = config("BOT_WEBHOOK_TIMEOUT", default=3.0, cast=float)
+
+# Кэш (лидерборд и т.п.). По умолчанию — файловый: общий для всех воркеров
+# gunicorn без отдельного сервиса. С REDIS_URL — Redis.
+REDIS_URL = config("REDIS_URL", default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": config("DJANGO_CACHE_DIR", default=str(BASE_DIR / ".django_cache")),
+        }
+    }
+
+# Страховочный TTL строк лидерборда (основная инвалидация — по версии)
+LEADERBOARD_CACHE_TIMEOUT = config("LEADERBOARD_CACHE_TIMEOUT", default=3600, cast=int)
@@ -0,0 +1,292 @@
+"""
+Бенчмарк генераторов картинок + сверка с эталонами.
+
+    python -m modules.bench.render_bench                  # замер + сравнение с golden
+    python -m modules.bench.render_bench --only lobby     # только кейсы с "lobby" в имени
+    python -m modules.bench.render_bench --update-golden  # перезаписать эталоны
+    python -m modules.bench.render_bench --save-diffs out # сохранить картинки расхождений
+
+Для каждого кейса: cold — первый рендер (пустые кэши ассетов/тайлов и
+lru_cache генератора), warm — медиана по --iterations повторам, rss — пиковый
+RSS процесса после cold-прогона и его прирост за этот прогон (getrusage: в
+отличие от tracemalloc, видит и буферы Pillow на C). Эталоны — sha256
+декодированных пикселей (RGBA) в modules/bench/golden.json, сняты с исходного
+(до оптимизаций) рендерера; полноразмерные PNG в репозитории не храним.
+Расхождение пикселей или отсутствующий эталон — ненулевой код выхода; с
+--save-diffs картинки таких кейсов сохраняются для просмотра.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import resource
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Callable
+
+from PIL import Image, ImageChops, ImageDraw
+
+from modules.utils.image_assets import clear_caches
+from modules.utils.image_generator import (
+    THEMES,
+    generate_draft_image,
+    generate_final_match_image,
+    generate_leaderboard_image,
+    generate_lobby_image,
+    generate_map_ban_image,
+    generate_profile_card,
+)
+
+GOLDEN_PATH = Path(__file__).resolve().parent / "golden.json"
+MAPS_DIR = Path(__file__).resolve().parents[1] / "maps"
+
+RANKS = [
+    "Iron 1", "Iron 2", "Iron 3", "Bronze 1", "Bronze 2", "Bronze 3",
+    "Silver 1", "Silver 2", "Silver 3", "Gold 1", "Gold 2", "Gold 3",
+    "Platinum 1", "Platinum 2", "Platinum 3", "Diamond 1", "Diamond 2", "Diamond 3",
+    "Ascendant 1", "Ascendant 2", "Ascendant 3", "Immortal 1", "Immortal 2", "Immortal 3",
+    "Radiant", "Unranked",
+]
+
+LATIN_NAMES = ["sweet", "Sanya", "k1ller", "NightOwl", "xX_Pro_Xx", "Jett main", "Omen", "r0ck", "fade", "Viper"]
+CYRILLIC_NAMES = [
+    "Александр Великолепный", "Юрачка", "ОченьДлинныйНикнеймИгрока", "Снайпер из Самары",
+    "Тихий Убийца", "Ёжик в тумане", "Кибер-котлета", "Владислав", "Принцесса Шрека", "Ночной дозор",
+]
+
+
+# ---------- фикстуры ----------
+
+def _players(n: int, *, cyrillic: bool = False, offset: int = 0) -> list[dict]:
+    names = CYRILLIC_NAMES if cyrillic else LATIN_NAMES
+    players = []
+    for i in range(n):
+        pid = 100_000 + offset + i
+        players.append({
+            "id": i + 1,
+            "discord_id": pid,
+            "username": f"{names[i % len(names)]}#{1000 + i}",
+            "display_name": names[(i + 3) % len(names)],
+            "rank": RANKS[(offset + i * 3) % len(RANKS)],
+            "wins": 50 - i * 4,
+            "matches": 80 - i * 3,
+        })
+    return players
+
+
+def _top_ids(players: list[dict]) -> list[int]:
+    return [p["discord_id"] for p in players[:3]]
+
+
+def _draft_players(players: list[dict]) -> list[dict]:
+    out = []
+    for i, p in enumerate(players):
+        out.append({**p, "team": "captain_1" if i % 2 == 0 else "captain_2"})
+    return out
+
+
+def _avatar_bytes(size: int = 256) -> bytes:
+    """Детерминированный «аватар» без сети: диагональный градиент + круг."""
+    img = Image.new("RGBA", (size, size))
+    px = img.load()
+    for y in range(size):
+        for x in range(size):
+            px[x, y] = ((x * 255) // size, (y * 255) // size, 160, 255)
+    ImageDraw.Draw(img).ellipse((size // 4, size // 4, size * 3 // 4, size * 3 // 4), fill=(255, 210, 80, 255))
+    buf = BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _map_names() -> list[str]:
+    return sorted(p.stem for p in MAPS_DIR.glob("*.webp")) or ["Ascent", "Bind", "Haven", "Split"]
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable
+    kwargs: dict
+
+
+def build_cases() -> list[Case]:
+    full = _players(10)
+    cyr = _players(10, cyrillic=True, offset=7)
+    maps = _map_names()
+    avatar = _avatar_bytes()
+
+    cases = [
+        Case("lobby_empty", generate_lobby_image, {"players": [], "top_ids": []}),
+        Case("lobby_half", generate_lobby_image, {"players": full[:5], "top_ids": _top_ids(full)}),
+        Case("lobby_full", generate_lobby_image, {"players": full, "top_ids": _top_ids(full)}),
+        Case("lobby_full_cyrillic", generate_lobby_image, {"players": cyr, "top_ids": _top_ids(cyr)}),
+        Case("draft_full", generate_draft_image, {
+            "players": _draft_players(full[2:]),
+            "captain_1_id": full[0]["discord_id"],
+            "captain_2_id": full[1]["discord_id"],
+            "top_ids": _top_ids(full),
+        }),
+        Case("draft_full_cyrillic", generate_draft_image, {
+            "players": _draft_players(cyr[2:]),
+            "captain_1_id": cyr[0]["discord_id"],
+            "captain_2_id": cyr[1]["discord_id"],
+            "top_ids": _top_ids(cyr),
+        }),
+        Case("map_ban_start", generate_map_ban_image, {
+            "available_maps": maps, "banned_maps": [], "current_captain": "sweet",
+        }),
+        Case("map_ban_mid", generate_map_ban_image, {
+            "available_maps": maps[len(maps) // 2:], "banned_maps": maps[:len(maps) // 2],
+            "current_captain": "Александр Великолепный",
+        }),
+        Case("final_match", generate_final_match_image, {
+            "selected_map": maps[0],
+            "attack_players": [p["display_name"] for p in full[:5]],
+            "defense_players": [p["display_name"] for p in cyr[:5]],
+        }),
+    ]
+
+    for theme in THEMES:
+        cases.append(Case(f"leaderboard_{theme}", generate_leaderboard_image, {"players": full, "theme": theme}))
+
+    # все тиры рангов в профиле; тему профиль-карта не учитывает — темы не перебираем
+    for rank in RANKS:
+        slug = rank.lower().replace(" ", "_")
+        cases.append(Case(f"profile_{slug}", generate_profile_card, {
+            "discord_name": "sweet", "riot_username": "sweet#RU1", "rank": rank,
+            "wins": 42, "matches": 70, "avatar_bytes": avatar, "win_streak": 3, "favorite_map": maps[0],
+        }))
+    # заглушка вместо аватара, кириллица, нулевая статистика
+    cases.append(Case("profile_no_avatar", generate_profile_card, {
+        "discord_name": "Юрачка", "riot_username": "Ёжик в тумане#RU2", "rank": "Immortal 3",
+        "wins": 0, "matches": 0, "avatar_bytes": None,
+    }))
+    return cases
+
+
+# ---------- замер ----------
+
+@dataclass
+class CaseResult:
+    name: str
+    cold_ms: float
+    warm_ms: float
+    rss_peak_mb: float
+    rss_growth_kb: float
+    golden: str  # ok / diff / missing / updated
+
+
+def _render(case: Case) -> Image.Image:
+    # оверлеи тем (вопросики/сердечки) рандомные — фиксируем seed на кейс
+    random.seed(case.name)
+    buf = case.fn(**case.kwargs, as_bytes=True)
+    return Image.open(buf).convert("RGBA")
+
+
+def _digest(img: Image.Image) -> str:
+    h = hashlib.sha256(f"{img.width}x{img.height}:".encode("ascii"))
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def load_goldens() -> dict[str, str]:
+    try:
+        return json.loads(GOLDEN_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+
+
+def _compare(name: str, img: Image.Image, goldens: dict[str, str], update: bool, diffs_dir: Path | None) -> str:
+    digest = _digest(img)
+    if update:
+        goldens[name] = digest
+        return "updated"
+    if name not in goldens:
+        status = "missing"
+    elif goldens[name] == digest:
+        return "ok"
+    else:
+        status = "diff"
+    if diffs_dir is not None:
+        diffs_dir.mkdir(parents=True, exist_ok=True)
+        img.save(diffs_dir / f"{name}.png")
+    return status
+
+
+def _max_rss_kb() -> float:
+    # ru_maxrss: на Linux в KB, на macOS в байтах
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform == "darwin" else float(rss)
+
+
+def run_case(
+        case: Case,
+        iterations: int,
+        goldens: dict[str, str],
+        update_golden: bool,
+        diffs_dir: Path | None = None,
+) -> CaseResult:
+    clear_caches()
+
+    rss_before = _max_rss_kb()
+    started = time.perf_counter()
+    img = _render(case)
+    cold_ms = (time.perf_counter() - started) * 1000
+    rss_after = _max_rss_kb()
+    # пик RSS монотонен: прирост виден, только если кейс поднял его выше прошлых
+    rss = (rss_after / 1024, rss_after - rss_before)
+
+    warm = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        again = _render(case)
+        warm.append((time.perf_counter() - started) * 1000)
+
+    # тёплый рендер (с кэшами) обязан совпадать с холодным
+    if ImageChops.difference(img, again).getbbox() is not None:
+        return CaseResult(case.name, cold_ms, statistics.median(warm), *rss, "cache-mismatch")
+
+    status = _compare(case.name, img, goldens, update_golden, diffs_dir)
+    return CaseResult(case.name, cold_ms, statistics.median(warm), *rss, status)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк генераторов картинок")
+    parser.add_argument("--iterations", type=int, default=5, help="сколько тёплых прогонов на кейс")
+    parser.add_argument("--only", default="", help="подстрока имени кейса")
+    parser.add_argument("--update-golden", action="store_true", help="перезаписать эталонные хэши")
+    parser.add_argument("--save-diffs", type=Path, default=None, help="куда сохранить картинки несовпавших кейсов")
+    parser.add_argument("--json", action="store_true", help="вывести результаты в JSON")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in build_cases() if args.only in c.name]
+    goldens = load_goldens()
+    results = [
+        run_case(c, max(1, args.iterations), goldens, args.update_golden, args.save_diffs)
+        for c in cases
+    ]
+    if args.update_golden:
+        GOLDEN_PATH.write_text(json.dumps(goldens, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    if args.json:
+        print(json.dumps([asdict(r) for r in results], ensure_ascii=False, indent=2))
+    else:
+        print(f"{'case':<32}{'cold ms':>10}{'warm ms':>10}{'rss MB':>10}{'+rss KB':>10}  golden")
+        for r in results:
+            print(
+                f"{r.name:<32}{r.cold_ms:>10.1f}{r.warm_ms:>10.1f}"
+                f"{r.rss_peak_mb:>10.1f}{r.rss_growth_kb:>10.0f}  {r.golden}"
+            )
+
+    failed = [r for r in results if r.golden in {"diff", "missing", "cache-mismatch"}]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
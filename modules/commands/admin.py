@@ -1,4 +1,3 @@
-import asyncio
 import os
 from datetime import datetime, timedelta, timezone
 
@@ -6,9 +5,14 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-from modules.utils.rank_sync import ensure_fresh_rank
 from modules.utils import api_client
-from modules.utils.valorant_api import ValorantRankError
+from modules.utils.render_pool import get_render_stats
+from modules.utils.single_flight import get_single_flight_stats
+from modules.utils.cache_events import get_cache_events_stats
+from modules.utils.rank_store import get_rank_store_stats
+from modules.utils.henrik_scheduler import get_henrik_scheduler_stats
+from modules.utils.rank_refresher import get_rank_refresher_stats
+from modules.utils.rank_sync_job import rank_sync_job
 
 
 def _parse_role_ids(env_name: str) -> list[int]:
@@ -80,90 +84,84 @@ class Admin(commands.Cog):
         self.bot = bot
 
     @app_commands.command(name="syncallranks", description="Синхронизировать ранги всех игроков через HenrikDev")
+    @app_commands.describe(restart="Начать заново, а не продолжить сохранённый прогресс")
     @admin_only()
-    async def sync_all_ranks(self, interaction: discord.Interaction):
+    async def sync_all_ranks(self, interaction: discord.Interaction, restart: bool = False):
         """
-        Медленный, но гарантированный синк:
-        - идём по игрокам ПО ОЧЕРЕДИ (без gather, без параллелизма)
-        - внутри ensure_fresh_rank уже есть rate-limit HenrikDev
+        Синк идёт фоновой задачей (rank_sync_job): прогресс сохраняется на диск,
+        на 429 задача ждёт и продолжает, отчёт о завершении приходит в этот канал.
         """
         await interaction.response.defer(ephemeral=True, thinking=True)
-
         try:
-            players = await api_client.get_all_players()
+            result = await rank_sync_job.start(
+                channel_id=interaction.channel_id,
+                user_id=interaction.user.id,
+                restart=restart,
+            )
         except Exception as e:
-            await interaction.followup.send(f"❌ Не удалось получить список игроков: {e}", ephemeral=True)
+            await interaction.followup.send(f"❌ Не удалось запустить синхронизацию: {e}", ephemeral=True)
             return
 
-        if not players:
-            await interaction.followup.send("⚠️ В базе нет игроков.", ephemeral=True)
+        st = rank_sync_job.status()
+        if result == "running":
+            text = f"⏳ Синхронизация уже идёт: {st['processed']}/{st['total']}. Статус — /syncstatus."
+        elif result == "resumed":
+            text = (
+                f"▶️ Синхронизация продолжена с сохранённого места: {st['processed']}/{st['total']}.\n"
+                f"Статус — /syncstatus, пауза — /syncpause."
+            )
+        else:
+            text = (
+                f"🚀 Синхронизация запущена в фоне: игроков {st['total']}.\n"
+                f"Статус — /syncstatus, пауза — /syncpause. Отчёт придёт в этот канал."
+            )
+        await interaction.followup.send(text, ephemeral=True)
+
+    @app_commands.command(name="syncstatus", description="Прогресс синхронизации рангов")
+    @admin_only()
+    async def sync_status(self, interaction: discord.Interaction):
+        st = rank_sync_job.status()
+        if st["status"] == "idle":
+            await interaction.response.send_message("ℹ️ Синхронизация рангов ещё не запускалась.", ephemeral=True)
             return
 
-        total = len(players)
-        updated = 0
-        skipped_no_riot = 0
-        errors = 0
-
-        for idx, p in enumerate(players, start=1):
-            discord_id = p.get("discord_id")
-            username = p.get("username")
-
-            if not discord_id:
-                skipped_no_riot += 1
-                continue
-
-            # можно с кастомным Riot ID, если он есть
-            riot_id = (username or "").strip()
-
-            if not riot_id:
-                skipped_no_riot += 1
-                continue
-
-            try:
-                changed = await ensure_fresh_rank(
-                    discord_id=int(discord_id),
-                    username=riot_id,
-                    force=True,
-                    allow_unranked_overwrite=False,
-                    return_updated_only=True,
-                    raise_on_fetch_error=True,
-                )
-                if changed:
-                    updated += 1
-
-            except ValorantRankError as e:
-                msg = str(e).lower()
-                # если словили лимит 429 — сразу останавливаемся
-                if "429" in msg or "лимит" in msg or "rate limit" in msg:
-                    await interaction.followup.send(
-                        f"⚠️ Остановлено из-за лимита HenrikDev (429).\n"
-                        f"Всего игроков: {total}\n"
-                        f"Успешно обновлено: {updated}\n"
-                        f"Без Riot ID: {skipped_no_riot}\n"
-                        f"Ошибок (кроме лимита): {errors}",
-                        ephemeral=True,
-                    )
-                    return
-                errors += 1
-                continue
-
-            except Exception:
-                errors += 1
-                continue
-
-            # чуть отдаём управление циклу событий, чтобы бот не зависал
-            await asyncio.sleep(0)
+        if st["running"] and (st["throttled"] or st["henrik_paused_for"]):
+            state = f"⏸ ждём лимит HenrikDev ({st['henrik_paused_for']}s)"
+        elif st["running"]:
+            state = "⏳ идёт"
+        else:
+            state = {"paused": "⏸ на паузе", "done": "✅ завершена", "failed": "❌ остановлена"}.get(
+                st["status"], st["status"]
+            )
+
+        embed = discord.Embed(title="🔄 Синхронизация рангов", color=discord.Color.blurple())
+        embed.add_field(name="Состояние", value=state, inline=False)
+        embed.add_field(name="Прогресс", value=f"{st['processed']}/{st['total']}", inline=True)
+        embed.add_field(name="Обновлено", value=str(st["updated"]), inline=True)
+        embed.add_field(name="Ошибок", value=str(st["errors"]), inline=True)
+        embed.add_field(name="429", value=str(st["rate_limited"]), inline=True)
+        if st["per_min"]:
+            embed.add_field(name="Скорость", value=f"{st['per_min']} игроков/мин", inline=True)
+        if st["eta_s"] is not None:
+            embed.add_field(name="Осталось", value=f"~{timedelta(seconds=st['eta_s'])}", inline=True)
+        if st["last_error"]:
+            embed.add_field(name="Ошибка", value=st["last_error"][:1000], inline=False)
+        embed.set_footer(text=f"Запущена {datetime.fromtimestamp(st['started_at'], timezone.utc):%Y-%m-%d %H:%M} UTC")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
 
+    @app_commands.command(name="syncpause", description="Поставить синхронизацию рангов на паузу")
+    @admin_only()
+    async def sync_pause(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        if not await rank_sync_job.pause():
+            await interaction.followup.send("ℹ️ Синхронизация сейчас не идёт.", ephemeral=True)
+            return
+        st = rank_sync_job.status()
         await interaction.followup.send(
-            f"✅ Синхронизация завершена.\n"
-            f"Всего игроков: {total}\n"
-            f"Обновлено рангов: {updated}\n"
-            f"Без Riot ID: {skipped_no_riot}\n"
-            f"Ошибок: {errors}",
+            f"⏸ Синхронизация на паузе: {st['processed']}/{st['total']}. Продолжить — /syncallranks.",
             ephemeral=True,
         )
 
-
     @app_commands.command(name="changewins", description="Установить количество побед игрока")
     @app_commands.describe(user="Участник", wins="Новое количество побед")
     @admin_only()
@@ -293,6 +291,71 @@ class Admin(commands.Cog):
         else:
             await interaction.followup.send("❌ Не удалось выдать бан. Возможно, профиль не найден.", ephemeral=True)
 
+    @app_commands.command(name="botstats", description="Метрики кэшей, рендера и дедупликации запросов")
+    @admin_only()
+    async def botstats(self, interaction: discord.Interaction):
+        render = get_render_stats()
+        cache = render.get("cache") or {}
+
+        lines = [
+            f"jobs={render['jobs']} failed={render['failed']} rejected={render['rejected']} "
+            f"in_flight={render['in_flight']}",
+            f"avg_run={render['avg_run_ms']}ms avg_wait={render['avg_wait_ms']}ms max_run={render['max_run_ms']}ms",
+            f"png cache: hits={cache.get('hits', 0)} misses={cache.get('misses', 0)} items={cache.get('items', 0)}",
+        ]
+        flights = [
+            f"{name}: calls={st['calls']} executed={st['executed']} dedup={st['deduplicated']} ({st['dedup_rate']:.0%})"
+            for name, st in get_single_flight_stats().items()
+        ]
+
+        from modules.lobby.lobby import profiles_cache  # лениво: лобби тянет за собой драфт и рендер
+
+        pc = profiles_cache.stats()
+        profiles = [
+            f"size={pc['size']}/{pc['max_size']} hit_ratio={pc['hit_ratio']:.0%} "
+            f"(fresh={pc['hits']} stale={pc['stale_hits']} miss={pc['misses']})",
+            f"refreshes={pc['refreshes']} avg={pc['avg_refresh_ms']}ms max={pc['max_refresh_ms']}ms "
+            f"evictions={pc['evictions']} invalidations={pc['invalidations']}",
+        ]
+        events = get_cache_events_stats()
+        if events["enabled"]:
+            profiles.append(f"push: received={events['received']}")
+        else:
+            profiles.append("push: выключено (TTL)")
+
+        hs = get_henrik_scheduler_stats()
+        henrik = [
+            f"rate={hs['rate_per_min']}/{hs['base_rate_per_min']} per min queued={hs['queued']} "
+            f"paused={hs['paused_for']}s 429={hs['throttled']}",
+            *(
+                f"{name}: granted={c['granted']} avg_wait={c['avg_wait_ms']}ms max_wait={c['max_wait_ms']}ms"
+                for name, c in hs["classes"].items()
+            ),
+        ]
+        rf = get_rank_refresher_stats()
+        if rf["running"]:
+            refresher = (
+                f"refreshed={rf['refreshed']} (active={rf['active_refreshed']}) failed={rf['failed']} "
+                f"passes={rf['passes']} queued={rf['active_queued']} budget_wait={rf['budget_wait_s']}s "
+                f"after={rf['refresh_after_h']}h"
+            )
+        else:
+            refresher = "выключено" if not rf["enabled"] else "не запущено"
+        rs = get_rank_store_stats()
+        ranks = (
+            f"rows={rs['rows']}/{rs['max_rows']} hits={rs['hits']} negative={rs['negative_hits']} "
+            f"misses={rs['misses']} evictions={rs['evictions']}"
+        )
+
+        embed = discord.Embed(title="📈 Статистика бота", color=discord.Color.blurple())
+        embed.add_field(name=f"🖼 Рендер ({render['kind']})", value="```" + "\n".join(lines) + "```", inline=False)
+        embed.add_field(name="👤 Кэш профилей", value="```" + "\n".join(profiles) + "```", inline=False)
+        embed.add_field(name="🎯 Кэш рангов HenrikDev", value="```" + ranks + "```", inline=False)
+        embed.add_field(name="⏱ Очередь HenrikDev", value="```" + "\n".join(henrik) + "```", inline=False)
+        embed.add_field(name="🔄 Фоновое обновление рангов", value="```" + refresher + "```", inline=False)
+        embed.add_field(name="🔁 Single-flight", value="```" + ("\n".join(flights) or "—") + "```", inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(name="adminhelp", description="Показать команды администратора")
     @admin_only()
     async def adminhelp(self, interaction: discord.Interaction):
@@ -307,9 +370,11 @@ class Admin(commands.Cog):
                         inline=False),
         embed.add_field(
             name="/syncallranks",
-            value="Синхронизировать ранги всех игроков через HenrikDev",
+            value="Синхронизировать ранги всех игроков через HenrikDev (в фоне, с продолжением)",
             inline=False,
         )
+        embed.add_field(name="/syncstatus · /syncpause", value="Прогресс и пауза синхронизации рангов", inline=False)
+        embed.add_field(name="/botstats", value="Метрики кэшей, рендера и дедупликации запросов", inline=False)
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 
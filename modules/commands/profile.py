@@ -5,9 +5,10 @@ import asyncio
 import os
 
 from modules.utils import api_client
-from modules.utils.valorant_api import fetch_valorant_rank, ValorantRankError
+from modules.utils.valorant_api import fetch_rank_info, ValorantRankError
 from modules.utils.rank_sync import riot_id_is_valid
-from modules.utils.image_generator import generate_profile_card
+from modules.utils.render_pool import render_profile_card
+from modules.utils.avatar_cache import fetch_avatar
 
 
 
@@ -145,9 +146,12 @@ class EditProfileModal(discord.ui.Modal, title="Обновить Riot ID и ра
         rank = None
         region_used = "—"
         rank_warning = ""
+        account_kwargs = {}
 
         try:
-            rank, region_used = await fetch_valorant_rank(riot_id_value)
+            info = await fetch_rank_info(riot_id_value)
+            rank, region_used = info.rank, info.region
+            account_kwargs = {"riot_puuid": info.puuid, "riot_region": info.region}
         except ValorantRankError as e:
             rank_warning = f"\n⚠️ Ранг сейчас не удалось обновить: `{e}`"
         except Exception:
@@ -162,6 +166,7 @@ class EditProfileModal(discord.ui.Modal, title="Обновить Riot ID и ра
                 username=riot_id_value,
                 rank=payload_rank,
                 create_if_not_exist=True,
+                **account_kwargs,
             )
             rank_text = rank or "оставлен прежний"
 
@@ -220,17 +225,12 @@ async def send_profile_card(interaction: discord.Interaction, edit: bool = False
     # если у тебя уже есть matches в API — используем, иначе 0
     matches = int((profile or {}).get("matches") or 0)
 
-    # аватар Discord (bytes)
-    avatar_bytes = None
-    try:
-        url = interaction.user.display_avatar.replace(size=256).url
-        session = getattr(interaction.client, "http_session", None)
-        if session:
-            async with session.get(url) as resp:
-                if resp.status == 200:
-                    avatar_bytes = await resp.read()
-    except Exception:
-        avatar_bytes = None
+    # аватар Discord (bytes) — из кэша по хэшу аватара, CDN только при промахе
+    avatar_key, avatar_bytes = await fetch_avatar(
+        interaction.user,
+        getattr(interaction.client, "http_session", None),
+        size=256,
+    )
 
     win_streak = (profile or {}).get("win_streak")
     try:
@@ -244,19 +244,20 @@ async def send_profile_card(interaction: discord.Interaction, edit: bool = False
     theme = (profile or {}).get("profile_theme") or os.getenv("PROFILE_THEME", "default")
 
     # генерим картинку
-    out_path = generate_profile_card(
+    image = await render_profile_card(
         discord_name=interaction.user.name,
         riot_username=riot_id,
         rank=rank,
         wins=wins,
         matches=matches,
         avatar_bytes=avatar_bytes,
+        avatar_key=avatar_key,
         theme=theme,
         win_streak=win_streak,
         favorite_map=favorite_map,
     )
 
-    file = discord.File(fp=str(out_path), filename="profile.png")
+    file = discord.File(fp=image, filename="profile.png")
 
     embed = discord.Embed()
     embed.set_image(url="attachment://profile.png")
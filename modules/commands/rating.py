@@ -3,7 +3,7 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from modules.utils import api_client
-from modules.utils.image_generator import generate_leaderboard_image
+from modules.utils.render_pool import render_leaderboard_image
 
 def _parse_allowed_roles(raw: str) -> list[int]:
     out: list[int] = []
@@ -45,11 +45,30 @@ async def _attach_display_names(guild: discord.Guild | None, data: list[dict]) -
         if member:
             p["display_name"] = member.display_name
 
+LEADERBOARD_PAGE_SIZE = 10  # строк на картинке лидерборда
+
+
+async def _load_page(after: str | None) -> dict | None:
+    page = await api_client.get_leaderboard_page(after, LEADERBOARD_PAGE_SIZE)
+    if page is None and after is None:
+        # бэкенд без постраничного эндпоинта — хотя бы топ-10
+        rows = await api_client.get_top10_players()
+        if isinstance(rows, list) and rows:
+            page = {"results": rows, "next": None}
+    return page
+
+
+async def _render_page(guild: discord.Guild | None, page: dict, start_place: int):
+    data = page["results"]
+    await _attach_display_names(guild, data)
+    return await render_leaderboard_image(data, start_place=start_place)
+
+
 class Rating(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
-    @app_commands.command(name="leaderboard", description="Показать топ-10 игроков по победам")
+    @app_commands.command(name="leaderboard", description="Показать таблицу лидеров по победам")
     async def leaderboard(self, interaction: discord.Interaction):
         if not _has_access(interaction.user):
             await interaction.response.send_message("❌ У вас нет доступа к этой команде.", ephemeral=True)
@@ -58,33 +77,69 @@ class Rating(commands.Cog):
         await interaction.response.defer()
 
         try:
-            data = await api_client.get_top10_players()
+            page = await _load_page(None)
         except Exception as e:
             await interaction.followup.send(f"❌ API недоступен: `{e}`", ephemeral=True)
             return
-        if not isinstance(data, list) or not data:
+        if not page or not page["results"]:
             await interaction.followup.send("❌ Не удалось загрузить таблицу лидеров.", ephemeral=True)
             return
 
-        await _attach_display_names(interaction.guild, data)
-
         try:
-            image_path = generate_leaderboard_image(data)
+            image = await _render_page(interaction.guild, page, start_place=1)
         except Exception as e:
             await interaction.followup.send(f"❌ Ошибка генерации лидерборда: `{e}`", ephemeral=True)
             return
-        file = discord.File(image_path, filename="leaderboard.png")
+        file = discord.File(image, filename="leaderboard.png")
 
-        view = Top10View()
+        view = LeaderboardView(next_cursor=page.get("next"))
 
         await interaction.followup.send(file=file, view=view)
 
-class Top10View(discord.ui.View):
-    def __init__(self):
+    @app_commands.command(name="place", description="Место игрока в таблице лидеров")
+    @app_commands.describe(member="Чьё место показать (по умолчанию — твоё)")
+    async def place(self, interaction: discord.Interaction, member: discord.Member | None = None):
+        if not _has_access(interaction.user):
+            await interaction.response.send_message("❌ У вас нет доступа к этой команде.", ephemeral=True)
+            return
+
+        target = member or interaction.user
+        await interaction.response.defer(ephemeral=True)
+
+        try:
+            data = await api_client.get_player_position(target.id)
+        except Exception as e:
+            await interaction.followup.send(f"❌ API недоступен: `{e}`", ephemeral=True)
+            return
+        if not data:
+            await interaction.followup.send(f"❌ {target.display_name} ещё нет в рейтинге.", ephemeral=True)
+            return
+
+        await interaction.followup.send(
+            f"🏆 **{target.display_name}** — {data['place']} место из {data['total']} "
+            f"({data.get('wins', 0)}W / {data.get('matches', 0)} матчей, {data.get('winrate', 0)}%)",
+            ephemeral=True,
+        )
+
+
+class LeaderboardView(discord.ui.View):
+    """
+    Листание лидерборда по 10 строк. Пагинация keyset-курсорами: храним курсор
+    начала каждой открытой страницы, «назад» — просто предыдущий из списка.
+    """
+
+    def __init__(self, next_cursor: str | None):
         super().__init__(timeout=None)
+        self.cursors: list[str | None] = [None]  # курсор начала страницы i
+        self.page_index = 0
+        self.next_cursor = next_cursor
+        self._sync_buttons()
 
-    @discord.ui.button(label="🔄 Обновить", style=discord.ButtonStyle.secondary)
-    async def refresh(self, interaction: discord.Interaction, button: discord.ui.Button):
+    def _sync_buttons(self):
+        self.prev_page.disabled = self.page_index == 0
+        self.next_page.disabled = not self.next_cursor
+
+    async def _show(self, interaction: discord.Interaction, page_index: int, cursor: str | None):
         if not _has_access(interaction.user):
             await interaction.response.send_message("❌ У вас нет доступа к этой команде.", ephemeral=True)
             return
@@ -92,24 +147,47 @@ class Top10View(discord.ui.View):
         await interaction.response.defer()
 
         try:
-            data = await api_client.get_top10_players()
+            page = await _load_page(cursor)
         except Exception as e:
             await interaction.followup.send(f"❌ API недоступен: `{e}`", ephemeral=True)
             return
-        if not isinstance(data, list) or not data:
+        if not page or not page["results"]:
             await interaction.followup.send("❌ Не удалось обновить список лидеров.", ephemeral=True)
             return
 
-        await _attach_display_names(interaction.guild, data)
-
+        start_place = int(page["results"][0].get("place") or page_index * LEADERBOARD_PAGE_SIZE + 1)
         try:
-            image_path = generate_leaderboard_image(data)
+            image = await _render_page(interaction.guild, page, start_place=start_place)
         except Exception as e:
             await interaction.followup.send(f"❌ Ошибка генерации лидерборда: `{e}`", ephemeral=True)
             return
-        file = discord.File(image_path, filename="leaderboard.png")
+        file = discord.File(image, filename="leaderboard.png")
+
+        self.page_index = page_index
+        del self.cursors[page_index + 1:]
+        if page_index == len(self.cursors):
+            self.cursors.append(cursor)
+        self.next_cursor = page.get("next")
+        self._sync_buttons()
+
+        await interaction.edit_original_response(attachments=[file], view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        index = max(0, self.page_index - 1)
+        await self._show(interaction, index, self.cursors[index])
+
+    @discord.ui.button(label="🔄 Обновить", style=discord.ButtonStyle.secondary)
+    async def refresh(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._show(interaction, self.page_index, self.cursors[self.page_index])
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if not self.next_cursor:
+            await interaction.response.defer()
+            return
+        await self._show(interaction, self.page_index + 1, self.next_cursor)
 
-        await interaction.edit_original_response(attachments=[file])
 
 async def setup(bot):
     await bot.add_cog(Rating(bot))
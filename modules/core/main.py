@@ -19,7 +19,9 @@ from discord.ext import commands, tasks
 from loguru import logger
 
 from modules.lobby.lobby import LobbyMenuView
-from modules.utils import api_client, valorant_api
+from modules.utils import api_client, valorant_api, render_pool, cache_events, rank_store
+from modules.utils.rank_refresher import rank_refresher
+from modules.utils.rank_sync_job import rank_sync_job
 from modules.utils.api_client import ensure_api_config
 
 def get_env_int(name: str, default: int = 0) -> int:
@@ -113,6 +115,23 @@ async def setup_hook():
     api_client.set_http_session(bot.http_session)
     valorant_api.set_http_session(bot.http_session)
 
+    # Рендер картинок — в отдельном пуле, чтобы Pillow не блокировал gateway;
+    # воркеры поднимаются сразу и прогревают кэш шаблонов/иконок рангов
+    render_pool.start_render_pool()
+
+    # Уведомления от Django об изменении игроков — сбрасывают кэши профилей
+    try:
+        await cache_events.start_server()
+    except Exception as e:
+        logger.error(f"❌ Не удалось запустить приёмник уведомлений: {e}")
+
+    # Ранги обновляются заранее в фоне, на свободном бюджете HenrikDev
+    rank_refresher.start()
+
+    # /syncallranks, прерванный рестартом, продолжается с сохранённого курсора
+    rank_sync_job.bind(bot)
+    rank_sync_job.resume_pending()
+
     _original_close = bot.close
 
     async def _close_with_http():
@@ -120,12 +139,21 @@ async def setup_hook():
             if refresh_lobby_panel_view.is_running():
                 refresh_lobby_panel_view.cancel()
 
+            # фоновые задачи — до закрытия HTTP-сессий: иначе их запросы упадут
+            # на закрытой сессии и посчитаются ошибками
+            await rank_sync_job.shutdown()
+            await rank_refresher.stop()
+
             if hasattr(api_client, "close_http_session"):
                 await api_client.close_http_session()
             if hasattr(valorant_api, "close_http_session"):
                 await valorant_api.close_http_session()
             if hasattr(bot, "http_session") and bot.http_session and not bot.http_session.closed:
                 await bot.http_session.close()
+
+            await cache_events.stop_server()
+            await render_pool.shutdown_render_pool()
+            rank_store.close_rank_store()
         finally:
             await _original_close()
 
@@ -4,7 +4,7 @@ from loguru import logger
 from discord import File
 from modules.utils import api_client
 from modules.utils.api_client import get_leaderboard_top
-from modules.utils.image_generator import generate_draft_image, generate_map_ban_image, generate_final_match_image
+from modules.utils.render_pool import render_draft_image, render_map_ban_image, render_final_match_image
 import os
 
 def _parse_role_ids(env_name: str) -> list[int]:
@@ -122,44 +122,38 @@ class Draft:
             logger.warning(f"Не удалось отредактировать сообщение драфта: {e}. Пошлём новое.")
             await self.channel.send("✅ Драфт завершён. Команды сформированы.")
 
+        # все профили (капитаны + команды) — одним запросом
+        team_1 = [self.captains[0]] + self.teams[self.captains[0]]
+        team_2 = [self.captains[1]] + self.teams[self.captains[1]]
+        profiles = await api_client.get_player_profiles([m.id for m in team_1 + team_2])
+
         players_data = []
-        for member in [self.captains[0]] + self.teams[self.captains[0]]:
-            profile = await api_client.get_player_profile(member.id)
-            if profile:
-                players_data.append({
-                    "id": profile["id"],
-                    "discord_id": member.id,
-                    "username": profile["username"],
-                    "display_name": member.display_name,
-                    "rank": profile["rank"],
-                    "team": "captain_1",
-                })
-
-        for member in [self.captains[1]] + self.teams[self.captains[1]]:
-            profile = await api_client.get_player_profile(member.id)
-            if profile:
-                players_data.append({
-                    "id": profile["id"],
-                    "discord_id": member.id,
-                    "username": profile["username"],
-                    "display_name": member.display_name,
-                    "rank": profile["rank"],
-                    "team": "captain_2",
-                })
+        for team_key, members in (("captain_1", team_1), ("captain_2", team_2)):
+            for member in members:
+                profile = profiles.get(member.id)
+                if profile:
+                    players_data.append({
+                        "id": profile["id"],
+                        "discord_id": member.id,
+                        "username": profile["username"],
+                        "display_name": member.display_name,
+                        "rank": profile["rank"],
+                        "team": team_key,
+                    })
 
         # Генерируем и отправляем картинку
-        capt1 = await api_client.get_player_profile(self.captains[0].id) or {}
-        capt2 = await api_client.get_player_profile(self.captains[1].id) or {}
+        capt1 = profiles.get(self.captains[0].id) or {}
+        capt2 = profiles.get(self.captains[1].id) or {}
 
         top_ids = await get_leaderboard_top(3)
-        image_path = generate_draft_image(
+        image = await render_draft_image(
             players_data,
             captain_1_id=capt1.get("id"),
             captain_2_id=capt2.get("id"),
             top_ids=top_ids,
         )
 
-        file = discord.File(image_path, filename="draft_dynamic.png")
+        file = discord.File(image, filename="draft_dynamic.png")
         try:
             if self.draft_message:
                 await self.draft_message.edit(
@@ -185,12 +179,12 @@ class Draft:
         # первым ходит второй капитан — как у тебя и было
         self.current_captain = self.captains[1]
 
-        image_path = generate_map_ban_image(
+        image = await render_map_ban_image(
             available_maps=self.available_maps,
             banned_maps=self.banned_maps,
             current_captain=self.current_captain.display_name
         )
-        file = discord.File(image_path, filename="map_draft_dynamic.png")
+        file = discord.File(image, filename="map_draft_dynamic.png")
 
         # одно «живое» сообщение: картинка + кнопки
         self.map_message = await self.channel.send(
@@ -212,9 +206,16 @@ class Draft:
             self._match_created = True
         """Сохраняем матч в Django. Перед этим валидируем профили всех участников."""
         try:
+            all_members = (
+                list(self.captains)
+                + self.teams[self.captains[0]]
+                + self.teams[self.captains[1]]
+            )
+            profiles = await api_client.get_player_profiles([m.id for m in all_members])
+
             async def require_id(member: discord.Member) -> int | None:
                 """Возвращает Django ID игрока или None, если профиля нет."""
-                profile = await api_client.get_player_profile(member.id)
+                profile = profiles.get(member.id)
                 if profile and "id" in profile:
                     return profile["id"]
                 # дружелюбное сообщение в канал
@@ -268,28 +269,17 @@ class Draft:
                 "discord_channel_id": self.channel.id if self.channel else None,
             }
 
-            match_data = await api_client.create_match(match_payload)
+            # создание + READY + IN_PROGRESS — один запрос и одна транзакция в Django
+            ok, match_data = await api_client.create_and_start_match(match_payload)
             mid = match_data.get("id")
-            if not mid:
+            if not ok or not mid:
                 self._match_created = False
-                await self.channel.send("❌ Матч не создался в Django. Повторите позже.")
+                await self.channel.send(f"❌ Матч не запустился в Django: `{match_data}`")
                 return
 
             self.match_id = mid
             self.lobby.match_id = mid
 
-            ok, ready_data = await api_client.mark_match_ready(mid)
-            if not ok:
-                self._match_created = False
-                await self.channel.send(f"❌ Матч создан, но не переведён в READY: `{ready_data}`")
-                return
-
-            ok, started_data = await api_client.start_match(mid)
-            if not ok:
-                self._match_created = False
-                await self.channel.send(f"❌ Матч создан, но не запущен в Django: `{started_data}`")
-                return
-
             logger.success(f"Матч сохранён в Django: {match_data}")
         except Exception as e:
             self._match_created = False
@@ -309,13 +299,13 @@ class Draft:
             attack_team_members = [self.captains[1]] + self.teams[self.captains[1]]
             defense_team_members = [self.captains[0]] + self.teams[self.captains[0]]
 
-        image_path = generate_final_match_image(
+        image = await render_final_match_image(
             selected_map=self.selected_map,
             attack_players=[m.display_name for m in attack_team_members],
             defense_players=[m.display_name for m in defense_team_members],
         )
 
-        file = File(image_path, filename="final_match_dynamic.png")
+        file = File(image, filename="final_match_dynamic.png")
         await self.channel.send(
             file=file,
             content=None,
@@ -452,12 +442,12 @@ class MapButton(discord.ui.Button):
 
         # иначе — обновляем картинку и передаём ход другому
         self.draft.switch_captain()
-        img = generate_map_ban_image(
+        image = await render_map_ban_image(
             available_maps=self.draft.available_maps,
             banned_maps=self.draft.banned_maps,
             current_captain=self.draft.current_captain.display_name
         )
-        file = discord.File(img, filename="map_draft_dynamic.png")
+        file = discord.File(image, filename="map_draft_dynamic.png")
 
         # редактируем то же сообщение с картинкой
         if self.draft.map_message:
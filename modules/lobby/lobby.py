@@ -10,13 +10,20 @@ from loguru import logger
 import asyncio
 import time
 import os
-from modules.utils.image_generator import generate_lobby_image
+from modules.utils.render_pool import render_lobby_image
 from modules.utils.api_client import is_banned, get_leaderboard_top
 from modules.utils.utils import render_ban_message
 from modules.utils.rank_sync import riot_id_is_valid
-from modules.utils.valorant_api import fetch_valorant_rank, ValorantRankError
+from modules.utils.valorant_api import fetch_rank_info, ValorantRankError
 import uuid
+from collections import OrderedDict
 from modules.utils.rank_sync import ensure_fresh_rank
+from modules.utils.single_flight import SingleFlight
+from modules.utils.henrik_scheduler import Priority
+from modules.utils import cache_events, rank_refresher
+
+# Окно, в которое склеиваем join/leave в одну перерисовку и одно редактирование сообщения.
+LOBBY_IMAGE_DEBOUNCE = float(os.getenv("LOBBY_IMAGE_DEBOUNCE", "1.5"))
 
 LOBBY_COUNTERS = {
     "2x2": 0,
@@ -75,28 +82,150 @@ def is_king_event_open() -> bool:
 
 #PRIZES_TEXT = ()
 
+# Кэш профилей: свежие ttl секунд; после — отдаём устаревшие сразу и обновляем
+# в фоне (stale-while-revalidate), но не дольше max_stale: дальше ждём загрузку.
+# Пока работает приёмник уведомлений от Django (cache_events), изменённые
+# профили сбрасываются сразу — тогда действуют длинные PUSH-лимиты. Если он не
+# запущен (нет секрета, порт занят), сбросов нет и остаются короткие.
+PROFILES_CACHE_TTL = float(os.getenv("PROFILES_CACHE_TTL", "60"))
+PROFILES_CACHE_MAX_STALE = float(os.getenv("PROFILES_CACHE_MAX_STALE", "900"))
+PROFILES_CACHE_PUSH_TTL = float(os.getenv("PROFILES_CACHE_PUSH_TTL", "900"))
+PROFILES_CACHE_PUSH_MAX_STALE = float(os.getenv("PROFILES_CACHE_PUSH_MAX_STALE", "3600"))
+PROFILES_CACHE_MAX_SIZE = max(1, int(os.getenv("PROFILES_CACHE_MAX_SIZE", "2000")))
+
+
 class ProfilesCache:
-    def __init__(self, ttl: float = 60.0):
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        max_stale: float = 900.0,
+        max_size: int = 2000,
+        push_ttl: float | None = None,
+        push_max_stale: float | None = None,
+    ):
         self.ttl = ttl
-        self._store: dict[int, tuple[float, dict]] = {}
+        self.max_stale = max(max_stale, ttl)
+        self.push_ttl = push_ttl if push_ttl is not None else ttl
+        self.push_max_stale = max(push_max_stale if push_max_stale is not None else max_stale, self.push_ttl)
+        self.max_size = max_size
+        self._store: OrderedDict[int, tuple[float, dict]] = OrderedDict()
         self._lock = asyncio.Lock()
+        # промахи по одному и тому же игроку делят одну загрузку
+        self._flight = SingleFlight("profiles_cache")
+        self._background: set[asyncio.Task] = set()
+        # Счётчик сбросов. Загрузка запоминает его значение на старте; если её
+        # игрока (или весь кэш) сбросили позже, она могла прочитать старые
+        # данные — результат отдаём вызвавшему, но в кэш не кладём. Учёт — по
+        # игроку: сброс одного профиля не выбрасывает чужие загрузки.
+        self._generation = 0
+        self._invalidated: dict[int, int] = {}
+        self._invalidated_all = 0
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.refreshes = 0
+        self.refresh_ms_total = 0.0
+        self.refresh_ms_max = 0.0
 
     async def invalidate(self, discord_id: int) -> None:
+        await self.invalidate_many([discord_id])
+
+    async def invalidate_many(self, discord_ids: list[int] | None) -> None:
+        """None — сбросить весь кэш (новый сезон, сброс статистики)."""
         async with self._lock:
-            if discord_id in self._store:
-                self._store.pop(discord_id, None)
+            self._generation += 1
+            if discord_ids is None or len(self._invalidated) > 4 * self.max_size:
+                # полный сброс (или слишком длинная история сбросов — тогда
+                # консервативно считаем сброшенными всех)
+                self._invalidated_all = self._generation
+                self._invalidated.clear()
+            if discord_ids is None:
+                self.invalidations += len(self._store)
+                self._store.clear()
+                return
+            for did in discord_ids:
+                self._invalidated[did] = self._generation
+                if self._store.pop(did, None) is not None:
+                    self.invalidations += 1
+
+    def _still_valid(self, discord_id: int, generation: int) -> bool:
+        """Не сбрасывали ли игрока после начала загрузки — вызывать под self._lock."""
+        return max(self._invalidated_all, self._invalidated.get(discord_id, 0)) <= generation
+
+    def _limits(self) -> tuple[float, float]:
+        if cache_events.is_running():
+            return self.push_ttl, self.push_max_stale
+        return self.ttl, self.max_stale
+
+    def _lookup(self, discord_id: int, now: float) -> tuple[str, dict | None]:
+        """fresh / stale / miss — вызывать под self._lock."""
+        item = self._store.get(discord_id)
+        if item is None:
+            return "miss", None
+        ts, data = item
+        ttl, max_stale = self._limits()
+        age = now - ts
+        if age >= max_stale:
+            return "miss", None
+        self._store.move_to_end(discord_id)
+        return ("fresh" if age < ttl else "stale"), data
+
+    def _put(self, discord_id: int, ts: float, data: dict) -> None:
+        """Вызывать под self._lock."""
+        self._store[discord_id] = (ts, data)
+        self._store.move_to_end(discord_id)
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+            self.evictions += 1
+
+    def _record_refresh(self, started: float, count: int = 1) -> None:
+        ms = (time.perf_counter() - started) * 1000
+        self.refreshes += count
+        self.refresh_ms_total += ms * count
+        self.refresh_ms_max = max(self.refresh_ms_max, ms)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _revalidate(self, discord_ids: list[int]) -> None:
+        """Фоновое обновление устаревших записей (уже летящие не дублируем)."""
+        ids = [did for did in discord_ids if not self._flight.pending(did)]
+        if len(ids) == 1:
+            did = ids[0]
+            self._spawn(self._flight.do(did, lambda: self._load(did, Priority.LOBBY)))
+        elif ids:
+            self._spawn(self._flight.do_many(ids, self._load_many))
 
     async def get(self, discord_id: int) -> dict:
+        rank_refresher.mark_active([discord_id])
         now = time.time()
         async with self._lock:
-            ts, data = self._store.get(discord_id, (0, {}))
-            if now - ts < self.ttl:
-                return data
+            state, data = self._lookup(discord_id, now)
+
+        if state == "fresh":
+            self.hits += 1
+            return data
+        if state == "stale":
+            self.stale_hits += 1
+            self._revalidate([discord_id])
+            return data
+
+        # вне локов — сетевой запрос (один на всех, кто ждёт этого игрока)
+        self.misses += 1
+        return await self._flight.do(discord_id, lambda: self._load(discord_id))
 
-        # вне локов — сетевой запрос
+    async def _load(self, discord_id: int, priority: Priority = Priority.INTERACTIVE) -> dict:
+        now = time.time()
+        generation = self._generation
+        started = time.perf_counter()
         data: dict | None = None
         try:
-            data = await ensure_fresh_rank(discord_id)
+            data = await ensure_fresh_rank(discord_id, priority=priority)
         except Exception as e:
             logger.warning(f"⚠ ensure_fresh_rank failed for {discord_id}: {e}")
 
@@ -108,11 +237,98 @@ class ProfilesCache:
                 logger.warning(f"⚠ get_player_profile fallback failed for {discord_id}: {e}")
                 data = {}
 
+        self._record_refresh(started)
         async with self._lock:
-            self._store[discord_id] = (now, data or {})
+            if self._still_valid(discord_id, generation):
+                self._put(discord_id, now, data or {})
             return data or {}
 
-profiles_cache = ProfilesCache(ttl=60.0)
+    async def get_many(self, discord_ids: list[int]) -> dict[int, dict]:
+        """
+        Профили пачкой: свежие и не слишком устаревшие — из кэша (устаревшие
+        обновляются в фоне), остальные одним players/bulk/, затем
+        ensure_fresh_rank по уже загруженному профилю (в HenrikDev идём только
+        за теми, у кого истёк TTL ранга). Игроков, которых уже грузит кто-то
+        другой, не запрашиваем повторно.
+        """
+        rank_refresher.mark_active(discord_ids)
+        now = time.time()
+        result: dict[int, dict] = {}
+        stale: list[int] = []
+        async with self._lock:
+            for did in discord_ids:
+                state, data = self._lookup(did, now)
+                if state == "miss":
+                    continue
+                result[did] = data
+                if state == "stale":
+                    stale.append(did)
+
+        self.stale_hits += len(stale)
+        self.hits += len(result) - len(stale)
+        if stale:
+            self._revalidate(stale)
+
+        missing = [did for did in discord_ids if did not in result]
+        if missing:
+            self.misses += len(missing)
+            loaded = await self._flight.do_many(missing, self._load_many)
+            result.update({did: data or {} for did, data in loaded.items()})
+        return result
+
+    async def _load_many(self, discord_ids: list[int]) -> dict[int, dict]:
+        now = time.time()
+        generation = self._generation
+        started = time.perf_counter()
+        try:
+            loaded = await api_client.get_player_profiles(discord_ids)
+        except Exception as e:
+            logger.warning(f"⚠ get_player_profiles failed for {discord_ids}: {e}")
+            loaded = {}
+
+        async def _fresh(did: int) -> dict:
+            profile = loaded.get(did)
+            if not profile:
+                return {}
+            try:
+                return await ensure_fresh_rank(did, profile=profile, priority=Priority.LOBBY) or profile
+            except Exception as e:
+                logger.warning(f"⚠ ensure_fresh_rank failed for {did}: {e}")
+                return profile
+
+        fresh = await asyncio.gather(*(_fresh(did) for did in discord_ids))
+
+        self._record_refresh(started, len(discord_ids))
+        async with self._lock:
+            for did, data in zip(discord_ids, fresh):
+                if self._still_valid(did, generation):
+                    self._put(did, now, data)
+        return dict(zip(discord_ids, fresh))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "size": len(self._store),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "refreshes": self.refreshes,
+            "avg_refresh_ms": round(self.refresh_ms_total / self.refreshes, 1) if self.refreshes else 0.0,
+            "max_refresh_ms": round(self.refresh_ms_max, 1),
+        }
+
+profiles_cache = ProfilesCache(
+    ttl=PROFILES_CACHE_TTL,
+    max_stale=PROFILES_CACHE_MAX_STALE,
+    max_size=PROFILES_CACHE_MAX_SIZE,
+    push_ttl=PROFILES_CACHE_PUSH_TTL,
+    push_max_stale=PROFILES_CACHE_PUSH_MAX_STALE,
+)
+cache_events.subscribe(profiles_cache.invalidate_many)
 
 class JoinLobbyButton(View):
     def __init__(self, lobby):
@@ -218,43 +434,7 @@ class JoinLobbyButton(View):
         await interaction.response.send_message("🚪 Вы покинули лобби.", ephemeral=True)
         logger.info(f"🚪 Игрок вышел из лобби: {interaction.user.display_name}")
 
-        # Собираем профили оставшихся игроков
-        async with asyncio.TaskGroup() as tg:
-            tasks = {m: tg.create_task(profiles_cache.get(m.id)) for m in lobby.members}
-        players_data = []
-        for m, t in tasks.items():
-            profile = t.result() or {}
-            players_data.append({
-                "id": profile.get("id"),
-                "discord_id": m.id,
-                "username": profile.get("username", "—"),
-                "display_name": m.display_name,
-                "rank": (profile.get("rank") or "Unranked"),
-                "wins": profile.get("wins", 0),
-                "matches": profile.get("matches", 0),
-            })
-
-        # Топ по победам
-        top_ids = await get_leaderboard_top(3)  # список discord_id топ-3
-        logger.info(f"players_data = {players_data}")
-        image_path = generate_lobby_image(players_data, top_ids=top_ids)
-
-        try:
-            file = discord.File(image_path, filename="lobby_dynamic.png")
-            if lobby.image_message is None:
-                lobby.image_message = await lobby.channel.send(
-                    file=file,
-                    content=None,
-                    allowed_mentions=discord.AllowedMentions.none(),
-                )
-            else:
-                await lobby.image_message.edit(
-                    content=None,
-                    attachments=[file],
-                    allowed_mentions=discord.AllowedMentions.none(),
-                )
-        except Exception as e:
-            logger.warning(f"⚠ Не удалось обновить embed: {e}")
+        lobby.request_image_update()
 
     @discord.ui.button(label="Код комнаты", style=discord.ButtonStyle.secondary, emoji="🔑")
     async def code_button(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -335,6 +515,81 @@ class Lobby:
         # KING: победители прошлого раунда.
         self.king_champions: list[discord.Member] = []
 
+        # Отложенная перерисовка картинки состава (см. request_image_update).
+        self._image_update_task: asyncio.Task | None = None
+        self._image_dirty = False
+
+    async def _build_players_data(self) -> list[dict]:
+        """Профили текущих участников в формате, который ждёт генератор картинки лобби."""
+        profiles = await profiles_cache.get_many([m.id for m in self.members])
+
+        players_data = []
+        for m in self.members:
+            profile = profiles.get(m.id) or {}
+            players_data.append({
+                "id": profile.get("id"),
+                "discord_id": m.id,
+                "username": profile.get("username", "—"),
+                "display_name": m.display_name,
+                "rank": (profile.get("rank") or "Unranked"),
+                "wins": profile.get("wins", 0),
+                "matches": profile.get("matches", 0),
+            })
+        return players_data
+
+    async def _publish_lobby_image(self, *, create_if_missing: bool = True) -> None:
+        """Рендерим текущий состав и отправляем/редактируем сообщение с картинкой."""
+        players_data = await self._build_players_data()
+        top_ids = await get_leaderboard_top(3)  # список discord_id топ-3
+        image = await render_lobby_image(players_data, top_ids=top_ids)
+
+        file = discord.File(image, filename="lobby_dynamic.png")
+        if self.image_message is None:
+            if not create_if_missing:
+                return
+            self.image_message = await self.channel.send(
+                file=file,
+                content=None,
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+        else:
+            await self.image_message.edit(
+                content=None,
+                attachments=[file],
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+
+    def request_image_update(self) -> None:
+        """
+        Помечаем картинку состава устаревшей. Все join/leave в пределах
+        LOBBY_IMAGE_DEBOUNCE склеиваются в один рендер и одно редактирование;
+        публикуется всегда последний состав.
+        """
+        self._image_dirty = True
+        if self._image_update_task is None or self._image_update_task.done():
+            self._image_update_task = asyncio.create_task(self._image_update_loop())
+
+    async def _image_update_loop(self) -> None:
+        # изменения, пришедшие во время рендера/аплоада, дадут ещё один круг
+        while self._image_dirty:
+            await asyncio.sleep(LOBBY_IMAGE_DEBOUNCE)
+            self._image_dirty = False
+            try:
+                await self._publish_lobby_image()
+            except Exception as e:
+                logger.warning(f"⚠ Не удалось обновить картинку лобби: {e}")
+
+    async def cancel_image_update(self) -> None:
+        """Снимаем отложенную перерисовку — дальше картинку обновляет вызывающий код."""
+        self._image_dirty = False
+        task, self._image_update_task = self._image_update_task, None
+        if task and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
     async def _wait_match_id(self, timeout: float = 60.0) -> bool:
         step = 0.2
         waited = 0.0
@@ -520,38 +775,8 @@ class Lobby:
 
             self.members.append(member)
 
-            # Получаем профили всех участников
-            players_data = []
-            for m in self.members:
-                profile = await profiles_cache.get(m.id)
-                players_data.append({
-                    "id": profile.get("id"),
-                    "discord_id": m.id,
-                    "username": profile.get("username", "—"),
-                    "display_name": m.display_name,
-                    "rank": (profile.get("rank") or "Unranked"),
-                    "wins": profile.get("wins", 0),
-                    "matches": profile.get("matches", 0),
-                })
-
-            # Генерируем изображение
-            top_ids = await get_leaderboard_top(3)  # список discord_id топ-3
-            image_path = generate_lobby_image(players_data, top_ids=top_ids)
-
-            file = discord.File(image_path, filename="lobby_dynamic.png")
-
-            if self.image_message is None:
-                self.image_message = await self.channel.send(
-                    file=file,
-                    content=None,
-                    allowed_mentions=discord.AllowedMentions.none(),
-                )
-            else:
-                await self.image_message.edit(
-                    content=None,
-                    attachments=[file],
-                    allowed_mentions=discord.AllowedMentions.none(),
-                )
+            # картинку перерисуем одним махом после серии входов
+            self.request_image_update()
 
             if len(self.members) >= self.max_players and not self.draft_started:
                 self.draft_started = True
@@ -762,29 +987,8 @@ class Lobby:
             )
 
         try:
-            players_data = []
-            for m in self.members:
-                profile = await profiles_cache.get(m.id)
-                players_data.append({
-                    "id": profile.get("id"),
-                    "discord_id": m.id,
-                    "username": profile.get("username", "—"),
-                    "display_name": m.display_name,
-                    "rank": (profile.get("rank") or "Unranked"),
-                    "wins": profile.get("wins", 0),
-                    "matches": profile.get("matches", 0),
-                })
-
-            top_ids = await get_leaderboard_top(3)
-            image_path = generate_lobby_image(players_data, top_ids=top_ids)
-            file = discord.File(image_path, filename="lobby_dynamic.png")
-
-            if self.image_message:
-                await self.image_message.edit(
-                    content=None,
-                    attachments=[file],
-                    allowed_mentions=discord.AllowedMentions.none(),
-                )
+            await self.cancel_image_update()
+            await self._publish_lobby_image(create_if_missing=False)
         except Exception as e:
             logger.warning(f"⚠ Не удалось обновить KING-картинку победителей: {e}")
 
@@ -802,6 +1006,9 @@ class Lobby:
             await self.close_lobby_king_challenge()
             return
 
+        # отложенный join/leave-рендер не должен перетереть финальный состав драфта
+        await self.cancel_image_update()
+
         if len(self.members) < 2:
             await self.channel.send("❌ Недостаточно игроков для драфта. Лобби будет закрыто.")
             await self.channel.delete(reason="Недостаточно игроков для драфта.")
@@ -818,12 +1025,11 @@ class Lobby:
                 # "Immortal 2" -> "Immortal"
                 return str(rank or "Unranked").strip().split()[0].title()
 
-            async with asyncio.TaskGroup() as tg:
-                tasks = {m: tg.create_task(profiles_cache.get(m.id)) for m in self.members}
+            profiles = await profiles_cache.get_many([m.id for m in self.members])
 
             player_profiles = []
-            for member, task in tasks.items():
-                profile = task.result() or {}
+            for member in self.members:
+                profile = profiles.get(member.id) or {}
                 base = rank_base(profile.get("rank", "Unranked"))
                 score = RANK_ORDER.get(base, 1)
                 player_profiles.append((member, score))
@@ -853,35 +1059,7 @@ class Lobby:
             await self.channel.edit(overwrites=overwrites)
 
             # 🔁 Генерация картинки финального состава
-            players_data = []
-            for m in self.members:
-                profile = await profiles_cache.get(m.id)
-                players_data.append({
-                    "id": profile.get("id"),
-                    "discord_id": m.id,
-                    "username": profile.get("username", "—"),
-                    "display_name": m.display_name,
-                    "rank": (profile.get("rank") or "Unranked"),
-                    "wins": profile.get("wins", 0),
-                    "matches": profile.get("matches", 0),
-                })
-
-            top_ids = await get_leaderboard_top(3)  # список discord_id топ-3
-            image_path = generate_lobby_image(players_data, top_ids=top_ids)
-
-            file = discord.File(image_path, filename="lobby_dynamic.png")
-            if self.image_message is None:
-                self.image_message = await self.channel.send(
-                    file=file,
-                    content=None,
-                    allowed_mentions=discord.AllowedMentions.none(),
-                )
-            else:
-                await self.image_message.edit(
-                    content=None,
-                    attachments=[file],
-                    allowed_mentions=discord.AllowedMentions.none(),
-                )
+            await self._publish_lobby_image()
 
             await self.start_draft()
             asyncio.create_task(self.delayed_win_buttons())
@@ -1165,9 +1343,12 @@ class PlayerProfileModal(discord.ui.Modal, title="Введите Riot ID (Name#T
         # по умолчанию считаем Unranked — регистрация не должна падать из-за внешнего сервиса
         rank = "Unranked"
         region_used = "—"
+        account_kwargs = {}
 
         try:
-            rank, region_used = await fetch_valorant_rank(riot_id)
+            info = await fetch_rank_info(riot_id)
+            rank, region_used = info.rank, info.region
+            account_kwargs = {"riot_puuid": info.puuid, "riot_region": info.region}
         except (ValorantRankError, Exception):
             # Любые проблемы HenrikDev игнорируем, оставляем Unranked
             pass
@@ -1178,7 +1359,8 @@ class PlayerProfileModal(discord.ui.Modal, title="Введите Riot ID (Name#T
                 interaction.user.id,
                 username=riot_id,
                 rank=rank,
-                create_if_not_exist=True
+                create_if_not_exist=True,
+                **account_kwargs,
             )
         except Exception:
             await interaction.followup.send("❌ Ошибка при сохранении профиля.", ephemeral=True)
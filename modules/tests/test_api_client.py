@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+
+from modules.utils import api_client
+
+
+class _Resp:
+    def __init__(self, status: int, data=None):
+        self.status = status
+        self._body = json.dumps(data) if data is not None else ""
+
+    async def text(self) -> str:
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _fake_backend(monkeypatch, *, bulk_status: int = 200):
+    calls = {"bulk": [], "single": 0, "max_parallel": 0}
+    parallel = 0
+
+    async def fake_request(method, path, **kwargs):
+        nonlocal parallel
+        if path == "players/bulk/":
+            ids = kwargs["json"]["discord_ids"]
+            calls["bulk"].append(len(ids))
+            if bulk_status != 200:
+                return _Resp(bulk_status, {"error": "nope"})
+            if len(ids) > 100:
+                return _Resp(400, {"error": "too many discord_ids"})
+            return _Resp(200, [{"discord_id": i} for i in ids])
+
+        calls["single"] += 1
+        parallel += 1
+        calls["max_parallel"] = max(calls["max_parallel"], parallel)
+        await asyncio.sleep(0)
+        parallel -= 1
+        return _Resp(200, {"discord_id": int(path.split("/")[1])})
+
+    monkeypatch.setattr(api_client, "_request", fake_request)
+    return calls
+
+
+def test_bulk_requests_are_split_into_chunks(monkeypatch):
+    calls = _fake_backend(monkeypatch)
+    found = asyncio.run(api_client.get_player_profiles(range(1, 251)))
+
+    assert len(found) == 250
+    assert calls["bulk"] == [100, 100, 50]
+    assert calls["single"] == 0
+
+
+def test_fallback_only_without_bulk_endpoint_and_bounded(monkeypatch):
+    calls = _fake_backend(monkeypatch, bulk_status=404)
+    found = asyncio.run(api_client.get_player_profiles(range(1, 41)))
+
+    assert len(found) == 40
+    assert calls["single"] == 40
+    assert calls["max_parallel"] <= api_client.PROFILES_FALLBACK_CONCURRENCY
+
+
+def test_bulk_error_does_not_fan_out(monkeypatch):
+    calls = _fake_backend(monkeypatch, bulk_status=500)
+    found = asyncio.run(api_client.get_player_profiles(range(1, 41)))
+
+    assert found == {}
+    assert calls["single"] == 0
+
+
+def test_error_mid_stream_is_raised(monkeypatch):
+    async def fake_request(method, path, **kwargs):
+        if "cursor" not in kwargs["params"]:
+            return _Resp(200, {"results": [{"discord_id": 1}], "next": "http://api/players/?cursor=abc"})
+        return _Resp(500, {"error": "down"})
+
+    monkeypatch.setattr(api_client, "_request", fake_request)
+    with pytest.raises(RuntimeError):
+        asyncio.run(api_client.get_all_players())
+
+
+def test_all_pages_are_collected(monkeypatch):
+    pages = {
+        None: {"results": [{"discord_id": 1}], "next": "http://api/players/?cursor=p2&page_size=200"},
+        "p2": {"results": [{"discord_id": 2}], "next": None},
+    }
+
+    async def fake_request(method, path, **kwargs):
+        return _Resp(200, pages[kwargs["params"].get("cursor")])
+
+    monkeypatch.setattr(api_client, "_request", fake_request)
+    assert [p["discord_id"] for p in asyncio.run(api_client.get_all_players())] == [1, 2]
@@ -0,0 +1,56 @@
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from modules.utils import cache_events
+
+
+def _post(monkeypatch, body, secret="s3cret"):
+    monkeypatch.setattr(cache_events, "BOT_WEBHOOK_SECRET", "s3cret")
+    received = []
+
+    async def listener(discord_ids):
+        received.append(discord_ids)
+
+    monkeypatch.setattr(cache_events, "_listeners", [listener])
+
+    async def run():
+        app = web.Application()
+        app.router.add_post(cache_events.WEBHOOK_PATH, cache_events._handle)
+        async with TestClient(TestServer(app)) as client:
+            resp = await client.post(cache_events.WEBHOOK_PATH, json=body, headers={"X-Webhook-Secret": secret})
+            return resp.status
+
+    return asyncio.run(run()), received
+
+
+def test_players_changed_reaches_listeners(monkeypatch):
+    status, received = _post(monkeypatch, {"event": "players_changed", "discord_ids": ["7", 8]})
+    assert status == 200
+    assert received == [[7, 8]]
+
+
+def test_all_resets_everything(monkeypatch):
+    status, received = _post(monkeypatch, {"event": "players_changed", "all": True})
+    assert status == 200
+    assert received == [None]
+
+
+def test_wrong_secret_is_rejected(monkeypatch):
+    status, received = _post(monkeypatch, {"event": "players_changed", "all": True}, secret="nope")
+    assert status == 403
+    assert received == []
+
+
+def test_bad_ids_are_rejected(monkeypatch):
+    status, received = _post(monkeypatch, {"event": "players_changed", "discord_ids": ["x"]})
+    assert status == 400
+    assert received == []
+
+
+def test_non_object_body_is_rejected(monkeypatch):
+    for body in ([1, 2], 5, "players_changed"):
+        status, received = _post(monkeypatch, body)
+        assert status == 400, body
+        assert received == []
@@ -0,0 +1,66 @@
+import asyncio
+
+from modules.utils.henrik_scheduler import HenrikScheduler, Priority
+
+
+def test_waiters_are_served_by_priority():
+    async def run():
+        # 10 токенов в секунду, ведро пустое — все встают в очередь
+        scheduler = HenrikScheduler(rate_per_min=600, burst=3)
+        scheduler._tokens = 0.0
+        order = []
+
+        async def take(priority, name):
+            await scheduler.acquire(priority)
+            order.append(name)
+
+        tasks = [
+            asyncio.create_task(take(Priority.BACKGROUND, "background")),
+            asyncio.create_task(take(Priority.LOBBY, "lobby")),
+            asyncio.create_task(take(Priority.INTERACTIVE, "interactive")),
+        ]
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=5)
+        assert order == ["interactive", "lobby", "background"]
+
+    asyncio.run(run())
+
+
+def test_background_leaves_reserve_token():
+    async def run():
+        # темп почти нулевой: в ведре только то, что положили руками
+        scheduler = HenrikScheduler(rate_per_min=0.001, burst=3)
+        scheduler._tokens = 1.0
+        assert not scheduler.has_spare_budget()
+
+        background = asyncio.create_task(scheduler.acquire(Priority.BACKGROUND))
+        await asyncio.sleep(0.05)
+        assert not background.done()
+
+        # последний токен достаётся игроку, а не фону
+        await asyncio.wait_for(scheduler.acquire(Priority.INTERACTIVE), timeout=1)
+        assert not background.done()
+        background.cancel()
+
+    asyncio.run(run())
+
+
+def test_spare_budget_with_reserve():
+    async def run():
+        scheduler = HenrikScheduler(rate_per_min=0.001, burst=3)
+        scheduler._tokens = 2.0
+        assert scheduler.has_spare_budget()
+        await scheduler.acquire(Priority.BACKGROUND)
+        assert not scheduler.has_spare_budget()
+
+    asyncio.run(run())
+
+
+def test_429_pauses_and_slows_down():
+    scheduler = HenrikScheduler(rate_per_min=30, burst=3)
+    scheduler.report(429, {"Retry-After": "20"})
+
+    assert not scheduler.has_spare_budget()
+    stats = scheduler.stats()
+    assert stats["paused_for"] > 15
+    assert stats["rate_per_min"] < 30
+    assert stats["throttled"] == 1
@@ -0,0 +1,36 @@
+from modules.utils import image_assets
+from modules.utils.image_assets import row_tiles
+from modules.utils.image_generator import generate_lobby_image
+
+RANKS = ["Iron 1", "Gold 2", "Diamond 3", "Radiant", "Unranked", "Platinum 1", "Silver 3"]
+
+
+def _players(n: int) -> list[dict]:
+    return [
+        {"discord_id": 100 + i, "username": f"Player{i}#TAG{i}", "display_name": f"Имя{i}", "rank": RANKS[i]}
+        for i in range(n)
+    ]
+
+
+def _render(n: int) -> tuple[int, int]:
+    """(hits, misses) кэша тайлов строк за один рендер."""
+    before = row_tiles.stats()
+    generate_lobby_image(_players(n), top_ids=[100], as_bytes=True)
+    after = row_tiles.stats()
+    return after["hits"] - before["hits"], after["misses"] - before["misses"]
+
+
+def test_join_rerenders_only_new_row():
+    image_assets.clear_caches()
+    assert _render(3) == (0, 3)
+    # список центрирован: после join все строки сдвигаются, но тайлы переиспользуются
+    assert _render(4) == (3, 1)
+    assert _render(3) == (3, 0)
+
+
+def test_cached_tiles_give_same_image():
+    image_assets.clear_caches()
+    cold = generate_lobby_image(_players(5), as_bytes=True).getvalue()
+    generate_lobby_image(_players(2), as_bytes=True)
+    warm = generate_lobby_image(_players(5), as_bytes=True).getvalue()
+    assert cold == warm
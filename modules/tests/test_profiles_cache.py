@@ -0,0 +1,70 @@
+import asyncio
+
+from modules.lobby import lobby
+from modules.lobby.lobby import ProfilesCache
+from modules.utils import cache_events
+
+
+def _cache_with_slow_loads(monkeypatch) -> tuple[ProfilesCache, asyncio.Event, asyncio.Event]:
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def fake_ensure_fresh_rank(discord_id, **kwargs):
+        started.set()
+        await release.wait()
+        return {"discord_id": discord_id, "rank": "Gold 1"}
+
+    monkeypatch.setattr(lobby, "ensure_fresh_rank", fake_ensure_fresh_rank)
+    monkeypatch.setattr(lobby.rank_refresher, "mark_active", lambda ids: None)
+    return ProfilesCache(ttl=60, max_stale=900), started, release
+
+
+def test_invalidating_other_player_keeps_inflight_load(monkeypatch):
+    async def run():
+        cache, started, release = _cache_with_slow_loads(monkeypatch)
+        load = asyncio.create_task(cache.get(1))
+        await started.wait()
+        await cache.invalidate_many([2])
+        release.set()
+        await load
+        assert 1 in cache._store
+
+    asyncio.run(run())
+
+
+def test_invalidating_same_player_drops_inflight_load(monkeypatch):
+    async def run():
+        cache, started, release = _cache_with_slow_loads(monkeypatch)
+        load = asyncio.create_task(cache.get(1))
+        await started.wait()
+        await cache.invalidate_many([1])
+        release.set()
+        assert (await load)["rank"] == "Gold 1"
+        assert 1 not in cache._store
+
+    asyncio.run(run())
+
+
+def test_invalidate_all_drops_inflight_loads(monkeypatch):
+    async def run():
+        cache, started, release = _cache_with_slow_loads(monkeypatch)
+        load = asyncio.create_task(cache.get_many([1, 2]))
+        await started.wait()
+        await cache.invalidate_many(None)
+        release.set()
+        await load
+        assert not cache._store
+
+    async def fake_profiles(ids):
+        return {i: {"discord_id": i} for i in ids}
+
+    monkeypatch.setattr(lobby.api_client, "get_player_profiles", fake_profiles)
+    asyncio.run(run())
+
+
+def test_long_ttl_only_while_receiver_runs(monkeypatch):
+    cache = ProfilesCache(ttl=60, max_stale=900, push_ttl=900, push_max_stale=3600)
+    monkeypatch.setattr(cache_events, "is_running", lambda: False)
+    assert cache._limits() == (60, 900)
+    monkeypatch.setattr(cache_events, "is_running", lambda: True)
+    assert cache._limits() == (900, 3600)
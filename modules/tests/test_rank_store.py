@@ -0,0 +1,88 @@
+import pytest
+
+from modules.utils import rank_store
+from modules.utils.rank_store import RANK_STORE_NEGATIVE_TTL, RANK_STORE_TTL, RankStore
+
+
+class _Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rank_store.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RankStore(tmp_path / "ranks.sqlite3", max_rows=100)
+    yield store
+    store.close()
+
+
+def test_rank_is_fresh_until_ttl(store, clock):
+    store.put("sweet#ru1", "Gold 2", "eu", "puuid-1")
+
+    clock.now += RANK_STORE_TTL - 1
+    entry = store.get("sweet#ru1")
+    assert entry.rank == "Gold 2" and entry.is_fresh(clock.now)
+
+    clock.now += 2
+    assert not store.get("sweet#ru1").is_fresh(clock.now)
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+
+def test_negative_entry_has_own_ttl_and_keeps_puuid(store, clock):
+    store.put("sweet#ru1", "Gold 2", "eu", "puuid-1")
+    store.put_negative("sweet#ru1", 404, "not found")
+
+    entry = store.get("sweet#ru1")
+    assert entry.negative and entry.error_status == 404
+    assert entry.puuid == "puuid-1"
+    assert entry.is_fresh(clock.now)
+
+    clock.now += RANK_STORE_NEGATIVE_TTL + 1
+    assert not store.get("sweet#ru1").is_fresh(clock.now)
+
+
+def test_success_clears_negative_entry(store, clock):
+    store.put_negative("sweet#ru1", 404, "not found")
+    store.put("sweet#ru1", "Gold 3", "eu", "puuid-2")
+
+    entry = store.get("sweet#ru1")
+    assert not entry.negative and entry.rank == "Gold 3"
+
+
+def test_survives_reopen(tmp_path, clock):
+    path = tmp_path / "ranks.sqlite3"
+    first = RankStore(path, max_rows=100)
+    first.put("sweet#ru1", "Radiant", "eu", "puuid-1")
+    first.close()
+
+    second = RankStore(path, max_rows=100)
+    assert second.get("sweet#ru1").rank == "Radiant"
+    second.close()
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    store = RankStore(tmp_path / "ranks.sqlite3", max_rows=100)
+    for i in range(100):
+        clock.now += 1
+        store.put(f"player{i}#eu", "Iron 1", "eu", f"p{i}")
+    clock.now += 1
+    store.get("player0#eu")  # самая старая запись, но её только что читали
+
+    # лимит проверяется на 101-й записи
+    clock.now += 1
+    store.put("player100#eu", "Iron 1", "eu", "p100")
+
+    assert store.stats()["rows"] == 100
+    assert store.get("player0#eu") is not None
+    assert store.get("player1#eu") is None
+    store.close()
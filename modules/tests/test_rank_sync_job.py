@@ -0,0 +1,100 @@
+import asyncio
+import json
+
+from modules.utils import rank_sync_job as job_module
+from modules.utils.rank_sync_job import RankSyncJob
+from modules.utils.valorant_api import ValorantRankError
+
+
+class FakeBackend:
+    """players/stale_ranks/ поверх словаря: обновлённые игроки выпадают из выборки."""
+
+    def __init__(self, ids: list[int], page_size: int, failing: set[int]):
+        self.ids = ids
+        self.page_size = page_size
+        self.failing = failing
+        self.synced: set[int] = set()
+        self.calls: list[int] = []
+        self.gate: asyncio.Event | None = None
+        self.block_after: int | None = None
+
+    async def get_stale_ranks(self, older_than, after=None, limit=50, with_count=False):
+        if with_count:
+            return {"results": [], "next": None, "count": len(self.ids)}
+        # курсор — id последнего игрока страницы, как keyset по (rank_last_sync, id)
+        start = int(after) if after else 0
+        rest = [i for i in self.ids if i > start and i not in self.synced]
+        page = rest[:self.page_size]
+        has_more = len(rest) > self.page_size
+        return {"results": [{"discord_id": i} for i in page], "next": str(page[-1]) if has_more else None}
+
+    async def ensure_fresh_rank(self, discord_id, **kwargs):
+        if self.block_after is not None and len(self.calls) == self.block_after:
+            await self.gate.wait()
+        self.calls.append(discord_id)
+        if discord_id in self.failing:
+            raise ValorantRankError("not found", status=404)
+        self.synced.add(discord_id)
+        return {"discord_id": discord_id}
+
+
+def _setup(monkeypatch, tmp_path, backend: FakeBackend) -> RankSyncJob:
+    monkeypatch.setattr(job_module.api_client, "get_stale_ranks", backend.get_stale_ranks)
+    monkeypatch.setattr(job_module, "ensure_fresh_rank", backend.ensure_fresh_rank)
+    monkeypatch.setattr(job_module, "RANK_SYNC_PAGE_SIZE", backend.page_size)
+    return RankSyncJob(tmp_path / "job.json")
+
+
+def test_pause_mid_page_and_resume_counts_everyone_once(monkeypatch, tmp_path):
+    backend = FakeBackend(list(range(1, 11)), page_size=4, failing={2, 6})
+
+    async def run():
+        job = _setup(monkeypatch, tmp_path, backend)
+        backend.gate = asyncio.Event()
+        backend.block_after = 6  # посреди второй страницы
+        assert await job.start(channel_id=None, user_id=None) == "started"
+        while len(backend.calls) < 6:
+            await asyncio.sleep(0)
+        assert await job.pause()
+
+        saved = json.loads((tmp_path / "job.json").read_text())
+        assert saved["status"] == "paused"
+        assert saved["processed"] == 6
+        assert saved["page_done"] == [5, 6]
+
+        backend.block_after = None
+        assert await job.start(channel_id=None, user_id=None) == "resumed"
+        await job._task
+        return job
+
+    job = asyncio.run(run())
+    st = job.state
+    assert st.status == "done"
+    assert sorted(backend.calls) == list(range(1, 11))
+    assert (st.processed, st.updated, st.errors) == (10, 8, 2)
+    assert job.status()["remaining"] == 0
+
+
+def test_restart_resumes_from_saved_state(monkeypatch, tmp_path):
+    backend = FakeBackend(list(range(1, 8)), page_size=3, failing=set())
+
+    async def run():
+        job = _setup(monkeypatch, tmp_path, backend)
+        backend.gate = asyncio.Event()
+        backend.block_after = 4
+        await job.start(channel_id=None, user_id=None)
+        while len(backend.calls) < 4:
+            await asyncio.sleep(0)
+        await job.shutdown()  # выключение бота, а не пауза
+
+        restarted = RankSyncJob(tmp_path / "job.json")
+        assert restarted.state.status == "running"
+        backend.block_after = None
+        assert restarted.resume_pending()
+        await restarted._task
+        return restarted
+
+    job = asyncio.run(run())
+    assert job.state.status == "done"
+    assert job.state.processed == 7
+    assert sorted(backend.calls) == list(range(1, 8))
@@ -0,0 +1,52 @@
+import asyncio
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from modules.utils import render_pool
+
+
+class _BrokenPool(Executor):
+    """Пул, у которого умер воркер: любая задача падает с BrokenProcessPool."""
+
+    def __init__(self):
+        self.shutdowns = 0
+
+    def submit(self, fn, *args, **kwargs):
+        fut = Future()
+        fut.set_exception(BrokenProcessPool("worker died"))
+        return fut
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self.shutdowns += 1
+
+
+def _double(x):
+    return x * 2
+
+
+def test_concurrent_failures_swap_pool_once(monkeypatch):
+    broken = _BrokenPool()
+    created = []
+
+    def make_executor(kind):
+        executor = ThreadPoolExecutor(max_workers=2)
+        created.append(executor)
+        return executor, "thread"
+
+    monkeypatch.setattr(render_pool, "_executor", broken)
+    monkeypatch.setattr(render_pool, "_executor_kind", "process")
+    monkeypatch.setattr(render_pool, "_slots", None)
+    monkeypatch.setattr(render_pool, "_make_executor", make_executor)
+
+    async def run():
+        return await asyncio.gather(*(render_pool.render(_double, i) for i in range(4)))
+
+    try:
+        assert asyncio.run(run()) == [0, 2, 4, 6]
+        # вторая упавшая задача не гасит пул, на который уже повторяет первая
+        assert len(created) == 1
+        assert render_pool._executor is created[0]
+        assert broken.shutdowns == 1
+    finally:
+        for executor in created:
+            executor.shutdown(wait=True)
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from modules.utils.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_load():
+    async def run():
+        flight = SingleFlight("test-share")
+        calls = 0
+        release = asyncio.Event()
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return "value"
+
+        waiters = [asyncio.create_task(flight.do(1, load)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(*waiters) == ["value"] * 5
+        assert calls == 1
+        assert flight.stats.deduplicated == 4
+        assert not flight.pending(1)
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    async def run():
+        flight = SingleFlight("test-cancel")
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return 42
+
+        first = asyncio.create_task(flight.do("k", load))
+        second = asyncio.create_task(flight.do("k", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+        assert await second == 42
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(run())
+
+
+def test_error_reaches_all_waiters_and_is_not_cached():
+    async def run():
+        flight = SingleFlight("test-error")
+        attempts = 0
+
+        async def load():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0)
+            if attempts == 1:
+                raise RuntimeError("boom")
+            return "ok"
+
+        results = await asyncio.gather(flight.do(1, load), flight.do(1, load), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert await flight.do(1, load) == "ok"
+
+    asyncio.run(run())
+
+
+def test_do_many_joins_inflight_keys_and_batches_the_rest():
+    async def run():
+        flight = SingleFlight("test-many")
+        release = asyncio.Event()
+        batches = []
+
+        async def load_one():
+            await release.wait()
+            return "single"
+
+        async def load_batch(keys):
+            batches.append(list(keys))
+            await release.wait()
+            return {k: f"batch-{k}" for k in keys}
+
+        single = asyncio.create_task(flight.do(1, load_one))
+        await asyncio.sleep(0)
+        many = asyncio.create_task(flight.do_many([1, 2, 3, 2], load_batch))
+        await asyncio.sleep(0)
+        # одиночный запрос подцепляется к летящей пачке
+        joined = asyncio.create_task(flight.do(3, load_one))
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await many == {1: "single", 2: "batch-2", 3: "batch-3"}
+        assert await single == "single"
+        assert await joined == "batch-3"
+        assert batches == [[2, 3]]
+
+    asyncio.run(run())
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from modules.utils import valorant_api
+
+
+@pytest.fixture
+def henrik(monkeypatch):
+    calls = {"account": 0, "mmr": []}
+    accounts = {"puuid": "p1", "region": "na"}
+    ranks = {("na", "p1"): "Gold 2"}
+
+    async def resolve_account(session, headers, name, tag, priority):
+        calls["account"] += 1
+        return accounts["puuid"], accounts["region"]
+
+    async def fetch_mmr(session, headers, region, puuid, priority):
+        calls["mmr"].append((region, puuid))
+        return ranks.get((region, puuid))
+
+    async def no_entry(riot_id):
+        return None
+
+    async def noop(*args):
+        return None
+
+    async def session():
+        return None
+
+    monkeypatch.setattr(valorant_api, "HENRIKDEV_API_KEY", "key")
+    monkeypatch.setattr(valorant_api, "_resolve_account", resolve_account)
+    monkeypatch.setattr(valorant_api, "_fetch_mmr", fetch_mmr)
+    monkeypatch.setattr(valorant_api, "get_http_session", session)
+    monkeypatch.setattr(valorant_api.rank_store, "get_entry", no_entry)
+    monkeypatch.setattr(valorant_api.rank_store, "store_rank", noop)
+    monkeypatch.setattr(valorant_api.rank_store, "store_negative", noop)
+    return calls, accounts, ranks
+
+
+def _fetch(**kwargs):
+    return asyncio.run(valorant_api.fetch_rank_info("sweet#RU1", **kwargs))
+
+
+def test_known_puuid_and_region_skip_account_lookup(henrik):
+    calls, _, _ = henrik
+    info = _fetch(puuid="p1", region="na")
+    assert info.rank == "Gold 2"
+    assert calls["account"] == 0
+
+
+def test_stale_region_is_resolved_once_and_retried(henrik):
+    calls, _, _ = henrik
+    info = _fetch(puuid="p1", region="eu")
+    assert (info.rank, info.region) == ("Gold 2", "na")
+    assert calls["account"] == 1
+    assert calls["mmr"] == [("eu", "p1"), ("na", "p1")]
+
+
+def test_really_unranked_account_is_not_retried(henrik):
+    calls, _, ranks = henrik
+    ranks.clear()
+    info = _fetch(puuid="p1", region="na")
+    assert info.rank == "Unranked"
+    assert calls["account"] == 1
+    assert calls["mmr"] == [("na", "p1")]
+
+
+def test_puuid_without_region_does_not_use_default_region(henrik):
+    calls, _, _ = henrik
+    info = _fetch(puuid="p1", region=None)
+    assert (info.rank, info.region) == ("Gold 2", "na")
+    assert calls["mmr"] == [("na", "p1")]
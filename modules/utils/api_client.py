@@ -6,6 +6,10 @@ import json
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 from pathlib import Path
+from collections.abc import AsyncIterator
+from urllib.parse import parse_qs, urlsplit
+
+from modules.utils.single_flight import SingleFlight
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parents[2] / ".env")
 
@@ -55,10 +59,11 @@ async def _request(method: str, path: str, **kwargs):
     url = _url(path)
     retries = kwargs.pop("retries", 3)
     backoff = kwargs.pop("backoff", 0.5)
+    headers = {**HEADERS, **kwargs.pop("headers", {})}
 
     for attempt in range(retries + 1):
         try:
-            resp = await _session.request(method, url, headers=HEADERS, **kwargs)
+            resp = await _session.request(method, url, headers=headers, **kwargs)
             if resp.status == 429 or 500 <= resp.status < 600:
                 body = await resp.text()
                 wait = resp.headers.get("Retry-After")
@@ -93,7 +98,17 @@ def api(path: str) -> str:
 
 # --- Players ---
 
+# одновременные запросы профиля одного игрока делят один HTTP-вызов
+_profile_flight = SingleFlight("player_profile")
+
+
 async def get_player_profile(discord_id: int) -> dict:
+    data = await _profile_flight.do(int(discord_id), lambda: _fetch_player_profile(discord_id))
+    # результат общий для всех ожидавших — отдаём каждому свою копию
+    return dict(data or {})
+
+
+async def _fetch_player_profile(discord_id: int) -> dict:
     async with await _request("GET", f"players/{discord_id}/") as resp:
         if resp.status == 404:
             return {}
@@ -102,11 +117,69 @@ async def get_player_profile(discord_id: int) -> dict:
             return {}
         return await _safe_json(resp)
 
+async def get_player_profiles(discord_ids) -> dict[int, dict]:
+    """
+    Профили сразу нескольких игроков: {discord_id: profile}.
+    POST players/bulk/ пачками по PROFILES_BULK_MAX вместо запроса на каждого;
+    кого нет в базе — нет и в ответе. Если бэкенд без bulk-эндпоинта (404/405) —
+    откатываемся на GET по одному, не больше PROFILES_FALLBACK_CONCURRENCY разом.
+    """
+    ids = sorted({int(i) for i in discord_ids})
+    if not ids:
+        return {}
+
+    # id, по которым уже летит одиночный GET (или другая пачка), не запрашиваем повторно
+    found = await _profile_flight.do_many(ids, _fetch_player_profiles)
+    return {i: dict(p) for i, p in found.items() if p}
+
+
+# потолок players/bulk/ на бэкенде (BULK_MAX_IDS)
+PROFILES_BULK_MAX = 100
+PROFILES_FALLBACK_CONCURRENCY = 8
+
+
+async def _fetch_player_profiles(ids: list[int]) -> dict[int, dict]:
+    found: dict[int, dict] = {}
+    for start in range(0, len(ids), PROFILES_BULK_MAX):
+        chunk = ids[start:start + PROFILES_BULK_MAX]
+        try:
+            async with await _request("POST", "players/bulk/", json={"discord_ids": chunk}) as resp:
+                if resp.status == 200:
+                    data = await _safe_json(resp)
+                    rows = data.get("results") if isinstance(data, dict) else data
+                    found.update({int(p["discord_id"]): p for p in rows or [] if p.get("discord_id")})
+                    continue
+                body = (await resp.text())[:300]
+        except Exception as e:
+            # _request уже повторял — поштучный обход тут не поможет, а нагрузку умножит
+            logger.error(f"❌ players/bulk/ failed: {e}")
+            continue
+
+        if resp.status not in (404, 405):
+            logger.error(f"POST players/bulk/ -> {resp.status}: {body}")
+            continue
+        found.update(await _fetch_profiles_one_by_one(chunk))
+    return found
+
+
+async def _fetch_profiles_one_by_one(ids: list[int]) -> dict[int, dict]:
+    """Старый бэкенд без players/bulk/."""
+    slots = asyncio.Semaphore(PROFILES_FALLBACK_CONCURRENCY)
+
+    async def fetch(discord_id: int) -> dict:
+        async with slots:
+            return await _fetch_player_profile(discord_id)
+
+    profiles = await asyncio.gather(*(fetch(i) for i in ids), return_exceptions=True)
+    return {i: p for i, p in zip(ids, profiles) if isinstance(p, dict) and p}
+
 async def update_player_profile(
     discord_id: int,
     username: str | None = None,
     rank: str | None = None,
     create_if_not_exist: bool = False,
+    riot_puuid: str | None = None,
+    riot_region: str | None = None,
 ) -> dict:
     payload: dict = {
         "discord_id": discord_id,
@@ -119,6 +192,11 @@ async def update_player_profile(
     if rank is not None:
         payload["rank"] = rank
 
+    # смена username на бэкенде сбрасывает puuid — передаём новый в том же запросе
+    if riot_puuid is not None:
+        payload["riot_puuid"] = riot_puuid
+        payload["riot_region"] = riot_region or ""
+
     async with await _request("PATCH", "players/update_profile/", json=payload) as resp:
         body = await resp.text()
 
@@ -137,25 +215,144 @@ async def set_player_wins(discord_id: int, wins: int):
     async with await _request("POST", f"players/{discord_id}/set_wins/", json=payload) as resp:
         return await _safe_json(resp)
 
-async def get_all_players():
-    async with await _request("GET", "players/") as resp:
-        data = await _safe_json(resp)
-
-        if isinstance(data, dict) and isinstance(data.get("results"), list):
-            return data["results"]
+async def _iter_pages(path: str, page_size: int, extra: dict | None = None) -> AsyncIterator[list[dict]]:
+    """
+    Страницы cursor-пагинации DRF по одной. Держим в памяти только текущую;
+    из "next" берём лишь cursor (хост в нём — как его видит Django за прокси).
+    Старый бэкенд без пагинации отдаёт список целиком — это одна страница.
+    Ошибка посреди обхода — RuntimeError: обрезанный список не должен выглядеть полным.
+    """
+    base = {"page_size": str(page_size), **(extra or {})}
+    params = base
+    while True:
+        async with await _request("GET", path, params=params) as resp:
+            if resp.status != 200:
+                logger.error(f"❌ GET {path} {resp.status}: {await resp.text()}")
+                raise RuntimeError(f"GET {path} failed: {resp.status}")
+            data = await _safe_json(resp)
 
         if isinstance(data, list):
-            return data
+            yield data
+            return
+        rows = data.get("results")
+        if not isinstance(rows, list):
+            raise RuntimeError(f"GET {path}: unexpected response")
+        if rows:
+            yield rows
+
+        cursor = parse_qs(urlsplit(data.get("next") or "").query).get("cursor")
+        if not cursor:
+            return
+        params = {**base, "cursor": cursor[0]}
+
+
+async def iter_matches(page_size: int = 100, fields: list[str] | None = None) -> AsyncIterator[dict]:
+    """
+    Матчи потоком, от новых к старым. Список отдаётся в облегчённом виде
+    (без событий, составы — id игроков); fields сужает его ещё сильнее.
+    Полный матч с журналом событий — get_match(match_id).
+    """
+    extra = {"fields": ",".join(fields)} if fields else None
+    async for rows in _iter_pages("matches/", page_size, extra):
+        for row in rows:
+            yield row
 
-        return []
+
+async def get_all_players(page_size: int = 200):
+    return [p async for rows in _iter_pages("players/", page_size) for p in rows]
 
 async def add_win(discord_id: int):
     async with await _request("POST", f"players/{discord_id}/add_win/") as resp:
         return await _safe_json(resp)
 
 async def get_top10_players():
-    async with await _request("GET", "players/top10/") as resp:
-        return await _safe_json(resp) if resp.status == 200 else []
+    return await _get_leaderboard_rows("players/top10/") or []
+
+
+# Лидерборд: Django отдаёт ETag с версией таблицы. Храним последние строки и
+# шлём If-None-Match — пока статистика не менялась, в ответ приходит пустой 304.
+_leaderboard_cache: dict[str, tuple[str, list[dict]]] = {}  # endpoint -> (etag, rows)
+_leaderboard_flight = SingleFlight("leaderboard")
+
+
+async def _get_leaderboard_rows(endpoint: str) -> list[dict] | None:
+    """Строки лидерборда (копии — вызывающие дописывают в них display_name). None — ошибка."""
+    rows = await _leaderboard_flight.do(endpoint, lambda: _fetch_leaderboard_rows(endpoint))
+    return None if rows is None else [dict(r) for r in rows]
+
+
+async def _fetch_leaderboard_rows(endpoint: str) -> list[dict] | None:
+    cached = _leaderboard_cache.get(endpoint)
+    headers = {"If-None-Match": cached[0]} if cached else {}
+
+    async with await _request("GET", endpoint, headers=headers) as resp:
+        if resp.status == 304 and cached:
+            return cached[1]
+        txt = await resp.text()
+        if resp.status != 200:
+            logger.error(f"❌ GET {endpoint} {resp.status}: {txt}")
+            return None
+        try:
+            data = json.loads(txt)
+        except Exception:
+            logger.error(f"❌ JSON parse failed for {endpoint}: {txt[:200]}")
+            return None
+
+        rows = data.get("results") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            return None
+        etag = resp.headers.get("ETag")
+        if etag:
+            _leaderboard_cache[endpoint] = (etag, rows)
+        return rows
+
+async def get_leaderboard_page(after: str | None = None, limit: int = 10) -> dict | None:
+    """
+    Страница лидерборда: {"results": [...строки с "place"], "next": курсор|None}.
+    after — курсор из "next" предыдущей страницы (None — с первого места).
+    """
+    params = {"limit": str(limit)}
+    if after:
+        params["after"] = after
+    async with await _request("GET", "players/leaderboard/page/", params=params) as resp:
+        if resp.status != 200:
+            logger.error(f"❌ GET players/leaderboard/page/ {resp.status}: {await resp.text()}")
+            return None
+        data = await _safe_json(resp)
+        return data if isinstance(data.get("results"), list) else None
+
+async def get_stale_ranks(
+    older_than: int,
+    after: str | None = None,
+    limit: int = 50,
+    with_count: bool = False,
+) -> dict | None:
+    """
+    Игроки, чей ранг старше older_than секунд (самые давние первыми):
+    {"results": [...профили], "next": курсор|None}. None — ошибка бэкенда.
+    with_count — добавить "count": размер всей очереди.
+    """
+    params = {"older_than": str(int(older_than)), "limit": str(limit)}
+    if after:
+        params["after"] = after
+    if with_count:
+        params["count"] = "1"
+    async with await _request("GET", "players/stale_ranks/", params=params) as resp:
+        if resp.status != 200:
+            logger.error(f"❌ GET players/stale_ranks/ {resp.status}: {await resp.text()}")
+            return None
+        data = await _safe_json(resp)
+        return data if isinstance(data.get("results"), list) else None
+
+async def get_player_position(discord_id: int) -> dict | None:
+    """Место игрока: {"place", "total", "wins", "matches", "winrate", ...}; None — нет в базе/ошибка."""
+    async with await _request("GET", f"players/{discord_id}/position/") as resp:
+        if resp.status == 404:
+            return None
+        if resp.status != 200:
+            logger.error(f"❌ GET players/{discord_id}/position/ {resp.status}: {await resp.text()}")
+            return None
+        return await _safe_json(resp)
 
 async def close_season(season_name: str, confirm: str = "CONFIRM") -> dict:
     payload = {
@@ -190,9 +387,8 @@ async def create_match(payload: dict) -> dict:
         return data
 
 
-async def get_all_matches():
-    async with await _request("GET", "matches/") as resp:
-        return await _safe_json(resp)
+async def get_all_matches(fields: list[str] | None = None):
+    return [m async for m in iter_matches(fields=fields)]
 
 async def save_match_result(match_id: int, winner_team: int):
     payload = {"winner_team": winner_team}  # 1 или 2
@@ -280,20 +476,9 @@ async def get_leaderboard_top(limit: int = 3) -> list[int]:
 
     for endpoint in ("players/leaderboard/", "players/top10/"):
         try:
-            async with await _request("GET", endpoint) as resp:
-                txt = await resp.text()
-                if resp.status != 200:
-                    logger.error(f"❌ GET {endpoint} {resp.status}: {txt}")
-                    continue
-                try:
-                    data = json.loads(txt)
-                except Exception:
-                    logger.error(f"❌ JSON parse failed for {endpoint}: {txt[:200]}")
-                    continue
-                rows = data.get("results") if isinstance(data, dict) else data
-                ids = _extract_ids(rows)
-                if ids:
-                    return ids[:limit]
+            ids = _extract_ids(await _get_leaderboard_rows(endpoint))
+            if ids:
+                return ids[:limit]
         except Exception as e:
             logger.error(f"❌ leaderboard fetch failed for {endpoint}: {e}")
     return []
@@ -316,6 +501,32 @@ async def start_match(match_id: int):
         return resp.status == 200, data
 
 
+async def create_and_start_match(payload: dict) -> tuple[bool, dict]:
+    """
+    Создать матч и сразу перевести в IN_PROGRESS одним запросом (POST matches/start/).
+    Если бэкенд старый и эндпоинта нет — старая цепочка create → mark_ready → start.
+    """
+    async with await _request("POST", "matches/start/", json=payload) as resp:
+        data = await _safe_json(resp)
+        if resp.status in (200, 201):
+            logger.success(f"Матч создан и запущен: id={data.get('id')} status={resp.status}")
+            return True, data
+        if resp.status not in (404, 405):
+            logger.error(f"❌ matches/start/ failed: {resp.status} - {data}")
+            return False, data
+
+    data = await create_match(payload)
+    mid = data.get("id")
+    if not mid:
+        return False, data
+
+    ok, ready_data = await mark_match_ready(mid)
+    if not ok:
+        return False, {**data, "error": ready_data}
+
+    return await start_match(mid)
+
+
 async def cancel_match(match_id: int):
     async with await _request("POST", f"matches/{match_id}/cancel_match/") as resp:
         data = await _safe_json(resp)
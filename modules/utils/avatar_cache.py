@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+
+import aiohttp
+import discord
+from loguru import logger
+
+# Кэш скачанных аватаров Discord. Ключ — хэш аватара (display_avatar.key) + размер:
+# новый аватар = новый хэш, так что устаревших байт тут быть не может,
+# TTL нужен только чтобы не держать в памяти тех, кто давно не открывал /profile.
+AVATAR_CACHE_TTL = float(os.getenv("AVATAR_CACHE_TTL", "3600"))
+AVATAR_CACHE_MAX_MB = float(os.getenv("AVATAR_CACHE_MAX_MB", "16"))
+
+
+class AvatarCache:
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: str) -> None:
+        _, data = self._items.pop(key)
+        self._bytes -= len(data)
+
+    def get(self, key: str) -> bytes | None:
+        item = self._items.get(key)
+        if item is None or time.time() - item[0] > self.ttl:
+            if item is not None:
+                self._drop(key)
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        if key in self._items:
+            self._drop(key)
+        self._items[key] = (time.time(), data)
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes and self._items:
+            self._drop(next(iter(self._items)))
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        return {
+            "items": len(self._items),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+avatar_cache = AvatarCache(AVATAR_CACHE_TTL, int(AVATAR_CACHE_MAX_MB * 1024 * 1024))
+
+
+async def fetch_avatar(
+    user: discord.abc.User,
+    session: aiohttp.ClientSession | None,
+    size: int = 256,
+) -> tuple[str | None, bytes | None]:
+    """
+    (ключ, байты) аватара пользователя. Ключ прокидывается в генератор профиля,
+    чтобы он брал уже декодированный и отресайзенный тайл из своего кэша.
+    """
+    asset = user.display_avatar
+    key = f"{asset.key}:{size}"
+
+    data = avatar_cache.get(key)
+    if data is not None:
+        return key, data
+
+    if session is None:
+        return None, None
+
+    try:
+        async with session.get(asset.replace(size=size).url) as resp:
+            if resp.status != 200:
+                return None, None
+            data = await resp.read()
+    except Exception as e:
+        logger.warning(f"⚠ Не удалось скачать аватар {user.id}: {e}")
+        return None, None
+
+    avatar_cache.put(key, data)
+    return key, data
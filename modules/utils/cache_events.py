@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import hmac
+import os
+from collections.abc import Awaitable, Callable
+
+from aiohttp import web
+from loguru import logger
+
+# Приёмник уведомлений от Django: «профили этих игроков изменились».
+# Django шлёт POST {"event": "players_changed", "discord_ids": [...]} (или
+# "all": true при сбросе статистики/закрытии сезона) после коммита транзакции,
+# бот сбрасывает соответствующие записи кэшей. Благодаря этому кэши живут с
+# длинным TTL и при этом сразу видят результат матча.
+#
+# Включается заданием BOT_WEBHOOK_PORT и BOT_WEBHOOK_SECRET; в Django —
+# BOT_WEBHOOK_URL на этот порт и тот же BOT_WEBHOOK_SECRET. Долгий TTL кэшам
+# можно держать, только пока приёмник реально работает (is_running()).
+
+BOT_WEBHOOK_HOST = os.getenv("BOT_WEBHOOK_HOST", "0.0.0.0")
+BOT_WEBHOOK_PORT = int(os.getenv("BOT_WEBHOOK_PORT", "0") or 0)
+BOT_WEBHOOK_SECRET = os.getenv("BOT_WEBHOOK_SECRET", "")
+WEBHOOK_PATH = "/cache/players_changed"
+
+ENABLED = BOT_WEBHOOK_PORT > 0 and bool(BOT_WEBHOOK_SECRET)
+
+# callback(discord_ids) — None означает «сбросить всё»
+Listener = Callable[[list[int] | None], Awaitable[None]]
+
+_listeners: list[Listener] = []
+_runner: web.AppRunner | None = None
+_received = 0
+
+
+def subscribe(listener: Listener) -> None:
+    _listeners.append(listener)
+
+
+async def publish(discord_ids: list[int] | None) -> None:
+    for listener in _listeners:
+        try:
+            await listener(discord_ids)
+        except Exception as e:
+            logger.warning(f"⚠ Обработчик сброса кэша упал: {e}")
+
+
+async def _handle(request: web.Request) -> web.Response:
+    global _received
+    secret = request.headers.get("X-Webhook-Secret", "")
+    if not BOT_WEBHOOK_SECRET or not hmac.compare_digest(secret, BOT_WEBHOOK_SECRET):
+        return web.json_response({"error": "forbidden"}, status=403)
+
+    try:
+        data = await request.json()
+    except Exception:
+        return web.json_response({"error": "invalid json"}, status=400)
+    if not isinstance(data, dict):
+        return web.json_response({"error": "body must be a json object"}, status=400)
+
+    if data.get("event") != "players_changed":
+        return web.json_response({"ok": True, "ignored": True})
+
+    if data.get("all"):
+        discord_ids = None
+    else:
+        try:
+            discord_ids = [int(x) for x in data.get("discord_ids") or []]
+        except (TypeError, ValueError):
+            return web.json_response({"error": "discord_ids must be integers"}, status=400)
+        if not discord_ids:
+            return web.json_response({"ok": True})
+
+    _received += 1
+    logger.debug(
+        f"🔔 players_changed ({data.get('reason')}): "
+        f"{'все' if discord_ids is None else len(discord_ids)}"
+    )
+    await publish(discord_ids)
+    return web.json_response({"ok": True})
+
+
+async def start_server() -> None:
+    global _runner
+    if _runner is not None:
+        return
+    if not ENABLED:
+        if BOT_WEBHOOK_PORT > 0:
+            logger.warning("⚠ BOT_WEBHOOK_SECRET не задан — приёмник уведомлений от Django не запущен")
+        return
+
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, _handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, BOT_WEBHOOK_HOST, BOT_WEBHOOK_PORT).start()
+    except Exception:
+        await runner.cleanup()
+        raise
+    _runner = runner
+    logger.success(f"🔔 Приёмник уведомлений запущен: {BOT_WEBHOOK_HOST}:{BOT_WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+
+async def stop_server() -> None:
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
+
+
+def is_running() -> bool:
+    return _runner is not None
+
+
+def get_cache_events_stats() -> dict:
+    return {"enabled": _runner is not None, "received": _received, "listeners": len(_listeners)}
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from enum import IntEnum
+
+from loguru import logger
+
+# Планировщик запросов к HenrikDev: token bucket + очередь с приоритетами.
+#
+# Бюджет — HENRIKDEV_RATE_PER_MIN запросов в минуту, до HENRIKDEV_BURST подряд.
+# Кто ждёт, получает токен строго по приоритету (INTERACTIVE → LOBBY →
+# BACKGROUND), внутри класса — по очереди прихода. Фоновым задачам токен
+# выдаётся, только если после этого в ведре останется запас — поэтому
+# массовый синк выбирает весь бюджет, но игрок, который прямо сейчас
+# заходит в лобби, не стоит за сотней фоновых запросов.
+#
+# 429 и заголовки лимита (Retry-After, x-ratelimit-*) ставят выдачу на паузу
+# и временно снижают темп; после серии успешных ответов темп восстанавливается.
+
+HENRIKDEV_RATE_PER_MIN = float(os.getenv("HENRIKDEV_RATE_PER_MIN", "27"))
+HENRIKDEV_BURST = max(2, int(os.getenv("HENRIKDEV_BURST", "3")))
+
+# нижняя граница темпа при адаптивном снижении
+_MIN_RATE_PER_MIN = 6.0
+# пауза после 429 без подсказки сервера: удваивается подряд до потолка
+_BACKOFF_BASE_SECONDS = 5.0
+_BACKOFF_MAX_SECONDS = 60.0
+# сколько успешных ответов подряд нужно, чтобы поднять темп на шаг
+_RECOVER_AFTER = 10
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0   # игрок ждёт ответа: вход в лобби, сохранение профиля
+    LOBBY = 1         # подгрузка профилей для картинки/закрытия лобби
+    BACKGROUND = 2    # массовый синк рангов
+
+
+# сколько токенов должно остаться в ведре после выдачи этому классу
+_RESERVE = {Priority.INTERACTIVE: 0, Priority.LOBBY: 0, Priority.BACKGROUND: 1}
+
+
+class HenrikScheduler:
+    def __init__(self, rate_per_min: float, burst: int):
+        self.base_rate = rate_per_min / 60.0
+        self.rate = self.base_rate
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._backoff = _BACKOFF_BASE_SECONDS
+        self._successes = 0
+
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: asyncio.Event | None = None
+        self._dispatcher: asyncio.Task | None = None
+
+        self.granted = {p: 0 for p in Priority}
+        self.wait_ms_total = {p: 0.0 for p in Priority}
+        self.wait_ms_max = {p: 0.0 for p in Priority}
+        self.throttled = 0
+
+    # ---------- выдача токенов ----------
+
+    async def acquire(self, priority: Priority = Priority.INTERACTIVE) -> None:
+        """Дождаться права на один запрос к HenrikDev."""
+        self._ensure_dispatcher()
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(priority), next(self._seq), fut))
+        self._wakeup.set()
+
+        started = time.monotonic()
+        # отменённый ожидающий просто выпадет из очереди: диспетчер пропускает done()
+        await fut
+        waited = (time.monotonic() - started) * 1000
+        self.granted[priority] += 1
+        self.wait_ms_total[priority] += waited
+        self.wait_ms_max[priority] = max(self.wait_ms_max[priority], waited)
+
+    def _ensure_dispatcher(self) -> None:
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _delay_for(self, priority: int, now: float) -> float:
+        """Через сколько секунд можно выдать токен классу priority (0 — сейчас)."""
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        need = 1.0 + _RESERVE[Priority(priority)]
+        if self._tokens >= need:
+            return 0.0
+        return (need - self._tokens) / self.rate
+
+    async def _dispatch(self) -> None:
+        while True:
+            while self._queue and self._queue[0][2].done():
+                heapq.heappop(self._queue)
+
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            priority = self._queue[0][0]
+            delay = self._delay_for(priority, time.monotonic())
+            if delay > 0:
+                # ждём токен, но просыпаемся раньше, если пришёл кто-то важнее
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, fut = heapq.heappop(self._queue)
+            self._tokens -= 1.0
+            fut.set_result(None)
+
+    def has_spare_budget(self) -> bool:
+        """Никто не ждёт, паузы нет и фоновому запросу хватит токенов с запасом."""
+        if any(not fut.done() for *_, fut in self._queue):
+            return False
+        return self._delay_for(Priority.BACKGROUND, time.monotonic()) == 0.0
+
+    # ---------- обратная связь от ответов ----------
+
+    def report(self, status: int, headers) -> None:
+        """Учесть ответ HenrikDev: 429 и заголовки лимита подстраивают темп."""
+        now = time.monotonic()
+        retry_after = _header_seconds(headers, "Retry-After")
+        remaining = _header_float(headers, "x-ratelimit-remaining")
+        reset = _header_seconds(headers, "x-ratelimit-reset")
+
+        if status == 429:
+            self.throttled += 1
+            self._successes = 0
+            wait = retry_after or reset or self._backoff
+            self._backoff = min(self._backoff * 2, _BACKOFF_MAX_SECONDS)
+            self.rate = max(self.rate * 0.7, _MIN_RATE_PER_MIN / 60.0)
+            self._pause(now, wait)
+            logger.warning(
+                f"[HenrikDev] 429 — пауза {wait:.1f}s, темп {self.rate * 60:.1f}/мин"
+            )
+            return
+
+        if remaining is not None and remaining <= 0 and reset:
+            # бюджет окна исчерпан (например, ключ делят несколько процессов)
+            self._pause(now, reset)
+
+        if status < 500:
+            self._backoff = _BACKOFF_BASE_SECONDS
+            self._successes += 1
+            if self._successes >= _RECOVER_AFTER and self.rate < self.base_rate:
+                self._successes = 0
+                self.rate = min(self.base_rate, self.rate + 1.0 / 60.0)
+
+    def _pause(self, now: float, seconds: float) -> None:
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._refilled_at = max(now, self._paused_until)
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "rate_per_min": round(self.rate * 60, 1),
+            "base_rate_per_min": round(self.base_rate * 60, 1),
+            "queued": sum(1 for *_, fut in self._queue if not fut.done()),
+            "paused_for": round(max(0.0, self._paused_until - now), 1),
+            "throttled": self.throttled,
+            "classes": {
+                p.name.lower(): {
+                    "granted": self.granted[p],
+                    "avg_wait_ms": round(self.wait_ms_total[p] / self.granted[p], 1) if self.granted[p] else 0.0,
+                    "max_wait_ms": round(self.wait_ms_max[p], 1),
+                }
+                for p in Priority
+            },
+        }
+
+
+def _header_float(headers, name: str) -> float | None:
+    raw = headers.get(name) if headers is not None else None
+    if raw is None:
+        return None
+    try:
+        return float(raw)
+    except (TypeError, ValueError):
+        return None
+
+
+def _header_seconds(headers, name: str) -> float | None:
+    value = _header_float(headers, name)
+    if value is None or value <= 0:
+        return None
+    # некоторые API отдают reset как unix-время, а не «через сколько секунд»
+    if value > 10 ** 9:
+        value -= time.time()
+    return value if value > 0 else None
+
+
+scheduler = HenrikScheduler(HENRIKDEV_RATE_PER_MIN, HENRIKDEV_BURST)
+
+
+def get_henrik_scheduler_stats() -> dict:
+    return scheduler.stats()
+
+
+def has_spare_budget() -> bool:
+    return scheduler.has_spare_budget()
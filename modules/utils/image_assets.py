@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from loguru import logger
+from PIL import Image
+
+# Кэш декодированных ассетов для генератора картинок.
+# Шаблоны (lobby_base.png и т.п.) декодируются один раз, иконки рангов хранятся
+# уже отресайзенными под конкретный размер — после прогрева рендер строки лобби
+# не делает ни файлового I/O, ни LANCZOS.
+#
+# Кэш живёт в процессе: в пуле процессов у каждого воркера свой (греется
+# initializer'ом пула), в пуле потоков — один общий.
+
+# Потолок по памяти (RGBA: w * h * 4 байта на картинку).
+ASSET_CACHE_MAX_MB = float(os.getenv("ASSET_CACHE_MAX_MB", "96"))
+# Отдельный бюджет под готовые тайлы строк лобби (~450 KB на строку),
+# чтобы они не вытесняли шаблоны и иконки.
+ROW_TILE_CACHE_MAX_MB = float(os.getenv("ROW_TILE_CACHE_MAX_MB", "32"))
+# Декодированные и отресайзенные аватары для профиль-карты (ключ — хэш аватара).
+AVATAR_TILE_CACHE_MAX_MB = float(os.getenv("AVATAR_TILE_CACHE_MAX_MB", "24"))
+
+
+def _image_bytes(img: Image.Image) -> int:
+    return img.width * img.height * len(img.getbands())
+
+
+class AssetCache:
+    """LRU по байтам. Значения — готовые RGBA-картинки, которые нельзя мутировать."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[tuple, Image.Image] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Image.Image | None:
+        with self._lock:
+            img = self._items.get(key)
+            if img is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return img
+
+    def put(self, key: tuple, img: Image.Image) -> None:
+        size = _image_bytes(img)
+        if size > self.max_bytes:
+            # картинка больше всего бюджета — не кэшируем, просто отдаём
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= _image_bytes(old)
+            self._items[key] = img
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= _image_bytes(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+_cache = AssetCache(int(ASSET_CACHE_MAX_MB * 1024 * 1024))
+row_tiles = AssetCache(int(ROW_TILE_CACHE_MAX_MB * 1024 * 1024))
+avatar_tiles = AssetCache(int(AVATAR_TILE_CACHE_MAX_MB * 1024 * 1024))
+
+
+def load_template(path: Path | str) -> Image.Image | None:
+    """
+    Шаблон-подложка. Возвращаем КОПИЮ: генераторы рисуют прямо на ней.
+    None — если файла нет (генератор сам решает, чем его заменить).
+    """
+    key = ("template", str(path))
+    img = _cache.get(key)
+    if img is None:
+        path = Path(path)
+        if not path.exists():
+            return None
+        with Image.open(path) as raw:
+            img = raw.convert("RGBA")
+        _cache.put(key, img)
+    return img.copy()
+
+
+def load_icon(path: Path | str, size: int | tuple[int, int]) -> Image.Image | None:
+    """
+    Иконка, уже приведённая к RGBA и размеру size (LANCZOS).
+    Возвращается общий объект — годится только для paste()/alpha_composite() как источник.
+    """
+    w, h = (size, size) if isinstance(size, int) else size
+    key = ("icon", str(path), w, h)
+    img = _cache.get(key)
+    if img is None:
+        path = Path(path)
+        if not path.exists():
+            return None
+        with Image.open(path) as raw:
+            img = raw.convert("RGBA").resize((w, h), Image.LANCZOS)
+        _cache.put(key, img)
+    return img
+
+
+def warm_up(templates: list[Path], icons_dir: Path, icon_sizes: list[int]) -> None:
+    """Прогреваем кэш: все шаблоны + все иконки из icons_dir под каждый размер."""
+    for p in templates:
+        try:
+            load_template(p)
+        except Exception as e:
+            logger.warning(f"⚠ Не удалось прогреть шаблон {p}: {e}")
+
+    icon_paths = sorted(icons_dir.glob("*.png")) if icons_dir.exists() else []
+    for p in icon_paths:
+        for size in icon_sizes:
+            try:
+                load_icon(p, size)
+            except Exception as e:
+                logger.warning(f"⚠ Не удалось прогреть иконку {p.name}@{size}: {e}")
+
+    s = _cache.stats()
+    logger.debug(f"🖼 Кэш ассетов прогрет: items={s['items']}, {s['bytes'] / 1024 / 1024:.1f} MB (pid={os.getpid()})")
+
+
+# functools.lru_cache генератора (шрифты, слои свечения, тайлы бан-сетки и т.п.):
+# регистрируются здесь, чтобы clear_caches() и статистика видели и их —
+# сам image_generator отсюда импортировать нельзя (циклический импорт).
+_lru_caches: dict[str, object] = {}
+
+
+def register_lru_cache(name: str):
+    """Декоратор поверх @lru_cache: функция попадёт в clear_caches()/get_asset_stats()."""
+    def wrap(fn):
+        _lru_caches[name] = fn
+        return fn
+    return wrap
+
+
+def clear_caches() -> None:
+    """Сброс кэшей (для бенчмарка и замеров «с холодного старта»)."""
+    _cache.clear()
+    row_tiles.clear()
+    avatar_tiles.clear()
+    for fn in _lru_caches.values():
+        fn.cache_clear()
+
+
+def get_asset_stats() -> dict:
+    return {
+        "assets": _cache.stats(),
+        "row_tiles": row_tiles.stats(),
+        "avatar_tiles": avatar_tiles.stats(),
+        "lru": {name: fn.cache_info()._asdict() for name, fn in _lru_caches.items()},
+    }
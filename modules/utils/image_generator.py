@@ -7,6 +7,15 @@ import random
 from datetime import datetime
 import os
 
+from modules.utils.image_assets import (
+    avatar_tiles,
+    load_icon,
+    load_template,
+    register_lru_cache,
+    row_tiles,
+    warm_up,
+)
+
 
 # ---------- Themes registry (профиль/лидерборд) ----------
 THEMES: dict[str, dict] = {
@@ -297,7 +306,9 @@ def _color_for_top(pid: int | None, top_ids: list[int] | None):
         return None
     return (COLOR_GOLD, COLOR_SILVER, COLOR_BRONZE)[i] if i < 3 else None
 
-@lru_cache(maxsize=8)
+# _fit_font перебирает размеры с шагом 2 — держим их все, чтобы не читать TTF на каждой строке
+@register_lru_cache("font")
+@lru_cache(maxsize=64)
 def get_font(size: int):
     # 1) пробуем Inter из проекта
     for p in CANDIDATE_FONT_PATHS:
@@ -368,6 +379,8 @@ def _parse_rank_icon(rank: str) -> tuple[str | None, str | None]:
 
     return base, tier
     
+@register_lru_cache("icon_path")
+@lru_cache(maxsize=128)
 def get_icon_path(rank: str):
     """
     Принимает:
@@ -404,6 +417,40 @@ def _draw_text(draw: ImageDraw.ImageDraw, xy: tuple[int, int], text: str, font,
     """Рисует текст с тонкой чёрной обводкой для контраста."""
     draw.text(xy, text, font=font, fill=fill, stroke_width=stroke, stroke_fill=(0, 0, 0, 220))
 
+def _require_template(path: Path) -> Image.Image:
+    """Шаблон из кэша ассетов; без фоллбэка — как раньше с Image.open."""
+    img = load_template(path)
+    if img is None:
+        raise FileNotFoundError(path)
+    return img
+
+# Размеры иконок рангов во всех генераторах — под них греем кэш ассетов.
+RANK_ICON_SIZES = (60, 48, 54, 176)  # лобби, драфт, лидерборд, профиль (scale=1)
+TEMPLATE_NAMES = ("lobby_base.png", "draft_base.png", "leaderboard.png", "profile_summer_base.png")
+
+def warm_up_assets() -> None:
+    """Прогрев кэша ассетов: вызывается на старте бота и в initializer пула рендера."""
+    pictures_dir = Path(__file__).resolve().parents[1] / "pictures"
+    warm_up([pictures_dir / name for name in TEMPLATE_NAMES], RANK_ICONS_PATH, list(RANK_ICON_SIZES))
+    try:
+        warm_up_map_tiles()
+    except Exception as e:
+        print(f"⚠ Не удалось прогреть атлас карт: {e}")
+
+def _export_image(img: Image.Image, out_path: Path, as_bytes: bool = False) -> Path | BytesIO:
+    """
+    as_bytes=False — старое поведение: пишем PNG в общий файл и возвращаем путь.
+    as_bytes=True  — кодируем PNG в память: без записи на диск и без гонок
+    между лобби, которые рендерят одновременно.
+    """
+    if as_bytes:
+        buf = BytesIO()
+        img.save(buf, format="PNG")
+        buf.seek(0)
+        return buf
+    img.save(out_path)
+    return out_path
+
 # Theme overlays (profile card)
 def _rect_intersects(a: tuple[int, int, int, int], b: tuple[int, int, int, int]) -> bool:
     ax1, ay1, ax2, ay2 = a
@@ -412,6 +459,8 @@ def _rect_intersects(a: tuple[int, int, int, int], b: tuple[int, int, int, int])
 
 
 
+@register_lru_cache("rank_icon_path")
+@lru_cache(maxsize=64)
 def _rank_icon_path(rank: str) -> Path | None:
     """Находим файл иконки ранга по префиксу (без учёта регистра)."""
     ranks_dir = Path(__file__).resolve().parents[1] / "pictures" / "ranks"
@@ -462,15 +511,18 @@ def format_username(username: str, display_name: str | None = None) -> str:
     # Итог без пробела: sweet(Юрачка)
     return f"{u}({suffix})"
 
-def generate_lobby_image(players: list[dict], top_ids: list[int] | None = None) -> Path:
+def generate_lobby_image(
+    players: list[dict],
+    top_ids: list[int] | None = None,
+    as_bytes: bool = False,
+) -> Path | BytesIO:
     top_ids = top_ids or []
 
     pictures_dir = Path(__file__).resolve().parents[1] / "pictures"
     base_path = pictures_dir / "lobby_base.png"
     output_path = pictures_dir / "lobby_dynamic.png"
 
-    base_img = Image.open(base_path).convert("RGBA") if base_path.exists() \
-        else Image.new("RGBA", (1024, 1280), (20, 20, 20, 255))
+    base_img = load_template(base_path) or Image.new("RGBA", (1024, 1280), (20, 20, 20, 255))
     draw = ImageDraw.Draw(base_img)
     width, height = base_img.size
 
@@ -516,25 +568,31 @@ def generate_lobby_image(players: list[dict], top_ids: list[int] | None = None)
         txt = "Нет участников"
         tw = draw.textlength(txt, font=empty_font)
         _draw_text(draw, ((width - tw) // 2, start_y + 20), txt, empty_font, fill="#D0D0D0", stroke=3)
-        base_img.save(output_path)
-        return output_path
-
-    for idx, p in enumerate(players, start=1):
-        display_name = str(p.get("display_name") or "").strip()
-        label = format_username(p.get("username"), display_name)
-
-        rank_raw = str(p.get("rank") or "Unranked").strip()
-        icon_path = get_icon_path(rank_raw) or _rank_icon_path(_rank_base(rank_raw))
-
-        pid = p.get("discord_id") or p.get("id")
-        name_color = _color_for_top(pid, top_ids) or "white"
-
-        y = start_y + (idx - 1) * (ROW_H + ROW_GAP)
+        return _export_image(base_img, output_path, as_bytes)
+
+    # Всё, что рисуется в строке, лежит внутри её карточки (rounded_rectangle),
+    # а рисование на RGBA заменяет пиксели, а не смешивает их с фоном. Поэтому
+    # строку можно отрисовать на прозрачном тайле размером с карточку и вклеить
+    # по маске карточки — результат тот же, что при рисовании прямо на шаблоне.
+    # Тайл не зависит от фона и от y: при join/leave список сдвигается (он
+    # центрирован по вертикали), но перерисовываются только строки, у которых
+    # поменялись номер/ник/цвет/ранг — остальные берутся из кэша.
+    CARD_X0, CARD_X1 = CONTENT_LEFT - 18, CONTENT_RIGHT + 12
+    CARD_TOP = 6
+    card_size = (CARD_X1 - CARD_X0 + 1, CARD_TOP + ROW_H + 1)
+    card_box = (0, 0, card_size[0] - 1, card_size[1] - 1)
+
+    card_mask = Image.new("L", card_size, 0)
+    ImageDraw.Draw(card_mask).rounded_rectangle(card_box, radius=18, fill=255, outline=255, width=2)
+
+    def _render_row(idx: int, label: str, name_color, icon_path) -> Image.Image:
+        tile = Image.new("RGBA", card_size, (0, 0, 0, 0))
+        tdraw = ImageDraw.Draw(tile)
+        ty = CARD_TOP  # y строки внутри тайла
 
         # карточка строки
-        row_box = (CONTENT_LEFT - 18, y - 6, CONTENT_RIGHT + 12, y + ROW_H)
-        draw.rounded_rectangle(
-            row_box,
+        tdraw.rounded_rectangle(
+            card_box,
             radius=18,
             fill=(0, 0, 0, 110),
             outline=(255, 255, 255, 28),
@@ -542,42 +600,65 @@ def generate_lobby_image(players: list[dict], top_ids: list[int] | None = None)
         )
 
         # номер (по центру строки)
-        num_y = y + (ROW_H - _text_h(str(idx), number_font)) // 2 - 2
-        _draw_text(draw, (CONTENT_LEFT, num_y), f"{idx}", number_font, fill="white", stroke=2)
+        num_y = ty + (ROW_H - _text_h(str(idx), number_font)) // 2 - 2
+        _draw_text(tdraw, (CONTENT_LEFT - CARD_X0, num_y), f"{idx}", number_font, fill="white", stroke=2)
 
         # ник (по центру строки)
-        name_font = _fit_font(draw, label, NAME_W, start=54, min_size=30)
-        name_y = y + (ROW_H - _text_h(label, name_font)) // 2 - 3
-        _draw_text(draw, (NAME_X, name_y), label, name_font, fill=name_color, stroke=2)
+        name_font = _fit_font(tdraw, label, NAME_W, start=54, min_size=30)
+        name_y = ty + (ROW_H - _text_h(label, name_font)) // 2 - 3
+        _draw_text(tdraw, (NAME_X - CARD_X0, name_y), label, name_font, fill=name_color, stroke=2)
 
         # подложка под иконку (чтобы она читалась на любом фоне)
-        icon_y = y + (ROW_H - ICON_SIZE) // 2
-        bg_box = (ICON_X - ICON_PAD, icon_y - ICON_PAD, ICON_X + ICON_SIZE + ICON_PAD, icon_y + ICON_SIZE + ICON_PAD)
-        draw.rounded_rectangle(bg_box, radius=16, fill=(0, 0, 0, 140), outline=(255, 255, 255, 35), width=2)
+        icon_x = ICON_X - CARD_X0
+        icon_y = ty + (ROW_H - ICON_SIZE) // 2
+        bg_box = (icon_x - ICON_PAD, icon_y - ICON_PAD, icon_x + ICON_SIZE + ICON_PAD, icon_y + ICON_SIZE + ICON_PAD)
+        tdraw.rounded_rectangle(bg_box, radius=16, fill=(0, 0, 0, 140), outline=(255, 255, 255, 35), width=2)
 
-        # иконка ранга (качественный ресайз!)
-        if icon_path and Path(icon_path).exists():
+        # иконка ранга (качественный ресайз — один раз, дальше из кэша)
+        if icon_path:
             try:
-                icon = Image.open(icon_path).convert("RGBA").resize((ICON_SIZE, ICON_SIZE), Image.LANCZOS)
-                base_img.paste(icon, (ICON_X, icon_y), icon)
+                icon = load_icon(icon_path, ICON_SIZE)
+                if icon is not None:
+                    tile.paste(icon, (icon_x, icon_y), icon)
             except Exception:
                 pass
 
-    base_img.save(output_path)
-    return output_path
+        return tile
+
+    for idx, p in enumerate(players, start=1):
+        display_name = str(p.get("display_name") or "").strip()
+        label = format_username(p.get("username"), display_name)
+
+        rank_raw = str(p.get("rank") or "Unranked").strip()
+        icon_path = get_icon_path(rank_raw) or _rank_icon_path(_rank_base(rank_raw))
+
+        pid = p.get("discord_id") or p.get("id")
+        name_color = _color_for_top(pid, top_ids) or "white"
+
+        y = start_y + (idx - 1) * (ROW_H + ROW_GAP)
+
+        key = ("lobby_row", card_size, idx, label, name_color, str(icon_path))
+        tile = row_tiles.get(key)
+        if tile is None:
+            tile = _render_row(idx, label, name_color, icon_path)
+            row_tiles.put(key, tile)
+        base_img.paste(tile, (CARD_X0, y - CARD_TOP), card_mask)
+
+    return _export_image(base_img, output_path, as_bytes)
 
 
 def generate_draft_image(
     players: list[dict],
     captain_1_id: int,
     captain_2_id: int,
-    top_ids: list[int] | None = None
-) -> Path:
+    top_ids: list[int] | None = None,
+    as_bytes: bool = False,
+) -> Path | BytesIO:
     top_ids = top_ids or []
 
     base_path = Path(__file__).resolve().parents[1] / "pictures" / "draft_base.png"
     out_path  = Path(__file__).resolve().parents[1] / "pictures" / "draft_dynamic.png"
-    image = Image.open(base_path).convert("RGBA")
+    image = _require_template(base_path)
     draw  = ImageDraw.Draw(image)
 
     # ===== разметка колонок =====
@@ -650,9 +731,10 @@ def generate_draft_image(
             # 1) сначала рисуем иконку (чтобы текст всегда был поверх, если что)
             if icon_path:
                 try:
-                    icon = Image.open(icon_path).convert("RGBA").resize((ICON_SIZE, ICON_SIZE), Image.LANCZOS)
+                    icon = load_icon(icon_path, ICON_SIZE)
                     icon_y = y + (LINE_H - ICON_SIZE) // 2
-                    image.paste(icon, (x_icon, icon_y), icon)
+                    if icon is not None:
+                        image.paste(icon, (x_icon, icon_y), icon)
                 except Exception:
                     pass
 
@@ -668,17 +750,82 @@ def generate_draft_image(
     draw_column(team_1, L_TEXT_X, L_ICON_X, L_RIGHT, captain_id=captain_1_id)
     draw_column(team_2, R_TEXT_X, R_ICON_X, R_RIGHT, captain_id=captain_2_id)
 
-    image.save(out_path)
-    return out_path
+    return _export_image(image, out_path, as_bytes)
 
-def generate_map_ban_image(available_maps: list[str], banned_maps: list[str], current_captain: str) -> Path:
+# порядок/набор карт в бан-сетке: фиксированный, чтобы сетка была всегда одинаковая
+MAP_POOL = ["Ascent","Bind","Haven","Split","Icebox","Breeze","Fracture","Lotus","Sunset","Abyss","Pearl", "Corrode"]
+# размер ячейки карты в бан-сетке (1280px, 4 колонки, паддинги 40, зазоры 16)
+MAP_BAN_CELL = ((1280 - 40 * 2 - 16 * (4 - 1)) // 4, 160)
+
+
+def _apply_bottom_gradient(tile_rgba: Image.Image, max_alpha: int = 190, start_frac: float = 0.58) -> Image.Image:
+    """Чёрный градиент снизу для читабельности названия."""
+    w, h = tile_rgba.size
+    overlay = Image.new("RGBA", (w, h), (0, 0, 0, 0))
+    od = ImageDraw.Draw(overlay)
+
+    start_y = int(h * start_frac)
+    denom = max(1, h - start_y)
+    for yy in range(start_y, h):
+        a = int(max_alpha * ((yy - start_y) / denom))
+        od.line([(0, yy), (w, yy)], fill=(0, 0, 0, a))
+
+    return Image.alpha_composite(tile_rgba, overlay)
+
+
+@register_lru_cache("map_ban_tile")
+@lru_cache(maxsize=64)
+def _map_ban_tile(map_name: str, size: tuple[int, int], banned: bool) -> Image.Image:
+    """
+    Атлас тайлов бан-сетки: карта, ужатая под ячейку, + градиент под подпись
+    (+ затемнение для забаненной). Собирается один раз на карту/вариант —
+    шаг бана только раскладывает готовые тайлы и рисует бейджи.
+    Возвращается общий объект: только как источник для paste().
+    """
+    w, h = size
+
+    # фон-заглушка
+    tile = Image.new("RGBA", (w, h), (35, 35, 35, 255))
+
+    # картинка карты
+    icon_path = _find_map_image(map_name)
+    if icon_path:
+        try:
+            raw = load_icon(icon_path, (w, h))
+            if raw is not None:
+                tile = raw
+        except Exception as e:
+            print(f"⚠ Ошибка загрузки карты {map_name}: {e}")
+
+    # градиент под текст
+    tile = _apply_bottom_gradient(tile)
+
+    # если забанено — затемняем сильнее
+    if banned:
+        overlay = Image.new("RGBA", (w, h), (0, 0, 0, 150))
+        tile = Image.alpha_composite(tile, overlay)
+
+    return tile
+
+
+def warm_up_map_tiles() -> None:
+    for map_name in MAP_POOL:
+        for banned in (False, True):
+            _map_ban_tile(map_name, MAP_BAN_CELL, banned)
+
+
+def generate_map_ban_image(
+    available_maps: list[str],
+    banned_maps: list[str],
+    current_captain: str,
+    as_bytes: bool = False,
+) -> Path | BytesIO:
     WIDTH, HEIGHT = 1280, 720
     PADDING = 40
     GRID_COLS = 4
     GRID_HGAP = 16
     GRID_VGAP = 16
-    CELL_WIDTH = (WIDTH - PADDING * 2 - GRID_HGAP * (GRID_COLS - 1)) // GRID_COLS
-    CELL_HEIGHT = 160
+    CELL_WIDTH, CELL_HEIGHT = MAP_BAN_CELL
     TITLE_Y = 24
 
     output_path = Path(__file__).resolve().parents[1] / "pictures" / "map_draft_dynamic.png"
@@ -689,27 +836,13 @@ def generate_map_ban_image(available_maps: list[str], banned_maps: list[str], cu
     title_font = get_font(52)
     draw.text((PADDING, TITLE_Y), f"Бан карт — Ход: {current_captain}", font=title_font, fill="white")
 
-    # порядок/набор карт: оставляем фиксированный, чтобы сетка была всегда одинаковая
-    all_maps = ["Ascent","Bind","Haven","Split","Icebox","Breeze","Fracture","Lotus","Sunset","Abyss","Pearl", "Corrode"]
+    all_maps = MAP_POOL
 
     name_font = get_font(28)
     badge_font = get_font(22)
     order_font = get_font(20)
 
     banned_set = {m for m in banned_maps}
-    def apply_bottom_gradient(tile_rgba: Image.Image, max_alpha: int = 190, start_frac: float = 0.58) -> Image.Image:
-        """Чёрный градиент снизу для читабельности названия."""
-        w, h = tile_rgba.size
-        overlay = Image.new("RGBA", (w, h), (0, 0, 0, 0))
-        od = ImageDraw.Draw(overlay)
-
-        start_y = int(h * start_frac)
-        denom = max(1, h - start_y)
-        for yy in range(start_y, h):
-            a = int(max_alpha * ((yy - start_y) / denom))
-            od.line([(0, yy), (w, yy)], fill=(0, 0, 0, a))
-
-        return Image.alpha_composite(tile_rgba, overlay)
 
     def draw_badge(x: int, y: int, text: str, fill=(220, 60, 60, 220)):
         """Бейдж в левом верхнем углу."""
@@ -743,29 +876,9 @@ def generate_map_ban_image(available_maps: list[str], banned_maps: list[str], cu
         x = PADDING + col * (CELL_WIDTH + GRID_HGAP)
         y = 120 + row * (CELL_HEIGHT + GRID_VGAP)
 
-        # фон-заглушка
-        tile = Image.new("RGBA", (CELL_WIDTH, CELL_HEIGHT), (35, 35, 35, 255))
-
-        # картинка карты
-        icon_path = _find_map_image(map_name)
-        if icon_path:
-            try:
-                raw = Image.open(icon_path).convert("RGBA").resize((CELL_WIDTH, CELL_HEIGHT), Image.LANCZOS)
-                tile = raw
-            except Exception as e:
-                print(f"⚠ Ошибка загрузки карты {map_name}: {e}")
-
-        # градиент под текст
-        tile = apply_bottom_gradient(tile)
-
-        # если забанено — затемняем сильнее
+        # готовый тайл из атласа (карта + градиент, у забаненной — затемнение)
         is_banned = map_name in banned_set
-        if is_banned:
-            overlay = Image.new("RGBA", (CELL_WIDTH, CELL_HEIGHT), (0, 0, 0, 150))
-            tile = Image.alpha_composite(tile, overlay)
-
-        # вставляем тайл
-        image.paste(tile, (x, y))
+        image.paste(_map_ban_tile(map_name, (CELL_WIDTH, CELL_HEIGHT), is_banned), (x, y))
 
         # рамка: доступные подсвечиваем, забаненные — нейтральная
         if is_banned:
@@ -790,14 +903,14 @@ def generate_map_ban_image(available_maps: list[str], banned_maps: list[str], cu
                 pass
             draw_thin_x(x, y)
 
-    image.save(output_path)
-    return output_path
+    return _export_image(image, output_path, as_bytes)
 
 def generate_final_match_image(
     selected_map: str,
     attack_players: list[str],
     defense_players: list[str],
-) -> Path:
+    as_bytes: bool = False,
+) -> Path | BytesIO:
     pictures_dir = Path(__file__).resolve().parents[1] / "pictures"
     out_path = pictures_dir / "final_match_dynamic.png"
 
@@ -868,14 +981,19 @@ def generate_final_match_image(
     draw_list(PAD, attack_players)
     draw_list(PAD*2 + COL_W, defense_players)
 
-    canvas.save(out_path)
-    return out_path
+    return _export_image(canvas, out_path, as_bytes)
 
 
-def generate_leaderboard_image(players: list[dict], theme: str = "default") -> Path:
+def generate_leaderboard_image(
+    players: list[dict],
+    theme: str = "default",
+    as_bytes: bool = False,
+    start_place: int = 1,
+) -> Path | BytesIO:
+    """players — строки одной страницы (до 10); start_place — место первой строки."""
     base_path = Path(__file__).resolve().parents[1] / "pictures" / "leaderboard.png"
     output_path = Path(__file__).resolve().parents[1] / "pictures" / "leaderboard_dynamic.png"
-    image = Image.open(base_path).convert("RGBA")
+    image = _require_template(base_path)
     draw = ImageDraw.Draw(image)
     cfg = get_theme_cfg(theme)
 
@@ -899,8 +1017,9 @@ def generate_leaderboard_image(players: list[dict], theme: str = "default") -> P
         except Exception:
             return getattr(font, "size", 32)
 
-    for place, player in enumerate(players, start=1):
-        y = start_y + (place - 1) * (row_h + row_gap)
+    for idx, player in enumerate(players):
+        place = start_place + idx
+        y = start_y + idx * (row_h + row_gap)
 
         display_name = str(player.get("display_name") or "").strip()
         username = format_username(player.get("username"), display_name)
@@ -937,9 +1056,10 @@ def generate_leaderboard_image(players: list[dict], theme: str = "default") -> P
         icon_path = get_icon_path(rank_raw)
         if icon_path:
             try:
-                icon = Image.open(icon_path).convert("RGBA").resize((icon_size, icon_size), Image.LANCZOS)
+                icon = load_icon(icon_path, icon_size)
                 icon_y = y + (row_h - icon_size) // 2
-                image.paste(icon, (rank_icon_x, icon_y), icon)
+                if icon is not None:
+                    image.paste(icon, (rank_icon_x, icon_y), icon)
             except Exception:
                 pass
 
@@ -964,8 +1084,7 @@ def generate_leaderboard_image(players: list[dict], theme: str = "default") -> P
     except Exception:
         pass
 
-    image.save(output_path)
-    return output_path
+    return _export_image(image, output_path, as_bytes)
 
 def _rank_base_text(rank: str) -> str:
     r = str(rank or "").strip()
@@ -974,6 +1093,135 @@ def _rank_base_text(rank: str) -> str:
     return r.split()[0].capitalize()
 
 
+# ---------- Статичные слои профиль-карты ----------
+# Свечение вокруг аватара и блик заглушки зависят только от размера шаблона,
+# масштаба и геометрии круга — считаем их (с GaussianBlur) один раз на процесс.
+# Храним слои обрезанными до их непрозрачной области: вне неё alpha=0, а
+# alpha_composite с прозрачным источником пиксели не меняет, так что
+# композит по кропу даёт ровно ту же картинку, что и по всему холсту.
+
+def _crop_layers(layers: list[Image.Image]) -> tuple[tuple[int, int], tuple[Image.Image, ...]]:
+    boxes = [b for b in (layer.getchannel("A").getbbox() for layer in layers) if b]
+    if not boxes:
+        return (0, 0), ()
+    box = (
+        min(b[0] for b in boxes),
+        min(b[1] for b in boxes),
+        max(b[2] for b in boxes),
+        max(b[3] for b in boxes),
+    )
+    return (box[0], box[1]), tuple(layer.crop(box) for layer in layers)
+
+
+def _composite_layers(base_img: Image.Image, offset: tuple[int, int], layers: tuple[Image.Image, ...]) -> Image.Image:
+    """Последовательный alpha_composite слоёв (уже обрезанных) в точке offset."""
+    if not layers:
+        return base_img
+    x, y = offset
+    w, h = layers[0].size
+    region = base_img.crop((x, y, x + w, y + h))
+    for layer in layers:
+        region = Image.alpha_composite(region, layer)
+    base_img.paste(region, (x, y))
+    return base_img
+
+
+@register_lru_cache("circle_mask")
+@lru_cache(maxsize=4)
+def _circle_mask(size: int) -> Image.Image:
+    """Круглая маска аватара (общая для всех игроков одного размера)."""
+    mask = Image.new("L", (size, size), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, size, size), fill=255)
+    return mask
+
+
+@register_lru_cache("avatar_glow_layers")
+@lru_cache(maxsize=8)
+def _avatar_glow_layers(
+    canvas: tuple[int, int],
+    outer_box: tuple[int, int, int, int],
+    scale: float,
+) -> tuple[tuple[int, int], tuple[Image.Image, ...]]:
+    """Ореол, внутренняя тень и блик круга аватара (порядок композита важен)."""
+    W, H = canvas
+    x1, y1, x2, y2 = outer_box
+
+    glow_layer = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    gd = ImageDraw.Draw(glow_layer)
+
+    # Внутренний мягкий пурпурный ореол
+    inner_margin = int(8 * scale)
+    gd.ellipse(
+        (
+            x1 + inner_margin,
+            y1 + inner_margin,
+            x2 - inner_margin,
+            y2 - inner_margin,
+        ),
+        outline=(255, 105, 205, 80),
+        width=max(1, int(10 * scale)),
+    )
+
+    # Более глубокая тень внутри, чтобы круг выглядел как часть интерфейса
+    shadow_layer = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    sd = ImageDraw.Draw(shadow_layer)
+    shadow_margin = int(4 * scale)
+    sd.ellipse(
+        (
+            x1 + shadow_margin,
+            y1 + shadow_margin,
+            x2 - shadow_margin,
+            y2 - shadow_margin,
+        ),
+        fill=(8, 0, 18, 12),
+    )
+
+    # Лёгкий блик сверху
+    shine_layer = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    sh = ImageDraw.Draw(shine_layer)
+    sh.arc(
+        (
+            x1 + int(24 * scale),
+            y1 + int(20 * scale),
+            x2 - int(24 * scale),
+            y2 - int(52 * scale),
+        ),
+        start=205,
+        end=332,
+        fill=(255, 220, 245, 82),
+        width=max(1, int(4 * scale)),
+    )
+
+    glow_layer = glow_layer.filter(ImageFilter.GaussianBlur(radius=max(2, int(10 * scale))))
+    shine_layer = shine_layer.filter(ImageFilter.GaussianBlur(radius=max(1, int(2 * scale))))
+
+    return _crop_layers([glow_layer, shadow_layer, shine_layer])
+
+
+@register_lru_cache("avatar_placeholder_shine")
+@lru_cache(maxsize=8)
+def _avatar_placeholder_shine(
+    canvas: tuple[int, int],
+    box: tuple[int, int, int, int],
+    scale: float,
+) -> tuple[tuple[int, int], tuple[Image.Image, ...]]:
+    """Призматический блик по заглушке аватара (когда аватар не скачался)."""
+    W, H = canvas
+    x1, y1, x2, y2 = box
+
+    shine = Image.new("RGBA", (W, H), (0, 0, 0, 0))
+    sd = ImageDraw.Draw(shine)
+    sd.arc(
+        (x1 + int(22 * scale), y1 + int(18 * scale), x2 - int(22 * scale), y2 - int(40 * scale)),
+        start=205,
+        end=330,
+        fill=(255, 175, 225, 80),
+        width=max(1, int(4 * scale)),
+    )
+    shine = shine.filter(ImageFilter.GaussianBlur(radius=max(1, int(2 * scale))))
+    return _crop_layers([shine])
+
+
 def generate_profile_card(
     discord_name: str,
     riot_username: str,
@@ -984,7 +1232,9 @@ def generate_profile_card(
     theme: str = "default",
     win_streak: int | None = None,
     favorite_map: str | None = None,
-) -> Path:
+    as_bytes: bool = False,
+    avatar_key: str | None = None,
+) -> Path | BytesIO:
     """
     Генерирует летнюю профиль-карту на готовом шаблоне.
     Основа:
@@ -1002,10 +1252,7 @@ def generate_profile_card(
     out_path = pictures_dir / "profile_card_dynamic.png"
 
     # ---------- Загружаем основу ----------
-    if base_path.exists():
-        img = Image.open(base_path).convert("RGBA")
-    else:
-        img = Image.new("RGBA", (1672, 941), (15, 15, 20, 255))
+    img = load_template(base_path) or Image.new("RGBA", (1672, 941), (15, 15, 20, 255))
 
     draw = ImageDraw.Draw(img)
     W, H = img.size
@@ -1328,179 +1575,14 @@ def generate_profile_card(
 
         return palettes.get(base, palettes["unranked"])
 
-    def add_panel_depth(box: tuple[int, int, int, int]):
-        """
-        Тёмный фиолетово-чёрный градиент внутри панели
-        + стеклянный внутренний кант
-        + мягкие цветовые отражения по краям.
-        """
-        x1, y1, x2, y2 = box
-        w = x2 - x1
-        h = y2 - y1
-        radius = int(26 * scale)
-
-        panel = Image.new("RGBA", (w, h), (0, 0, 0, 0))
-        pd = ImageDraw.Draw(panel)
-
-        for yy in range(h):
-            t = yy / max(1, h - 1)
-            r = int(28 * (1 - t) + 5 * t)
-            g = int(10 * (1 - t) + 4 * t)
-            b = int(42 * (1 - t) + 10 * t)
-            a = int(55 * (1 - t) + 108 * t)
-            pd.line((0, yy, w, yy), fill=(r, g, b, a))
-
-        mask = Image.new("L", (w, h), 0)
-        md = ImageDraw.Draw(mask)
-        md.rounded_rectangle((0, 0, w - 1, h - 1), radius=radius, fill=255)
-
-        img.paste(panel, (x1, y1), mask)
-
-        draw.rounded_rectangle(
-            (x1, y1, x2, y2),
-            radius=radius,
-            outline=(255, 255, 255, 82),
-            width=max(1, int(2 * scale)),
-        )
-
-        draw.rounded_rectangle(
-            (x1 + 4, y1 + 4, x2 - 4, y2 - 4),
-            radius=max(8, radius - 4),
-            outline=(255, 255, 255, 24),
-            width=max(1, int(1 * scale)),
-        )
-
-        draw.line(
-            (x1 + int(22 * scale), y1 + int(7 * scale), x2 - int(22 * scale), y1 + int(7 * scale)),
-            fill=(255, 255, 255, 22),
-            width=max(1, int(2 * scale)),
-        )
-
-        draw.line(
-            (x1 + int(3 * scale), y1 + int(24 * scale), x1 + int(3 * scale), y2 - int(24 * scale)),
-            fill=(255, 95, 190, 22),
-            width=max(1, int(2 * scale)),
-        )
-        draw.line(
-            (x2 - int(3 * scale), y1 + int(24 * scale), x2 - int(3 * scale), y2 - int(24 * scale)),
-            fill=(255, 165, 90, 18),
-            width=max(1, int(2 * scale)),
-        )
-
     def add_avatar_inner_glow(base_img: Image.Image, outer_box: tuple[int, int, int, int]) -> Image.Image:
         """
         Мягкое внутреннее свечение для круга аватара.
         Без жёстких колец, чтобы не было эффекта "затмения".
+        Слои с блюром не зависят от игрока — берём готовые из кэша.
         """
-        x1, y1, x2, y2 = outer_box
-        w = x2 - x1
-        h = y2 - y1
-
-        glow_layer = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        gd = ImageDraw.Draw(glow_layer)
-
-        # Внутренний мягкий пурпурный ореол
-        inner_margin = int(8 * scale)
-        gd.ellipse(
-            (
-                x1 + inner_margin,
-                y1 + inner_margin,
-                x2 - inner_margin,
-                y2 - inner_margin,
-            ),
-            outline=(255, 105, 205, 80),
-            width=max(1, int(10 * scale)),
-        )
-
-        # Более глубокая тень внутри, чтобы круг выглядел как часть интерфейса
-        shadow_layer = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        sd = ImageDraw.Draw(shadow_layer)
-        shadow_margin = int(4 * scale)
-        sd.ellipse(
-            (
-                x1 + shadow_margin,
-                y1 + shadow_margin,
-                x2 - shadow_margin,
-                y2 - shadow_margin,
-            ),
-            fill=(8, 0, 18, 12),
-        )
-
-        # Лёгкий блик сверху
-        shine_layer = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        sh = ImageDraw.Draw(shine_layer)
-        sh.arc(
-            (
-                x1 + int(24 * scale),
-                y1 + int(20 * scale),
-                x2 - int(24 * scale),
-                y2 - int(52 * scale),
-            ),
-            start=205,
-            end=332,
-            fill=(255, 220, 245, 82),
-            width=max(1, int(4 * scale)),
-        )
-
-        glow_layer = glow_layer.filter(ImageFilter.GaussianBlur(radius=max(2, int(10 * scale))))
-        shine_layer = shine_layer.filter(ImageFilter.GaussianBlur(radius=max(1, int(2 * scale))))
-
-        base_img = Image.alpha_composite(base_img, glow_layer)
-        base_img = Image.alpha_composite(base_img, shadow_layer)
-        base_img = Image.alpha_composite(base_img, shine_layer)
-
-        return base_img
-
-    def add_background_atmosphere(base_img: Image.Image) -> Image.Image:
-        """
-        Усиливает ощущение дорогого фона:
-        - больше падающих звёзд;
-        - лёгкий призм-блик в верхней зоне;
-        - мягкие отражения цвета на карточках.
-        """
-        overlay = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        od = ImageDraw.Draw(overlay)
-
-        # Призматический блик в верхней зоне заголовка
-        header_streaks = [
-            (90, 68, 520, 58, (255, 165, 225, 38), max(1, int(6 * scale))),
-            (110, 88, 550, 98, (255, 255, 255, 18), max(1, int(3 * scale))),
-            (130, 102, 500, 120, (255, 120, 180, 12), max(1, int(10 * scale))),
-        ]
-        for x1, y1, x2, y2, color, width in header_streaks:
-            od.line((x1, y1, x2, y2), fill=color, width=width)
-
-        # Падающие звёзды
-        star_streaks = [
-            (1010, 42, 1060, 94, (255, 180, 215, 110), 2),
-            (1160, 68, 1218, 126, (255, 150, 210, 125), 2),
-            (1325, 88, 1378, 142, (255, 175, 220, 105), 2),
-            (1455, 114, 1510, 172, (255, 210, 235, 85), 2),
-            (1190, 26, 1228, 64, (255, 150, 190, 78), 1),
-            (1268, 56, 1306, 96, (255, 190, 240, 92), 1),
-            (1398, 48, 1440, 90, (255, 175, 210, 85), 1),
-            (1105, 36, 1148, 78, (255, 200, 230, 90), 1),
-            (1510, 58, 1554, 104, (255, 160, 210, 82), 1),
-        ]
-        for x1, y1, x2, y2, color, width in star_streaks:
-            od.line((x1, y1, x2, y2), fill=color, width=width)
-            od.ellipse((x1 - 2, y1 - 2, x1 + 2, y1 + 2), fill=(255, 255, 255, 120))
-
-        # Отражения по краям карточек
-        for bx1, by1, bx2, by2 in (left_panel, center_panel, right_panel):
-            od.line(
-                (bx1 + int(10 * scale), by1 + int(20 * scale), bx1 + int(10 * scale), by2 - int(20 * scale)),
-                fill=(255, 110, 190, 16),
-                width=max(1, int(2 * scale)),
-            )
-            od.line(
-                (bx2 - int(10 * scale), by1 + int(22 * scale), bx2 - int(10 * scale), by2 - int(22 * scale)),
-                fill=(255, 170, 90, 14),
-                width=max(1, int(2 * scale)),
-            )
-
-        overlay = overlay.filter(ImageFilter.GaussianBlur(radius=max(1, int(1.5 * scale))))
-        return Image.alpha_composite(base_img, overlay)
+        offset, layers = _avatar_glow_layers((W, H), tuple(outer_box), scale)
+        return _composite_layers(base_img, offset, layers)
 
     def draw_soft_row(
             box: tuple[int, int, int, int],
@@ -1572,20 +1654,22 @@ def generate_profile_card(
 
         if avatar_raw:
             try:
-                av = Image.open(BytesIO(avatar_raw)).convert("RGBA")
-
-                side = min(av.width, av.height)
-                left = (av.width - side) // 2
-                top = (av.height - side) // 2
-                av = av.crop((left, top, left + side, top + side))
-
-                av = av.resize((size, size), Image.LANCZOS)
-
-                mask = Image.new("L", (size, size), 0)
-                mask_draw = ImageDraw.Draw(mask)
-                mask_draw.ellipse((0, 0, size, size), fill=255)
-
-                base_img.paste(av, (x1, y1), mask)
+                # по хэшу аватара берём уже декодированный и отресайзенный тайл
+                tile_key = ("avatar", avatar_key, size) if avatar_key else None
+                av = avatar_tiles.get(tile_key) if tile_key else None
+                if av is None:
+                    av = Image.open(BytesIO(avatar_raw)).convert("RGBA")
+
+                    side = min(av.width, av.height)
+                    left = (av.width - side) // 2
+                    top = (av.height - side) // 2
+                    av = av.crop((left, top, left + side, top + side))
+
+                    av = av.resize((size, size), Image.LANCZOS)
+                    if tile_key:
+                        avatar_tiles.put(tile_key, av)
+
+                base_img.paste(av, (x1, y1), _circle_mask(size))
                 return
             except Exception:
                 pass
@@ -1605,18 +1689,9 @@ def generate_profile_card(
             stroke_width=4,
         )
 
-        # subtle призматический блик по заглушке
-        shine = Image.new("RGBA", (W, H), (0, 0, 0, 0))
-        sd = ImageDraw.Draw(shine)
-        sd.arc(
-            (x1 + int(22 * scale), y1 + int(18 * scale), x2 - int(22 * scale), y2 - int(40 * scale)),
-            start=205,
-            end=330,
-            fill=(255, 175, 225, 80),
-            width=max(1, int(4 * scale)),
-        )
-        shine = shine.filter(ImageFilter.GaussianBlur(radius=max(1, int(2 * scale))))
-        base_img.alpha_composite(shine)
+        # subtle призматический блик по заглушке (слой из кэша)
+        offset, layers = _avatar_placeholder_shine((W, H), (x1, y1, x2, y2), scale)
+        _composite_layers(base_img, offset, layers)
 
     # ---------- Шрифты ----------
     title_font = get_font(int(46 * scale))
@@ -1804,10 +1879,11 @@ def generate_profile_card(
         width=max(1, int(2 * scale)),
     )
 
-    if icon_path and Path(icon_path).exists():
+    if icon_path:
         try:
-            icon = Image.open(icon_path).convert("RGBA")
-            icon = icon.resize((icon_size, icon_size), Image.LANCZOS)
+            icon = load_icon(icon_path, icon_size)
+            if icon is None:
+                raise FileNotFoundError(icon_path)
             img.paste(icon, (icon_x, icon_y), icon)
         except Exception:
             q_font = get_font(int(110 * scale))
@@ -1867,5 +1943,5 @@ def generate_profile_card(
     )
 
     # ---------- Сохраняем ----------
-    img.save(out_path)
-    return out_path
+    return _export_image(img, out_path, as_bytes)
+
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from loguru import logger
+
+from modules.utils import api_client
+from modules.utils.henrik_scheduler import Priority, has_spare_budget
+from modules.utils.rank_sync import RANK_TTL, _parse_iso_dt, ensure_fresh_rank
+from modules.utils.rank_sync_job import rank_sync_job
+from modules.utils.valorant_api import ValorantRankError
+
+# Фоновое обновление рангов: тратит свободный бюджет HenrikDev, чтобы к моменту
+# входа в лобби ранг уже лежал в Django свежим и ensure_fresh_rank на пути
+# игрока не ходил во внешний API.
+#
+# Порядок:
+#   1) недавно активные игроки (кого трогал кэш профилей лобби) — их ранг
+#      понадобится первым;
+#   2) players/stale_ranks/ — самые давние rank_last_sync по индексу, страницами.
+# Обновляем заранее — когда ранг прожил RANK_REFRESH_AHEAD от RANK_TTL.
+# Каждый запрос идёт с Priority.BACKGROUND и только если у планировщика никто
+# не ждёт и есть запас токенов — игроки и /syncallranks всегда впереди.
+
+RANK_REFRESH_ENABLED = os.getenv("RANK_REFRESH_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+RANK_REFRESH_AHEAD = min(1.0, max(0.1, float(os.getenv("RANK_REFRESH_AHEAD", "0.8"))))
+RANK_REFRESH_BATCH = max(1, int(os.getenv("RANK_REFRESH_BATCH", "50")))
+# пауза, когда устаревших рангов не осталось
+RANK_REFRESH_IDLE_SECONDS = float(os.getenv("RANK_REFRESH_IDLE_SECONDS", "300"))
+# активного игрока повторно проверяем не чаще, чем раз в столько секунд
+RANK_REFRESH_ACTIVE_RECHECK = float(os.getenv("RANK_REFRESH_ACTIVE_RECHECK", "900"))
+RANK_REFRESH_ACTIVE_MAX = 2000
+
+# как часто смотреть, не освободился ли бюджет
+_BUDGET_POLL_SECONDS = 2.0
+
+
+class RankRefresher:
+    def __init__(self):
+        self.refresh_after = RANK_TTL.total_seconds() * RANK_REFRESH_AHEAD
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._cursor: str | None = None
+        # активные, ещё не проверенные игроки (порядок — кто был активен последним)
+        self._active: OrderedDict[int, None] = OrderedDict()
+        self._checked_at: OrderedDict[int, float] = OrderedDict()
+
+        self.refreshed = 0
+        self.active_refreshed = 0
+        self.failed = 0
+        self.passes = 0
+        self.budget_wait_s = 0.0
+        self.last_pass_at: float | None = None
+
+    # ---------- активность ----------
+
+    def mark_active(self, discord_ids) -> None:
+        """Игроки, которых сейчас показывает лобби: их ранг обновим первым."""
+        now = time.time()
+        added = False
+        for did in discord_ids:
+            did = int(did)
+            checked = self._checked_at.get(did)
+            if checked is not None and now - checked < RANK_REFRESH_ACTIVE_RECHECK:
+                continue
+            self._active[did] = None
+            self._active.move_to_end(did, last=False)
+            added = True
+        while len(self._active) > RANK_REFRESH_ACTIVE_MAX:
+            self._active.popitem()
+        if added and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _take_active(self) -> list[int]:
+        now = time.time()
+        ids = []
+        while self._active and len(ids) < RANK_REFRESH_BATCH:
+            did, _ = self._active.popitem(last=False)
+            ids.append(did)
+            self._checked_at[did] = now
+            self._checked_at.move_to_end(did)
+        while len(self._checked_at) > RANK_REFRESH_ACTIVE_MAX:
+            self._checked_at.popitem(last=False)
+        return ids
+
+    # ---------- цикл ----------
+
+    def start(self) -> None:
+        if not RANK_REFRESH_ENABLED or (self._task is not None and not self._task.done()):
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"🔄 Фоновое обновление рангов запущено: раньше чем через "
+            f"{self.refresh_after / 3600:.1f} ч после синка, пачки по {RANK_REFRESH_BATCH}"
+        )
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                worked = await self._refresh_active()
+                worked = await self._refresh_stale_page() or worked
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[rank_refresher] cycle failed: {e}")
+                worked = False
+
+            if not worked and not self._active:
+                # проход закончен — спим, но просыпаемся, если кто-то зашёл в лобби
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=RANK_REFRESH_IDLE_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    def _is_stale(self, profile: dict) -> bool:
+        last_sync = _parse_iso_dt(profile.get("rank_last_sync"))
+        if last_sync is None:
+            return True
+        return (datetime.now(timezone.utc) - last_sync).total_seconds() >= self.refresh_after
+
+    async def _refresh_active(self) -> bool:
+        ids = self._take_active()
+        if not ids:
+            return False
+        profiles = await api_client.get_player_profiles(ids)
+        stale = [profiles[did] for did in ids if did in profiles and self._is_stale(profiles[did])]
+        for profile in stale:
+            if await self._refresh(profile):
+                self.active_refreshed += 1
+        return bool(stale)
+
+    async def _refresh_stale_page(self) -> bool:
+        """True — в проходе остались страницы."""
+        page = await api_client.get_stale_ranks(int(self.refresh_after), self._cursor, RANK_REFRESH_BATCH)
+        if page is None:
+            return False
+
+        for profile in page["results"]:
+            # активные игроки могли появиться, пока шла страница, — они важнее
+            if self._active:
+                await self._refresh_active()
+            await self._refresh(profile)
+
+        self._cursor = page.get("next")
+        if self._cursor is None:
+            # проход закончился; следующий начнём с самых давних, но после паузы —
+            # иначе игроки, которых обновить не удаётся, гонялись бы по кругу
+            self.passes += 1
+            self.last_pass_at = time.time()
+            return False
+        return True
+
+    async def _wait_for_budget(self) -> None:
+        started = time.monotonic()
+        # пока идёт /syncallranks, он и так обновляет всех — не отбираем у него бюджет
+        while rank_sync_job.running or not has_spare_budget():
+            await asyncio.sleep(_BUDGET_POLL_SECONDS)
+        self.budget_wait_s += time.monotonic() - started
+
+    async def _refresh(self, profile: dict) -> bool:
+        did = int(profile["discord_id"])
+        await self._wait_for_budget()
+        try:
+            # возраст уже проверен (порог раньше RANK_TTL) — поэтому force
+            await ensure_fresh_rank(
+                did,
+                profile=profile,
+                force=True,
+                raise_on_fetch_error=True,
+                priority=Priority.BACKGROUND,
+            )
+        except ValorantRankError as e:
+            self.failed += 1
+            logger.debug(f"[rank_refresher] {did}: {e}")
+            return False
+        self.refreshed += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "enabled": RANK_REFRESH_ENABLED,
+            "running": self._task is not None and not self._task.done(),
+            "refresh_after_h": round(self.refresh_after / 3600, 2),
+            "refreshed": self.refreshed,
+            "active_refreshed": self.active_refreshed,
+            "failed": self.failed,
+            "passes": self.passes,
+            "active_queued": len(self._active),
+            "budget_wait_s": round(self.budget_wait_s, 1),
+            "last_pass_ago_s": round(time.time() - self.last_pass_at) if self.last_pass_at else None,
+        }
+
+
+rank_refresher = RankRefresher()
+
+
+def mark_active(discord_ids) -> None:
+    rank_refresher.mark_active(discord_ids)
+
+
+def get_rank_refresher_stats() -> dict:
+    return rank_refresher.stats()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from loguru import logger
+
+# Кэш рангов HenrikDev на диске (SQLite): переживает рестарт/деплой, и
+# несколько процессов бота на одном хосте делят одни и те же данные (WAL).
+#
+# Запись — по Riot ID (в нижнем регистре):
+#   rank/region/puuid + updated_at — обычный ответ, живёт RANK_STORE_TTL;
+#   error_status + error_message   — «негативная» запись (игрок не найден и т.п.),
+#                                    живёт RANK_STORE_NEGATIVE_TTL, чтобы не
+#                                    тратить лимит на заведомо битый Riot ID.
+# puuid хранится и после истечения TTL ранга: он нужен, чтобы обновить ранг
+# одним запросом вместо двух.
+#
+# Файл открывается лениво, при первом обращении. sqlite3 синхронный —
+# снаружи ходим через asyncio.to_thread, чтобы не блокировать event loop.
+
+RANK_STORE_PATH = Path(
+    os.getenv("RANK_STORE_PATH")
+    or Path(__file__).resolve().parents[2] / "data" / "rank_cache.sqlite3"
+)
+RANK_STORE_TTL = int(os.getenv("VALORANT_RANK_CACHE_TTL", "900"))  # 15 минут по умолчанию
+RANK_STORE_NEGATIVE_TTL = int(os.getenv("RANK_STORE_NEGATIVE_TTL", "600"))
+RANK_STORE_MAX_ROWS = max(100, int(os.getenv("RANK_STORE_MAX_ROWS", "20000")))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ranks (
+    riot_id       TEXT PRIMARY KEY,
+    rank          TEXT,
+    region        TEXT,
+    puuid         TEXT,
+    updated_at    REAL NOT NULL,
+    error_status  INTEGER,
+    error_message TEXT,
+    accessed_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ranks_accessed_at ON ranks (accessed_at);
+"""
+
+
+@dataclass
+class RankEntry:
+    rank: str | None
+    region: str | None
+    puuid: str | None
+    updated_at: float
+    error_status: int | None = None
+    error_message: str | None = None
+
+    @property
+    def negative(self) -> bool:
+        return self.error_status is not None
+
+    def is_fresh(self, now: float) -> bool:
+        ttl = RANK_STORE_NEGATIVE_TTL if self.negative else RANK_STORE_TTL
+        return now - self.updated_at < ttl
+
+
+class RankStore:
+    def __init__(self, path: Path, max_rows: int):
+        self.path = path
+        self.max_rows = max_rows
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            logger.debug(f"🗄 Кэш рангов открыт: {self.path}")
+        return self._conn
+
+    def get(self, riot_id: str) -> RankEntry | None:
+        """Запись по Riot ID любой давности (свежесть — RankEntry.is_fresh)."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT rank, region, puuid, updated_at, error_status, error_message FROM ranks WHERE riot_id = ?",
+                (riot_id,),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE ranks SET accessed_at = ? WHERE riot_id = ?", (now, riot_id))
+
+        entry = RankEntry(*row)
+        if not entry.is_fresh(now):
+            self.misses += 1
+        elif entry.negative:
+            self.negative_hits += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, riot_id: str, rank: str, region: str, puuid: str) -> None:
+        now = time.time()
+        self._write(
+            "INSERT INTO ranks (riot_id, rank, region, puuid, updated_at, error_status, error_message, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, NULL, NULL, ?) "
+            "ON CONFLICT(riot_id) DO UPDATE SET rank = excluded.rank, region = excluded.region, "
+            "puuid = excluded.puuid, updated_at = excluded.updated_at, error_status = NULL, "
+            "error_message = NULL, accessed_at = excluded.accessed_at",
+            (riot_id, rank, region, puuid, now, now),
+        )
+
+    def put_negative(self, riot_id: str, status: int | None, message: str) -> None:
+        # puuid/ранг прошлой удачной записи не трогаем — они ещё пригодятся
+        now = time.time()
+        self._write(
+            "INSERT INTO ranks (riot_id, rank, region, puuid, updated_at, error_status, error_message, accessed_at) "
+            "VALUES (?, NULL, NULL, NULL, ?, ?, ?, ?) "
+            "ON CONFLICT(riot_id) DO UPDATE SET updated_at = excluded.updated_at, "
+            "error_status = excluded.error_status, error_message = excluded.error_message, "
+            "accessed_at = excluded.accessed_at",
+            (riot_id, now, int(status or 0), message, now),
+        )
+
+    def _write(self, sql: str, params: tuple) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(sql, params)
+            self._writes += 1
+            # лимит строк проверяем не на каждой записи — это COUNT по таблице
+            if self._writes % 100 == 1:
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        (count,) = conn.execute("SELECT COUNT(*) FROM ranks").fetchone()
+        extra = count - self.max_rows
+        if extra > 0:
+            conn.execute(
+                "DELETE FROM ranks WHERE riot_id IN (SELECT riot_id FROM ranks ORDER BY accessed_at LIMIT ?)",
+                (extra,),
+            )
+            self.evictions += extra
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = self._conn.execute("SELECT COUNT(*) FROM ranks").fetchone()[0] if self._conn else 0
+        return {
+            "rows": rows,
+            "max_rows": self.max_rows,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_store = RankStore(RANK_STORE_PATH, RANK_STORE_MAX_ROWS)
+
+
+async def get_entry(riot_id: str) -> RankEntry | None:
+    return await asyncio.to_thread(_store.get, riot_id)
+
+
+async def store_rank(riot_id: str, rank: str, region: str, puuid: str) -> None:
+    await asyncio.to_thread(_store.put, riot_id, rank, region, puuid)
+
+
+async def store_negative(riot_id: str, status: int | None, message: str) -> None:
+    await asyncio.to_thread(_store.put_negative, riot_id, status, message)
+
+
+def get_rank_store_stats() -> dict:
+    return _store.stats()
+
+
+def close_rank_store() -> None:
+    _store.close()
@@ -7,7 +7,8 @@ from typing import Optional
 from loguru import logger
 
 from modules.utils import api_client
-from modules.utils.valorant_api import fetch_valorant_rank, ValorantRankError
+from modules.utils.henrik_scheduler import Priority
+from modules.utils.valorant_api import fetch_rank_info, ValorantRankError
 
 # ===== Валидация Riot ID =====
 
@@ -56,6 +57,8 @@ async def ensure_fresh_rank(
     allow_unranked_overwrite: bool = False,
     return_updated_only: bool = False,
     raise_on_fetch_error: bool = False,
+    profile: Optional[dict] = None,
+    priority: Priority = Priority.LOBBY,
 ):
     """
     Обновить ранг игрока через HenrikDev.
@@ -69,16 +72,21 @@ async def ensure_fresh_rank(
                                     существующий ранг в БД.
         return_updated_only       — если True, вернуть профиль только если он
                                     действительно обновился; иначе вернуть текущий.
+        profile                   — профиль из Django, если уже загружен (например,
+                                    через players/bulk/) — тогда не перечитываем его.
+        priority                  — класс очереди к HenrikDev: INTERACTIVE, если
+                                    игрок ждёт ответа; BACKGROUND — для массового синка.
 
     Возвращает:
         dict профиля игрока (то, что вернула Django API) или None.
     """
     # 1) тянем профиль из Django, чтобы знать текущий ранг и Riot ID
-    try:
-        profile = await api_client.get_player_profile(discord_id)
-    except Exception as e:
-        logger.error(f"[rank_sync] failed to load profile {discord_id}: {e}")
-        profile = None
+    if profile is None:
+        try:
+            profile = await api_client.get_player_profile(discord_id)
+        except Exception as e:
+            logger.error(f"[rank_sync] failed to load profile {discord_id}: {e}")
+            profile = None
 
     if not profile:
         logger.warning(f"[rank_sync] profile not found for discord_id={discord_id}")
@@ -99,9 +107,18 @@ async def ensure_fresh_rank(
         logger.warning(f"[rank_sync] invalid or empty riot_id for {discord_id}: '{riot_id}'")
         return None if return_updated_only else profile
 
-    # 4) Запрашиваем ранг с HenrikDev
+    # 4) Запрашиваем ранг с HenrikDev. puuid из профиля годится только для
+    #    того Riot ID, что сохранён в профиле (при смене ника Django его сбрасывает)
+    known_puuid = (profile.get("riot_puuid") or "").strip()
+    known_region = (profile.get("riot_region") or "").strip()
+    same_account = riot_id.lower() == (profile.get("username") or "").strip().lower()
     try:
-        new_rank, region_used = await fetch_valorant_rank(riot_id)
+        info = await fetch_rank_info(
+            riot_id,
+            puuid=known_puuid if same_account and known_puuid else None,
+            region=known_region if same_account and known_region else None,
+            priority=priority,
+        )
     except ValorantRankError as e:
         logger.warning(
             f"[rank_sync] HenrikDev error for {discord_id} ({riot_id}): {e} (status={getattr(e, 'status', None)})"
@@ -112,7 +129,12 @@ async def ensure_fresh_rank(
             raise
         return None if return_updated_only else profile
 
-    new_rank = (new_rank or "Unranked").strip()
+    new_rank = (info.rank or "Unranked").strip()
+
+    # сохраняем puuid, если он новый — следующий раз обойдёмся одним запросом
+    account_kwargs = {}
+    if same_account and (info.puuid != known_puuid or info.region != known_region):
+        account_kwargs = {"riot_puuid": info.puuid, "riot_region": info.region}
 
     # 5) Логика перезаписи
     if new_rank == current_rank:
@@ -125,6 +147,7 @@ async def ensure_fresh_rank(
                 discord_id,
                 rank=new_rank,
                 create_if_not_exist=False,
+                **account_kwargs,
             )
             return None if return_updated_only else (updated or profile)
         except Exception as e:
@@ -142,6 +165,11 @@ async def ensure_fresh_rank(
             f"[rank_sync] IGNORE Unranked overwrite for {discord_id} ({riot_id}). "
             f"current={current_rank}, fetched={new_rank}"
         )
+        if account_kwargs:
+            try:
+                await api_client.update_player_profile(discord_id, create_if_not_exist=False, **account_kwargs)
+            except Exception as e:
+                logger.error(f"[rank_sync] failed to store puuid for {discord_id}: {e}")
         return None if return_updated_only else profile
 
     # 6) Пишем в Django только после успешного ответа HenrikDev
@@ -150,6 +178,7 @@ async def ensure_fresh_rank(
             discord_id,
             rank=new_rank,
             create_if_not_exist=False,
+            **account_kwargs,
         )
     except Exception as e:
         logger.error(f"[rank_sync] failed to update profile {discord_id}: {e}")
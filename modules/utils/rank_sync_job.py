@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+
+from loguru import logger
+
+from modules.utils import api_client
+from modules.utils.henrik_scheduler import Priority, get_henrik_scheduler_stats
+from modules.utils.rank_sync import ensure_fresh_rank
+from modules.utils.valorant_api import ValorantRankError
+
+# Массовый синк рангов (/syncallranks) как фоновая задача с сохранённым прогрессом.
+#
+# Идём по players/stale_ranks/ с порогом «синкались до старта задачи»: кого уже
+# обновили, тот выпадает из выборки сам, а keyset-курсор пропускает тех, кого
+# обновить не удалось. Курсор страницы, счётчики и id уже обработанных на ней
+# игроков пишутся в JSON после каждого игрока — после рестарта или паузы задача
+# продолжается с того же места (а не с игрока #1) и никого не считает дважды.
+#
+# 429 задачу не роняет: планировщик HenrikDev ставит выдачу на паузу, задача
+# ждёт и повторяет того же игрока.
+
+RANK_SYNC_STATE_PATH = Path(
+    os.getenv("RANK_SYNC_STATE_PATH")
+    or Path(__file__).resolve().parents[2] / "data" / "rank_sync_job.json"
+)
+RANK_SYNC_PAGE_SIZE = max(1, int(os.getenv("RANK_SYNC_PAGE_SIZE", "100")))
+
+# пауза перед повтором игрока после 429 (дальше ждёт сам планировщик)
+_RATE_LIMIT_RETRY_SECONDS = 5.0
+# недоступный бэкенд: столько попыток получить страницу, прежде чем задача упадёт
+_PAGE_RETRIES = 3
+_PAGE_RETRY_SECONDS = 10.0
+
+
+@dataclass
+class RankSyncState:
+    status: str = "idle"           # running | paused | done | failed
+    started_at: float = 0.0        # unix-время старта — порог для stale_ranks
+    finished_at: float | None = None
+    cursor: str | None = None      # курсор текущей страницы (None — первая)
+    page_done: list[int] = field(default_factory=list)  # уже обработаны на этой странице
+    total: int = 0
+    processed: int = 0
+    updated: int = 0
+    errors: int = 0
+    rate_limited: int = 0
+    channel_id: int | None = None  # куда отчитаться о завершении
+    user_id: int | None = None
+    last_error: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RankSyncState":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in data.items() if k in known})
+
+
+class RankSyncJob:
+    def __init__(self, path: Path):
+        self.path = path
+        self.state = self._load()
+        self._bot = None
+        self._task: asyncio.Task | None = None
+        self._pause_requested = False
+        # скорость считаем только по текущему запуску (после рестарта — заново)
+        self._run_started: float | None = None
+        self._run_processed = 0
+        self.throttled = False
+
+    # ---------- состояние на диске ----------
+
+    def _load(self) -> RankSyncState:
+        try:
+            return RankSyncState.from_dict(json.loads(self.path.read_text(encoding="utf-8")))
+        except FileNotFoundError:
+            return RankSyncState()
+        except Exception as e:
+            logger.warning(f"⚠ Не удалось прочитать состояние синка рангов {self.path}: {e}")
+            return RankSyncState()
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(asdict(self.state), ensure_ascii=False), encoding="utf-8")
+            # атомарная замена: при падении посреди записи остаётся прошлый файл
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.error(f"❌ Не удалось сохранить прогресс синка рангов: {e}")
+
+    # ---------- управление ----------
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def bind(self, bot) -> None:
+        """Бот нужен для отчёта о завершении в канал."""
+        self._bot = bot
+
+    def resume_pending(self) -> bool:
+        """После рестарта: продолжить задачу, которая выполнялась при выключении."""
+        if self.state.status != "running" or self.running:
+            return False
+        logger.info(
+            f"🔁 Продолжаем синк рангов: обработано {self.state.processed}/{self.state.total}"
+        )
+        self._spawn()
+        return True
+
+    async def start(self, *, channel_id: int | None, user_id: int | None, restart: bool = False) -> str:
+        """
+        Запустить или продолжить синк. Возвращает "running" (уже идёт),
+        "resumed" (продолжили сохранённый) или "started" (новый проход).
+        """
+        if self.running:
+            return "running"
+
+        resumable = self.state.status in ("running", "paused", "failed") and not restart
+        if resumable:
+            self.state.status = "running"
+            self.state.channel_id = channel_id or self.state.channel_id
+            self.state.user_id = user_id or self.state.user_id
+            self.state.last_error = None
+        else:
+            page = await api_client.get_stale_ranks(0, None, 1, with_count=True)
+            self.state = RankSyncState(
+                status="running",
+                started_at=time.time(),
+                total=int((page or {}).get("count") or 0),
+                channel_id=channel_id,
+                user_id=user_id,
+            )
+        self._save()
+        self._spawn()
+        return "resumed" if resumable else "started"
+
+    async def pause(self) -> bool:
+        if not self.running:
+            return False
+        self._pause_requested = True
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return True
+
+    async def shutdown(self) -> None:
+        """Остановка бота: статус остаётся running — после рестарта задача продолжится."""
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def _spawn(self) -> None:
+        self._pause_requested = False
+        self._run_started = time.monotonic()
+        self._run_processed = 0
+        self._task = asyncio.create_task(self._run())
+
+    # ---------- выполнение ----------
+
+    async def _run(self) -> None:
+        st = self.state
+        try:
+            while True:
+                page = await self._fetch_page()
+
+                done = set(st.page_done)
+                for profile in page["results"]:
+                    did = int(profile["discord_id"])
+                    if did in done:
+                        continue
+                    await self._sync_one(profile)
+                    st.page_done.append(did)
+                    self._save()
+
+                st.cursor = page.get("next")
+                st.page_done = []
+                self._save()
+                if st.cursor is None:
+                    break
+        except asyncio.CancelledError:
+            if self._pause_requested:
+                st.status = "paused"
+            self._save()
+            raise
+        except Exception as e:
+            logger.error(f"[rank_sync_job] failed: {e}")
+            st.status = "failed"
+            st.last_error = str(e)
+            self._save()
+            await self._report()
+            return
+
+        st.status = "done"
+        st.finished_at = time.time()
+        self._save()
+        logger.info(f"✅ Синк рангов завершён: {st.processed} игроков, обновлено {st.updated}, ошибок {st.errors}")
+        await self._report()
+
+    async def _fetch_page(self) -> dict:
+        st = self.state
+        for attempt in range(_PAGE_RETRIES):
+            if attempt:
+                await asyncio.sleep(_PAGE_RETRY_SECONDS * attempt)
+            older_than = max(0, int(time.time() - st.started_at))
+            try:
+                page = await api_client.get_stale_ranks(older_than, st.cursor, RANK_SYNC_PAGE_SIZE)
+            except Exception as e:
+                logger.warning(f"[rank_sync_job] stale_ranks failed: {e}")
+                page = None
+            if page is not None:
+                return page
+        raise RuntimeError("players/stale_ranks/ недоступен")
+
+    async def _sync_one(self, profile: dict) -> None:
+        st = self.state
+        did = int(profile["discord_id"])
+        while True:
+            try:
+                changed = await ensure_fresh_rank(
+                    did,
+                    profile=profile,
+                    force=True,
+                    allow_unranked_overwrite=False,
+                    return_updated_only=True,
+                    raise_on_fetch_error=True,
+                    priority=Priority.BACKGROUND,
+                )
+            except ValorantRankError as e:
+                if e.status == 429:
+                    # ждём, пока планировщик снимет паузу, и повторяем этого же игрока
+                    st.rate_limited += 1
+                    self.throttled = True
+                    await asyncio.sleep(_RATE_LIMIT_RETRY_SECONDS)
+                    continue
+                st.errors += 1
+            except Exception as e:
+                logger.warning(f"[rank_sync_job] {did}: {e}")
+                st.errors += 1
+            else:
+                if changed:
+                    st.updated += 1
+            break
+
+        self.throttled = False
+        st.processed += 1
+        self._run_processed += 1
+
+    # ---------- отчёты ----------
+
+    def status(self) -> dict:
+        st = self.state
+        rate = None
+        if self.running and self._run_started is not None:
+            elapsed = time.monotonic() - self._run_started
+            if elapsed > 0 and self._run_processed:
+                rate = self._run_processed / elapsed * 60
+
+        remaining = max(0, st.total - st.processed)
+        eta = remaining / rate * 60 if rate and remaining else None
+        return {
+            **asdict(st),
+            "running": self.running,
+            "throttled": self.throttled,
+            "henrik_paused_for": get_henrik_scheduler_stats()["paused_for"],
+            "remaining": remaining,
+            "per_min": round(rate, 1) if rate else None,
+            "eta_s": round(eta) if eta is not None else None,
+        }
+
+    async def _report(self) -> None:
+        st = self.state
+        channel = self._bot.get_channel(st.channel_id) if self._bot and st.channel_id else None
+        if channel is None:
+            return
+
+        mention = f"<@{st.user_id}> " if st.user_id else ""
+        if st.status == "done":
+            took = (st.finished_at or time.time()) - st.started_at
+            text = (
+                f"{mention}✅ Синхронизация рангов завершена за {took / 60:.0f} мин.\n"
+                f"Обработано игроков: {st.processed}\n"
+                f"Обновлено рангов: {st.updated}\n"
+                f"Ошибок: {st.errors}\n"
+                f"Пауз из-за лимита HenrikDev: {st.rate_limited}"
+            )
+        else:
+            text = (
+                f"{mention}❌ Синхронизация рангов остановлена: {st.last_error}\n"
+                f"Обработано: {st.processed}/{st.total}. Продолжить — /syncallranks."
+            )
+        try:
+            await channel.send(text)
+        except Exception as e:
+            logger.warning(f"⚠ Не удалось отправить отчёт о синке рангов: {e}")
+
+
+rank_sync_job = RankSyncJob(RANK_SYNC_STATE_PATH)
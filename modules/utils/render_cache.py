@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from modules.utils.image_generator import _color_for_top, resolve_theme_key
+
+# Кэш готовых PNG по хэшу нормализованного входа генератора.
+# Повторный refresh топ-10 или join/leave, который не меняет картинку,
+# отдаёт байты из словаря вместо полного рендера Pillow.
+
+RENDER_CACHE_MAX_ITEMS = max(1, int(os.getenv("RENDER_CACHE_MAX_ITEMS", "64")))
+RENDER_CACHE_MAX_MB = float(os.getenv("RENDER_CACHE_MAX_MB", "48"))
+
+
+@dataclass
+class RenderCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class RenderCache:
+    """LRU: ключ — sha256 входа, значение — закодированный PNG."""
+
+    def __init__(self, max_items: int, max_bytes: int):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self.stats = RenderCacheStats()
+
+    def get(self, key: str) -> bytes | None:
+        data = self._items.get(key)
+        if data is None:
+            self.stats.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.stats.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._items[key] = data
+        self._bytes += len(data)
+        while self._items and (len(self._items) > self.max_items or self._bytes > self.max_bytes):
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.stats.evictions += 1
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._bytes = 0
+
+    def as_dict(self) -> dict:
+        total = self.stats.hits + self.stats.misses
+        return {
+            "items": len(self._items),
+            "bytes": self._bytes,
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "evictions": self.stats.evictions,
+            "hit_rate": round(self.stats.hits / total, 3) if total else 0.0,
+        }
+
+
+render_cache = RenderCache(RENDER_CACHE_MAX_ITEMS, int(RENDER_CACHE_MAX_MB * 1024 * 1024))
+
+
+def _digest(kind: str, payload) -> str:
+    raw = json.dumps([kind, payload], ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _text(value) -> str:
+    return str(value or "").strip()
+
+
+def lobby_key(players: list[dict], top_ids: list[int] | None) -> str:
+    """
+    Только то, что реально попадает на картинку лобби: порядок строк, ник,
+    display_name, ранг и цвет топ-3 (сам top_ids целиком не важен).
+    """
+    rows = [
+        [
+            _text(p.get("username")),
+            _text(p.get("display_name")),
+            _text(p.get("rank")) or "Unranked",
+            _color_for_top(p.get("discord_id") or p.get("id"), top_ids),
+        ]
+        for p in players
+    ]
+    return _digest("lobby", rows)
+
+
+def leaderboard_key(players: list[dict], theme: str | None, start_place: int = 1) -> str:
+    rows = [
+        [
+            _text(p.get("username")),
+            _text(p.get("display_name")),
+            _text(p.get("rank")) or "Unranked",
+            int(p.get("wins", 0)),
+            int(p.get("matches", 0)),
+        ]
+        for p in players
+    ]
+    # сезонная тема ("auto") резолвится в конкретную — иначе кэш пережил бы смену сезона
+    return _digest("leaderboard", [resolve_theme_key(theme), int(start_place), rows])
+
+
+def get_render_cache_stats() -> dict:
+    return render_cache.as_dict()
@@ -0,0 +1,278 @@
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from functools import partial
+from io import BytesIO
+from typing import Any, Callable
+
+from loguru import logger
+
+from modules.utils.image_generator import (
+    generate_draft_image,
+    generate_final_match_image,
+    generate_leaderboard_image,
+    generate_lobby_image,
+    generate_map_ban_image,
+    generate_profile_card,
+    warm_up_assets,
+)
+from modules.utils.render_cache import leaderboard_key, lobby_key, render_cache
+
+# === Конфиг ===
+
+# process — отдельные процессы (Pillow не держит event loop и GIL),
+# thread  — пул потоков (фоллбэк, если процессы недоступны на хостинге)
+RENDER_POOL_KIND = os.getenv("RENDER_POOL_KIND", "process").strip().lower()
+RENDER_POOL_WORKERS = max(1, int(os.getenv("RENDER_POOL_WORKERS", "2")))
+RENDER_MP_START = os.getenv("RENDER_MP_START", "spawn").strip().lower()
+
+# Сколько рендеров может одновременно стоять в очереди + выполняться.
+RENDER_MAX_PENDING = max(1, int(os.getenv("RENDER_MAX_PENDING", "16")))
+# Сколько ждать свободный слот, прежде чем отказать.
+RENDER_QUEUE_TIMEOUT = float(os.getenv("RENDER_QUEUE_TIMEOUT", "20"))
+# Рендеры дольше этого порога логируем как warning.
+RENDER_SLOW_MS = float(os.getenv("RENDER_SLOW_MS", "750"))
+
+
+class RenderQueueFull(RuntimeError):
+    """Очередь рендера переполнена — слот не освободился за RENDER_QUEUE_TIMEOUT."""
+
+
+@dataclass
+class RenderStats:
+    jobs: int = 0
+    failed: int = 0
+    rejected: int = 0
+    in_flight: int = 0
+    total_wait_ms: float = 0.0
+    total_run_ms: float = 0.0
+    max_run_ms: float = 0.0
+    per_job: dict[str, list[float]] = field(default_factory=dict)  # name -> [count, total_ms, max_ms]
+
+    def record(self, name: str, wait_ms: float, run_ms: float) -> None:
+        self.jobs += 1
+        self.total_wait_ms += wait_ms
+        self.total_run_ms += run_ms
+        self.max_run_ms = max(self.max_run_ms, run_ms)
+
+        row = self.per_job.setdefault(name, [0, 0.0, 0.0])
+        row[0] += 1
+        row[1] += run_ms
+        row[2] = max(row[2], run_ms)
+
+    def as_dict(self) -> dict:
+        done = max(self.jobs, 1)
+        return {
+            "jobs": self.jobs,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "avg_wait_ms": round(self.total_wait_ms / done, 1),
+            "avg_run_ms": round(self.total_run_ms / done, 1),
+            "max_run_ms": round(self.max_run_ms, 1),
+            "per_job": {
+                name: {"count": c, "avg_ms": round(total / max(c, 1), 1), "max_ms": round(mx, 1)}
+                for name, (c, total, mx) in self.per_job.items()
+            },
+        }
+
+
+_executor: Executor | None = None
+_executor_kind: str | None = None
+_slots: asyncio.Semaphore | None = None
+_stats = RenderStats()
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict) -> tuple[Any, float]:
+    """Выполняется внутри воркера: чистое время рендера без ожидания в очереди."""
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def _worker_ready() -> None:
+    """Пустая задача: заставляет пул поднять воркеров (и прогреть их кэш ассетов) заранее."""
+
+
+def _make_executor(kind: str) -> tuple[Executor, str]:
+    # initializer греет кэш шаблонов/иконок в каждом воркере до первого рендера
+    if kind == "process":
+        try:
+            ctx = multiprocessing.get_context(RENDER_MP_START)
+            executor = ProcessPoolExecutor(
+                max_workers=RENDER_POOL_WORKERS,
+                mp_context=ctx,
+                initializer=warm_up_assets,
+            )
+            return executor, "process"
+        except (OSError, ValueError, NotImplementedError) as e:
+            logger.warning(f"⚠ Пул процессов для рендера недоступен ({e}), используем потоки.")
+
+    executor = ThreadPoolExecutor(
+        max_workers=RENDER_POOL_WORKERS,
+        thread_name_prefix="render",
+        initializer=warm_up_assets,
+    )
+    return executor, "thread"
+
+
+def start_render_pool() -> None:
+    """Поднимаем пул заранее (вызывается из setup_hook), чтобы первый рендер не платил за старт."""
+    global _executor, _executor_kind
+    if _executor is not None:
+        return
+    _executor, _executor_kind = _make_executor(RENDER_POOL_KIND)
+    for _ in range(RENDER_POOL_WORKERS):
+        _executor.submit(_worker_ready)
+    logger.info(f"🖼 Пул рендера запущен: kind={_executor_kind}, workers={RENDER_POOL_WORKERS}")
+
+
+async def shutdown_render_pool() -> None:
+    global _executor, _executor_kind
+    executor, _executor, _executor_kind = _executor, None, None
+    if executor is not None:
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+def get_render_stats() -> dict:
+    data = _stats.as_dict()
+    data["kind"] = _executor_kind
+    data["workers"] = RENDER_POOL_WORKERS
+    data["max_pending"] = RENDER_MAX_PENDING
+    data["cache"] = render_cache.as_dict()
+    return data
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(RENDER_MAX_PENDING)
+    return _slots
+
+
+async def render(fn: Callable, *args, **kwargs):
+    """
+    Выполнить синхронный генератор картинки вне event loop.
+    fn должен быть функцией уровня модуля (для пула процессов она пиклится).
+    """
+    global _executor, _executor_kind
+
+    start_render_pool()
+    name = getattr(fn, "__name__", "render")
+    slots = _get_slots()
+    queued_at = time.perf_counter()
+
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout=RENDER_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        _stats.rejected += 1
+        raise RenderQueueFull(f"render queue is full ({RENDER_MAX_PENDING} pending), job={name}")
+
+    _stats.in_flight += 1
+    try:
+        loop = asyncio.get_running_loop()
+        call = partial(_timed_call, fn, args, kwargs)
+        submitted_to = _executor
+        try:
+            result, run_ms = await loop.run_in_executor(submitted_to, call)
+        except BrokenProcessPool:
+            # воркер умер (OOM и т.п.) — переходим на потоки и повторяем один раз.
+            # Пул меняет только первая упавшая задача: остальные, упавшие на том
+            # же пуле, просто повторяют на уже подставленном (его не трогаем).
+            if _executor is submitted_to:
+                logger.error(f"❌ Пул процессов рендера сломан на {name}, переключаемся на потоки.")
+                _executor, _executor_kind = _make_executor("thread")
+                if submitted_to is not None:
+                    submitted_to.shutdown(wait=False, cancel_futures=True)
+            result, run_ms = await loop.run_in_executor(_executor, call)
+    except Exception:
+        _stats.failed += 1
+        raise
+    finally:
+        _stats.in_flight -= 1
+        slots.release()
+
+    total_ms = (time.perf_counter() - queued_at) * 1000
+    wait_ms = max(total_ms - run_ms, 0.0)
+    _stats.record(name, wait_ms, run_ms)
+
+    if run_ms >= RENDER_SLOW_MS:
+        logger.warning(f"🐢 Медленный рендер {name}: run={run_ms:.0f}ms wait={wait_ms:.0f}ms")
+    else:
+        logger.debug(f"🖼 {name}: run={run_ms:.0f}ms wait={wait_ms:.0f}ms")
+
+    return result
+
+
+async def _render_cached(key: str, fn: Callable, *args, **kwargs) -> BytesIO:
+    """Если такая же картинка уже рендерилась — отдаём сохранённые PNG-байты."""
+    data = render_cache.get(key)
+    if data is not None:
+        return BytesIO(data)
+
+    buf = await render(fn, *args, as_bytes=True, **kwargs)
+    render_cache.put(key, buf.getvalue())
+    return buf
+
+
+# --- Обёртки над генераторами: все call sites ждут их через await ---
+# Возвращают BytesIO с PNG, который сразу уходит в discord.File — без общих файлов на диске.
+
+async def render_lobby_image(players: list[dict], top_ids: list[int] | None = None) -> BytesIO:
+    return await _render_cached(lobby_key(players, top_ids), generate_lobby_image, players, top_ids=top_ids)
+
+
+async def render_draft_image(
+    players: list[dict],
+    captain_1_id: int,
+    captain_2_id: int,
+    top_ids: list[int] | None = None,
+) -> BytesIO:
+    return await render(
+        generate_draft_image,
+        players,
+        captain_1_id=captain_1_id,
+        captain_2_id=captain_2_id,
+        top_ids=top_ids,
+        as_bytes=True,
+    )
+
+
+async def render_map_ban_image(available_maps: list[str], banned_maps: list[str], current_captain: str) -> BytesIO:
+    return await render(
+        generate_map_ban_image,
+        available_maps=list(available_maps),
+        banned_maps=list(banned_maps),
+        current_captain=current_captain,
+        as_bytes=True,
+    )
+
+
+async def render_final_match_image(selected_map: str, attack_players: list[str], defense_players: list[str]) -> BytesIO:
+    return await render(
+        generate_final_match_image,
+        selected_map=selected_map,
+        attack_players=attack_players,
+        defense_players=defense_players,
+        as_bytes=True,
+    )
+
+
+async def render_leaderboard_image(players: list[dict], theme: str = "default", start_place: int = 1) -> BytesIO:
+    return await _render_cached(
+        leaderboard_key(players, theme, start_place),
+        generate_leaderboard_image,
+        players,
+        theme=theme,
+        start_place=start_place,
+    )
+
+
+async def render_profile_card(**kwargs) -> BytesIO:
+    return await render(generate_profile_card, as_bytes=True, **kwargs)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+# Single-flight: одновременные запросы одного и того же ключа делят один
+# in-flight вызов. Загрузка идёт отдельной задачей, а ждут её через shield —
+# отмена одного из ожидающих (истёкший interaction и т.п.) не роняет остальных.
+
+
+@dataclass
+class FlightStats:
+    calls: int = 0          # сколько ключей запросили
+    executed: int = 0       # сколько реально загрузили
+    deduplicated: int = 0   # сколько подцепились к уже летящему запросу
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "dedup_rate": round(self.deduplicated / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+def _consume_exception(fut: asyncio.Future) -> None:
+    # если все ожидающие отменились, исключение никто не заберёт — гасим warning
+    if not fut.cancelled():
+        fut.exception()
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self.stats = FlightStats()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        _registry[name] = self
+
+    def pending(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.stats.calls += 1
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.stats.deduplicated += 1
+            return await asyncio.shield(fut)
+
+        self.stats.executed += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+
+        def _done(t: asyncio.Future) -> None:
+            if self._inflight.get(key) is t:
+                del self._inflight[key]
+            _consume_exception(t)
+
+        task.add_done_callback(_done)
+        return await asyncio.shield(task)
+
+    async def do_many(
+        self,
+        keys: Iterable[Hashable],
+        fn: Callable[[list], Awaitable[dict]],
+    ) -> dict:
+        """
+        Пакетный вариант: ключи, которые уже летят, ждём; остальные грузим
+        одним вызовом fn(rest) -> {key: value}. Пока пачка летит, одиночные
+        do() по этим ключам тоже к ней подцепляются.
+        """
+        keys = list(dict.fromkeys(keys))
+        self.stats.calls += len(keys)
+
+        futures: dict[Hashable, asyncio.Future] = {}
+        rest = []
+        for key in keys:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.stats.deduplicated += 1
+                futures[key] = fut
+            else:
+                rest.append(key)
+
+        if rest:
+            self.stats.executed += len(rest)
+            loop = asyncio.get_running_loop()
+            batch = asyncio.ensure_future(fn(rest))
+            own = {key: loop.create_future() for key in rest}
+            for key, fut in own.items():
+                self._inflight[key] = fut
+                fut.add_done_callback(_consume_exception)
+
+            def _done(t: asyncio.Future) -> None:
+                for key, fut in own.items():
+                    if self._inflight.get(key) is fut:
+                        del self._inflight[key]
+                    if fut.done():
+                        continue
+                    if t.cancelled():
+                        fut.cancel()
+                    elif t.exception() is not None:
+                        fut.set_exception(t.exception())
+                    else:
+                        fut.set_result((t.result() or {}).get(key))
+
+            batch.add_done_callback(_done)
+            futures.update(own)
+
+        values = await asyncio.gather(*(asyncio.shield(f) for f in futures.values()))
+        return dict(zip(futures.keys(), values))
+
+
+_registry: dict[str, SingleFlight] = {}
+
+
+def get_single_flight_stats() -> dict:
+    return {name: flight.stats.as_dict() for name, flight in _registry.items()}
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import os
 import time
 from dataclasses import dataclass
@@ -10,17 +9,17 @@ from urllib.parse import quote
 import aiohttp
 from loguru import logger
 
+from modules.utils import rank_store
+from modules.utils.henrik_scheduler import Priority, scheduler
+
 # === Конфиг ===
 
 HENRIKDEV_API_KEY = os.getenv("HENRIKDEV_API_KEY") or os.getenv("HENRIK_DEV_API_KEY")
 HENRIKDEV_BASE_URL = "https://api.henrikdev.xyz"
 VALORANT_DEFAULT_REGION = os.getenv("VALORANT_DEFAULT_REGION", "eu").lower()
 
-# 30 req/min → делаем запас = 1 запрос раз в 2.1 секунды
-_MIN_INTERVAL_SECONDS = 2.1
+# Лимит 30 req/min соблюдает henrik_scheduler (token bucket с приоритетами)
 
-# Кеш рангов, чтобы не дёргать HenrikDev лишний раз
-_RANK_CACHE_TTL = int(os.getenv("VALORANT_RANK_CACHE_TTL", "900"))  # 15 минут по умолчанию
 
 # Глобальная сессия для всех запросов к HenrikDev
 _session: Optional[aiohttp.ClientSession] = None
@@ -60,27 +59,6 @@ class ValorantRankError(Exception):
     def __str__(self) -> str:
         return self.message
 
-_last_request_ts: float = 0.0
-_rate_limit_lock = asyncio.Lock()
-_rank_cache: dict[str, tuple[float, str, str]] = {}  # riot_id_lower -> (ts, rank, region)
-
-async def _respect_rate_limit():
-    """
-    Не больше 1 запроса к HenrikDev раз в _MIN_INTERVAL_SECONDS.
-    Защищено lock'ом, чтобы параллельные корутины не обходили лимит.
-    """
-    global _last_request_ts
-
-    async with _rate_limit_lock:
-        now = time.monotonic()
-        delta = now - _last_request_ts
-
-        if delta < _MIN_INTERVAL_SECONDS:
-            await asyncio.sleep(_MIN_INTERVAL_SECONDS - delta)
-
-        _last_request_ts = time.monotonic()
-
-
 def _normalize_rank(raw: Optional[str]) -> str:
     if not raw:
         return "Unranked"
@@ -114,16 +92,137 @@ def _extract_rank_from_v2(payload: dict) -> Optional[str]:
     return patched
 
 
-async def fetch_valorant_rank(riot_id: str) -> Tuple[str, str]:
+@dataclass
+class RankInfo:
+    rank: str
+    region: str
+    puuid: str
+
+
+def _check_status(status: int, api_status, what: str) -> None:
+    if status == 429 or api_status == 429:
+        raise ValorantRankError("Лимит запросов к HenrikDev (429)", status=429)
+
+    if status >= 500 or (api_status and api_status >= 500):
+        suffix = "" if what == "account" else f" ({what})"
+        raise ValorantRankError(f"HenrikDev / Riot временно недоступен{suffix}", status=status)
+
+    if status != 200 or (api_status not in (None, 200)):
+        raise ValorantRankError(
+            f"Неожиданный ответ HenrikDev ({what}): HTTP {status}, status={api_status}",
+            status=status,
+        )
+
+
+async def _get_json(
+    session: aiohttp.ClientSession,
+    url: str,
+    headers: dict,
+    priority: Priority,
+) -> tuple[int, dict]:
+    await scheduler.acquire(priority)
+    async with session.get(url, headers=headers) as resp:
+        try:
+            payload = await resp.json()
+        except Exception:
+            payload = {}
+        # HenrikDev иногда отвечает 200 с {"status": 429} в теле
+        api_status = payload.get("status") if isinstance(payload, dict) else None
+        scheduler.report(429 if api_status == 429 else resp.status, resp.headers)
+        return resp.status, payload
+
+
+async def _resolve_account(session, headers: dict, name: str, tag: str, priority: Priority) -> tuple[str, str]:
+    """/valorant/v1/account/{name}/{tag} → (puuid, region)."""
+    account_url = (
+        f"{HENRIKDEV_BASE_URL}/valorant/v1/account/"
+        f"{quote(name, safe='')}/{quote(tag, safe='')}"
+    )
+    status, payload = await _get_json(session, account_url, headers, priority)
+    api_status = payload.get("status")
+
+    if (status == 404 or api_status == 404) and not (status == 429 or api_status == 429):
+        raise ValorantRankError("Игрок не найден в HenrikDev (404)", status=404)
+    _check_status(status, api_status, "account")
+
+    data = payload.get("data") or {}
+    puuid = data.get("puuid")
+    region = (data.get("region") or VALORANT_DEFAULT_REGION).lower()
+
+    if not puuid:
+        raise ValorantRankError("Не удалось получить puuid игрока из HenrikDev", status=status)
+    return puuid, region
+
+
+def _extract_rank(data: dict) -> str:
+    # --- ПРИОРИТЕТ: текущий ранг за акт ---
+    # v3-схема: data.current.tier.name
+    current_v3 = data.get("current") or {}
+    current_tier_v3 = current_v3.get("tier") or {}
+    rank_raw: Optional[str] = current_tier_v3.get("name")
+
+    # fallback: v2-схема через current_data
+    if not rank_raw:
+        current_v2 = data.get("current_data") or {}
+        rank_raw = (
+            current_v2.get("currenttier_patched")
+            or current_v2.get("currenttierpatched")
+        )
+
+    # fallback: иногда патчат без current_data
+    if not rank_raw:
+        rank_raw = (
+            data.get("currenttier_patched")
+            or data.get("currenttierpatched")
+        )
+
+    # если так и не нашли — это реально Unranked
+    return _normalize_rank(rank_raw)
+
+
+async def _fetch_mmr(session, headers: dict, region: str, puuid: str, priority: Priority) -> str | None:
+    """/valorant/v1/by-puuid/mmr/{region}/{puuid} → ранг; None — mmr 404 (рейтинга нет)."""
+    mmr_url = (
+        f"{HENRIKDEV_BASE_URL}/valorant/v1/by-puuid/mmr/"
+        f"{region}/{quote(puuid, safe='')}"
+    )
+    status, payload = await _get_json(session, mmr_url, headers, priority)
+    api_status = payload.get("status")
+
+    if (status == 404 or api_status == 404) and not (status == 429 or api_status == 429):
+        return None
+    _check_status(status, api_status, "mmr")
+    return _extract_rank(payload.get("data") or {})
+
+
+async def _store_safely(coro) -> None:
+    # кэш — оптимизация: ошибка диска не должна ронять получение ранга
+    try:
+        await coro
+    except Exception as e:
+        logger.warning(f"[HenrikDev] rank store write failed: {e}")
+
+
+async def fetch_rank_info(
+    riot_id: str,
+    *,
+    puuid: str | None = None,
+    region: str | None = None,
+    priority: Priority = Priority.INTERACTIVE,
+) -> RankInfo:
     """
     Получить АКТУАЛЬНЫЙ ранг игрока через HenrikDev.
 
     Шаги:
     1) /valorant/v1/account/{name}/{tag} → puuid + region
+       (пропускается, если puuid и регион уже известны: переданы из профиля
+       или лежат в rank_store с прошлых запросов)
     2) /valorant/v1/by-puuid/mmr/{region}/{puuid} → текущий ранг
+       (mmr 404 по сохранённому puuid — шаг 1 заново и повтор: аккаунт мог
+       переехать в другой регион)
 
-    Возвращает:
-        (rank, region)
+    puuid/region передавать только для ТОГО ЖЕ Riot ID, под которым их получили.
+    priority — класс очереди к HenrikDev (по умолчанию — игрок ждёт ответа).
 
     Бросает ValorantRankError при любой проблеме
     (404, 429, сетевые ошибки и т.д.).
@@ -140,14 +239,25 @@ async def fetch_valorant_rank(riot_id: str) -> Tuple[str, str]:
         raise ValorantRankError("Riot ID должен быть в формате Name#TAG")
 
     cache_key = _cache_key(riot_id)
-    now = time.time()
 
-    # --- кеш по Riot ID ---
-    cached = _rank_cache.get(cache_key)
-    if cached:
-        ts, cached_rank, cached_region = cached
-        if now - ts < _RANK_CACHE_TTL:
-            return cached_rank, cached_region
+    # --- кеш по Riot ID (на диске, общий для рестартов/процессов) ---
+    try:
+        cached = await rank_store.get_entry(cache_key)
+    except Exception as e:
+        logger.warning(f"[HenrikDev] rank store read failed: {e}")
+        cached = None
+
+    if cached and cached.is_fresh(time.time()):
+        if cached.negative:
+            raise ValorantRankError(cached.error_message or "Игрок не найден в HenrikDev", status=cached.error_status)
+        return RankInfo(cached.rank, cached.region, cached.puuid)
+
+    if cached and cached.puuid and (not puuid or (puuid == cached.puuid and not region)):
+        puuid, region = cached.puuid, cached.region
+    if puuid and not region:
+        # регион к известному puuid не угадываем: дефолтный для чужого шарда даст
+        # mmr 404, и игрок молча станет Unranked — лучше спросить аккаунт заново
+        puuid = None
 
     session = await get_http_session()
 
@@ -156,114 +266,49 @@ async def fetch_valorant_rank(riot_id: str) -> Tuple[str, str]:
         "Accept": "application/json",
     }
 
-    try:
-        # ---------- 1. Получаем puuid и регион ----------
-        account_url = (
-            f"{HENRIKDEV_BASE_URL}/valorant/v1/account/"
-            f"{quote(name, safe='')}/{quote(tag, safe='')}"
-        )
-
-        await _respect_rate_limit()
-        async with session.get(account_url, headers=headers) as resp:
-            status = resp.status
-            try:
-                payload = await resp.json()
-            except Exception:
-                payload = {}
-
-            api_status = payload.get("status")
-
-            if status == 429 or api_status == 429:
-                raise ValorantRankError("Лимит запросов к HenrikDev (429)", status=429)
-
-            if status == 404 or api_status == 404:
-                raise ValorantRankError("Игрок не найден в HenrikDev (404)", status=404)
-
-            if status >= 500 or (api_status and api_status >= 500):
-                raise ValorantRankError("HenrikDev / Riot временно недоступен", status=status)
-
-            if status != 200 or (api_status not in (None, 200)):
-                raise ValorantRankError(
-                    f"Неожиданный ответ HenrikDev (account): HTTP {status}, status={api_status}",
-                    status=status,
-                )
-
-            data = payload.get("data") or {}
-            puuid = data.get("puuid")
-            region = (data.get("region") or VALORANT_DEFAULT_REGION).lower()
-
-            if not puuid:
-                raise ValorantRankError("Не удалось получить puuid игрока из HenrikDev", status=status)
-
-        # ---------- 2. Получаем mmr по puuid ----------
-        mmr_url = (
-            f"{HENRIKDEV_BASE_URL}/valorant/v1/by-puuid/mmr/"
-            f"{region}/{quote(puuid, safe='')}"
-        )
-
-        await _respect_rate_limit()
-        async with session.get(mmr_url, headers=headers) as resp:
-            status = resp.status
-            try:
-                payload = await resp.json()
-            except Exception:
-                payload = {}
-
-            api_status = payload.get("status")
-
-            if status == 429 or api_status == 429:
-                raise ValorantRankError("Лимит запросов к HenrikDev (429)", status=429)
-
-            if status == 404 or api_status == 404:
-                # Аккаунт есть, но рейтинга нет → считаем Unranked
-                rank = "Unranked"
-                _rank_cache[cache_key] = (now, rank, region)
-                logger.info(f"[HenrikDev] {riot_id} -> {rank} (region={region}) [mmr 404]")
-                return rank, region
-
-            if status >= 500 or (api_status and api_status >= 500):
-                raise ValorantRankError("HenrikDev / Riot временно недоступен (mmr)", status=status)
-
-            if status != 200 or (api_status not in (None, 200)):
-                raise ValorantRankError(
-                    f"Неожиданный ответ HenrikDev (mmr): HTTP {status}, status={api_status}",
-                    status=status,
-                )
-
-            data = payload.get("data") or {}
-
-            # --- ПРИОРИТЕТ: текущий ранг за акт ---
-            # v3-схема: data.current.tier.name
-            rank_raw: Optional[str] = None
-
-            current_v3 = data.get("current") or {}
-            current_tier_v3 = current_v3.get("tier") or {}
-            rank_raw = current_tier_v3.get("name")
-
-            # fallback: v2-схема через current_data
-            if not rank_raw:
-                current_v2 = data.get("current_data") or {}
-                rank_raw = (
-                    current_v2.get("currenttier_patched")
-                    or current_v2.get("currenttierpatched")
-                )
-
-            # fallback: иногда патчат без current_data
-            if not rank_raw:
-                rank_raw = (
-                    data.get("currenttier_patched")
-                    or data.get("currenttierpatched")
-                )
-
-            # если так и не нашли — это реально Unranked
-            rank = _normalize_rank(rank_raw)
+    async def resolve() -> tuple[str, str]:
+        try:
+            return await _resolve_account(session, headers, name, tag, priority)
+        except ValorantRankError as e:
+            # несуществующий Riot ID запоминаем, чтобы не жечь лимит повторами
+            if e.status == 404:
+                await _store_safely(rank_store.store_negative(cache_key, e.status, e.message))
+            raise
 
+    try:
+        # ---------- 1. puuid и регион (только если ещё не знаем) ----------
+        stored = bool(puuid)
+        if not stored:
+            puuid, region = await resolve()
+        region = region.lower()
+
+        # ---------- 2. mmr по puuid ----------
+        rank = await _fetch_mmr(session, headers, region, puuid, priority)
+        if rank is None and stored:
+            # puuid/регион из профиля или кэша могли устареть (перенос аккаунта
+            # в другой регион) — один раз сверяемся с аккаунтом и повторяем
+            fresh_puuid, fresh_region = await resolve()
+            if (fresh_puuid, fresh_region) != (puuid, region):
+                logger.info(f"[HenrikDev] {riot_id}: account moved {region} -> {fresh_region}")
+                puuid, region = fresh_puuid, fresh_region
+                rank = await _fetch_mmr(session, headers, region, puuid, priority)
+
+        if rank is None:
+            # Аккаунт есть, но рейтинга нет → считаем Unranked
+            rank = "Unranked"
+            logger.info(f"[HenrikDev] {riot_id} -> {rank} (region={region}) [mmr 404]")
+        else:
             logger.info(f"[HenrikDev] {riot_id} -> {rank} (region={region})")
 
-            _rank_cache[cache_key] = (now, rank, region)
-            return rank, region
+        await _store_safely(rank_store.store_rank(cache_key, rank, region, puuid))
+        return RankInfo(rank, region, puuid)
 
     except aiohttp.ClientError as e:
         logger.error(f"[HenrikDev] network error for {riot_id}: {e}")
         raise ValorantRankError("Сетевая ошибка при запросе к HenrikDev") from e
 
+
+async def fetch_valorant_rank(riot_id: str, priority: Priority = Priority.INTERACTIVE) -> Tuple[str, str]:
+    """(rank, region) — см. fetch_rank_info."""
+    info = await fetch_rank_info(riot_id, priority=priority)
+    return info.rank, info.region